@@ -12,4 +12,6 @@ export PYTHONPATH=.
 #exec python3 -u gtb/inspect/print_html_history.py
 #exec python3 -u gtb/inspect/print_html_spread_stats.py
 #exec python3 -u gtb/inspect/graph.py
+#exec python3 -u gtb/backtest/engine.py data/market.csv backtest
+#exec python3 -u gtb/main.py --asyncio
 exec python3 -u gtb/main.py
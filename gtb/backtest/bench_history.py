@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+
+# Measure load time and memory of a large synthetic order history
+#
+# Usage: python3 gtb/backtest/bench_history.py --pairs 100000
+# Writes a historical.json to a temporary directory, loads it and checks every pair serializes back unchanged
+
+import os
+import json
+import time
+import random
+import argparse
+import tempfile
+import tracemalloc
+
+from datetime import datetime, timedelta
+from typing import Callable, List
+
+from gtb.orders.history import OrderHistory
+from gtb.orders.order import Order
+from gtb.orders.order_pair import OrderPair
+from gtb.utils.logging import Log
+from gtb.utils.maths import floor_btc, floor_usd
+
+ALGORITHMS: List[str] = [
+    "Spread-High-G",
+    "Spread-HighSmall-G",
+    "Spread-Low-G",
+    "AllIn",
+    "HODL",
+]
+
+def make_info(rng: random.Random, when: datetime, market: float) -> dict:
+    return {
+        'order_id': "{:032x}".format(rng.getrandbits(128)),
+        'client_order_id': "{:032x}".format(rng.getrandbits(128)),
+        'order_time': when.strftime("%Y-%m-%d %H:%M:%S"),
+        'final_time': (when + timedelta(minutes=rng.randint(1, 600))).strftime("%Y-%m-%d %H:%M:%S"),
+        'cancel_time': None,
+        'order_market': market,
+        'final_market': market,
+        'final_fees': round(rng.uniform(0.05, 0.5), 2),
+        'final_usd': round(rng.uniform(10, 100), 2),
+        'cancel_reason': None,
+    }
+
+# Amount as it reads back, flooring some amounts takes off another unit
+def stable(floor: Callable[[float], float], x: float) -> float:
+    ret: float = floor(x)
+    while floor(ret) != ret:
+        ret = floor(ret)
+    return ret
+
+# Completed pairs spread over a year
+def make_history(count: int) -> list:
+    rng: random.Random = random.Random(1)
+    start: datetime = datetime(2024, 1, 1)
+    ret: list = []
+    for x in range(0, count):
+        when: datetime = start + timedelta(seconds=rng.randint(0, 365 * 86400))
+        market: float = round(rng.uniform(30000, 70000), 2)
+        btc: str = "{:.8f}".format(stable(floor_btc, rng.uniform(0.0002, 0.002)))
+        ret.append({
+            'status': OrderPair.Status.Complete.name,
+            'algorithm': rng.choice(ALGORITHMS),
+            'event_time': when.strftime("%Y-%m-%d %H:%M:%S"),
+            'event_price': "{:0.2f}".format(market),
+            'buy': {
+                'type': Order.Type.Buy.name,
+                'status': Order.Status.Complete.name,
+                'btc': btc,
+                'usd': stable(floor_usd, float(btc) * market),
+                'info': make_info(rng, when, market),
+            },
+            'sell': {
+                'type': Order.Type.Sell.name,
+                'status': Order.Status.Complete.name,
+                'btc': btc,
+                'usd': stable(floor_usd, float(btc) * market * 1.01),
+                'info': make_info(rng, when, market * 1.01),
+            },
+            'buy_only': False,
+        })
+    return ret
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Measure order history load time and memory.")
+    parser.add_argument("--pairs", type=int, default=100000)
+    args = parser.parse_args()
+
+    Log.INFO = False
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.chdir(tmp_dir)
+        os.makedirs(os.path.dirname(OrderHistory.file))
+        data: list = make_history(args.pairs)
+        with open(OrderHistory.file, "w") as fp:
+            fp.write(json.dumps(data))
+
+        # Memory still held once loading is done is the pairs themselves
+        history: OrderHistory = OrderHistory()
+        tracemalloc.start()
+        start: float = time.process_time()
+        history.read_fs()
+        seconds: float = time.process_time() - start
+        held, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        # Serialization is unchanged
+        for expected, pair in zip(data, history.order_pairs):
+            assert pair.to_dict() == expected, (pair.to_dict(), expected)
+        assert len(history.order_pairs) == len(data)
+
+    print("Pairs: {}".format(len(history.order_pairs)))
+    print("Load: {:.2f}s CPU".format(seconds))
+    print("Memory: {:.1f} MB held, {:.1f} MB peak".format(held / 1e6, peak / 1e6))
+    print("Per pair: {:.0f} bytes".format(held / len(history.order_pairs)))
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+
+# Replay recorded market data through the traders against a mock exchange
+#
+# Usage: python3 gtb/backtest/engine.py data/market.csv backtest
+#        python3 gtb/backtest/engine.py data/ticks backtest
+# The output directory gets the same data/ layout as the bot so the inspect reports work on it
+
+import os
+import numpy
+import argparse
+
+from datetime import datetime, timedelta
+from typing import List, Tuple
+
+from gtb.backtest.exchange import MockExchange
+from gtb.core.clock import Clock
+from gtb.core.context import Context
+from gtb.core.settings import Settings
+from gtb.core.thread import BotThread
+from gtb.core.timer import TimerThread
+from gtb.market.current import CurrentMarketThread
+from gtb.market.reader import MarketReader, MarketSeries
+from gtb.market.ticks import MarketTicks
+from gtb.orders.processor import OrderProcessor
+from gtb.phases.tracker import PhaseTracker
+from gtb.traders.allin import AllInTrader
+from gtb.traders.hodl import DiamondHands
+from gtb.traders.spread import SpreadTrader
+from gtb.utils.logging import Log
+
+class BacktestResult():
+    ticks: int
+    start_equity: float
+    final_equity: float
+    pnl: float
+    fills: int
+    fees: float
+    max_drawdown: float
+
+    def __init__(self, start_equity: float) -> None:
+        self.ticks = 0
+        self.start_equity = start_equity
+        self.final_equity = start_equity
+        self.pnl = 0.0
+        self.fills = 0
+        self.fees = 0.0
+        self.max_drawdown = 0.0
+
+class Backtest():
+    market_file: str
+    output_dir: str
+    usd: float
+    btc: float
+    fee_rate: float
+    step_seconds: float
+    start: datetime | None
+    end: datetime | None
+
+    def __init__(
+            self,
+            market_file: str,
+            output_dir: str,
+            usd: float = 10000.0,
+            btc: float = 0.0,
+            fee_rate: float = 0.004,
+            step_seconds: float = 1.0,
+            start: datetime | None = None,
+            end: datetime | None = None,
+        ) -> None:
+        self.market_file = os.path.abspath(market_file)
+        self.output_dir = output_dir
+        self.usd = usd
+        self.btc = btc
+        self.fee_rate = fee_rate
+        self.step_seconds = step_seconds
+        self.start = start
+        self.end = end
+
+    # Recorded (time, bid, ask) market ticks
+    def read_market(self) -> List[Tuple[datetime, float, float]]:
+        # Tick archive directory
+        if os.path.isdir(self.market_file):
+            records: numpy.ndarray = MarketTicks(self.market_file).read_range(self.start, self.end)
+            times: List[datetime] = [datetime.fromtimestamp(x) for x in records['time'].tolist()]
+            return list(zip(times, records['bid'].tolist(), records['ask'].tolist()))
+
+        series: MarketSeries = MarketReader(self.market_file).read_range(self.start, self.end)
+        return list(zip(series.get_times(), series.bid.tolist(), series.ask.tolist()))
+
+    def run(self) -> BacktestResult:
+        ticks: List[Tuple[datetime, float, float]] = self.read_market()
+        if len(ticks) == 0:
+            raise Exception("No market data to replay.")
+
+        # All bot state is written relative to the output directory
+        orig_dir: str = os.getcwd()
+        orig_feed: str | None = Settings.MARKET_FEED_URL
+        os.makedirs(self.output_dir, exist_ok=True)
+        os.chdir(self.output_dir)
+        Settings.MARKET_FEED_URL = None
+        try:
+            return self.replay(ticks)
+        finally:
+            Settings.MARKET_FEED_URL = orig_feed
+            Clock.set(None)
+            os.chdir(orig_dir)
+
+    def replay(self, ticks: List[Tuple[datetime, float, float]]) -> BacktestResult:
+        exchange: MockExchange = MockExchange(self.usd, self.btc, self.fee_rate)
+        Clock.set(ticks[0][0])
+        exchange.set_market(ticks[0][1], ticks[0][2])
+
+        ctx: Context = Context(api=exchange)
+        ctx.is_running = True
+        # Written once at the end instead of every think
+        ctx.order_book.persist = False
+        market: CurrentMarketThread = CurrentMarketThread(ctx)
+        threads: List[BotThread] = [
+            market,
+            TimerThread(ctx),
+            PhaseTracker(ctx),
+            OrderProcessor(ctx),
+            DiamondHands(ctx),
+            SpreadTrader(ctx),
+            AllInTrader(ctx),
+        ]
+        for t in threads:
+            t.init()
+
+        result: BacktestResult = BacktestResult(exchange.get_equity())
+        peak: float = result.start_equity
+
+        # Step the simulated clock through each tick, thinking at each thread's own interval
+        # Threads waiting on events think when one is published, like in the bot
+        now: datetime = ticks[0][0]
+        next_think: List[datetime] = [now for t in threads]
+        step: timedelta = timedelta(seconds=self.step_seconds)
+        intervals: List[timedelta] = [max(step, timedelta(seconds=t.sleep_seconds)) for t in threads]
+        for index in range(0, len(ticks)):
+            tick: Tuple[datetime, float, float] = ticks[index]
+            tick_end: datetime = ticks[index + 1][0] if index + 1 < len(ticks) else tick[0] + step
+            exchange.set_market(tick[1], tick[2])
+
+            # The market only changes with a new point, like the live feed pushing an update
+            new_point: bool = True
+            while now < tick_end:
+                Clock.set(now)
+                for i in range(0, len(threads)):
+                    if threads[i] is market:
+                        if new_point:
+                            market.think()
+                        continue
+                    thread: BotThread = threads[i]
+                    if next_think[i] <= now or ctx.events.is_changed(thread.events, thread.seen):
+                        ctx.events.update_seen(thread.events, thread.seen)
+                        thread.think()
+                        next_think[i] = now + intervals[i]
+                new_point = False
+                now += step
+
+            # Track drawdown from the highest equity
+            equity: float = exchange.get_equity()
+            peak = max(peak, equity)
+            result.max_drawdown = max(result.max_drawdown, peak - equity)
+            result.ticks += 1
+
+        ctx.order_book.persist = True
+        ctx.order_book.write_fs()
+
+        result.final_equity = exchange.get_equity()
+        result.pnl = result.final_equity - result.start_equity
+        result.fills = exchange.fills
+        result.fees = exchange.fees
+        return result
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Replay recorded market data through the traders.")
+    parser.add_argument("market_file", help="market.csv or tick archive directory")
+    parser.add_argument("output_dir")
+    parser.add_argument("--usd", type=float, default=10000.0)
+    parser.add_argument("--btc", type=float, default=0.0)
+    parser.add_argument("--fee", type=float, default=0.004)
+    parser.add_argument("--step", type=float, default=1.0, help="Simulated seconds per step")
+    parser.add_argument("--start", help="YYYY-MM-DD HH:MM:SS")
+    parser.add_argument("--end", help="YYYY-MM-DD HH:MM:SS")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    Log.INFO = args.verbose
+    backtest: Backtest = Backtest(
+        args.market_file,
+        args.output_dir,
+        usd=args.usd,
+        btc=args.btc,
+        fee_rate=args.fee,
+        step_seconds=args.step,
+        start=datetime.strptime(args.start, "%Y-%m-%d %H:%M:%S") if args.start else None,
+        end=datetime.strptime(args.end, "%Y-%m-%d %H:%M:%S") if args.end else None,
+    )
+    result: BacktestResult = backtest.run()
+    print("Ticks: {}".format(result.ticks))
+    print("PnL: ${:.2f}".format(result.pnl))
+    print("Fills: {}".format(result.fills))
+    print("Fees: ${:.2f}".format(result.fees))
+    print("Max drawdown: ${:.2f}".format(result.max_drawdown))
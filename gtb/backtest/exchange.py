@@ -0,0 +1,201 @@
+from typing import Dict, List
+
+from gtb.core.clock import Clock
+from gtb.utils.maths import floor_usd
+
+from coinbase.rest import rest_base
+
+# Local stand-in for the Coinbase REST API that fills limit orders against replayed prices
+class MockExchange(rest_base.RESTBase):
+    PREFIX: str = "/api/v3/brokerage"
+
+    bid: float
+    ask: float
+    fee_rate: float
+    usd_available: float
+    usd_hold: float
+    btc_available: float
+    btc_hold: float
+    orders: Dict[str, dict]
+    open_orders: List[str]
+    fills: int
+    fees: float
+    next_id: int
+
+    def __init__(self, usd: float, btc: float = 0.0, fee_rate: float = 0.004) -> None:
+        super().__init__(api_key=None, api_secret=None)
+        self.bid = 0.0
+        self.ask = 0.0
+        self.fee_rate = fee_rate
+        self.usd_available = usd
+        self.usd_hold = 0.0
+        self.btc_available = btc
+        self.btc_hold = 0.0
+        self.orders = {}
+        self.open_orders = []
+        self.fills = 0
+        self.fees = 0.0
+        self.next_id = 0
+
+    # Move the market and fill any crossed limit orders
+    def set_market(self, bid: float, ask: float) -> None:
+        self.bid = bid
+        self.ask = ask
+
+        still_open: List[str] = []
+        for order_id in self.open_orders:
+            order: dict = self.orders[order_id]
+            price: float = float(order['limit_price'])
+            if order['side'] == "BUY" and self.ask <= price:
+                self.fill(order)
+            elif order['side'] == "SELL" and self.bid >= price:
+                self.fill(order)
+            else:
+                still_open.append(order_id)
+        self.open_orders = still_open
+
+    def fill(self, order: dict) -> None:
+        btc: float = float(order['base_size'])
+        price: float = float(order['limit_price'])
+        value: float = btc * price
+        fees: float = value * self.fee_rate
+
+        if order['side'] == "BUY":
+            self.usd_hold -= order['hold']
+            self.usd_available += order['hold'] - (value + fees)
+            self.btc_available += btc
+            order['total_value_after_fees'] = str(value + fees)
+        else:
+            self.btc_hold -= btc
+            self.usd_available += value - fees
+            order['total_value_after_fees'] = str(value - fees)
+
+        order['status'] = "FILLED"
+        order['average_filled_price'] = str(price)
+        order['filled_value'] = str(value)
+        order['total_fees'] = str(fees)
+        order['last_fill_time'] = Clock.now().strftime("%Y-%m-%dT%H:%M:%S.%f")
+        self.fills += 1
+        self.fees += fees
+
+    def get_equity(self) -> float:
+        btc: float = self.btc_available + self.btc_hold
+        return self.usd_available + self.usd_hold + (btc * self.bid)
+
+    def get(self, url_path, params: dict | None = None, public=False, **kwargs) -> dict:
+        params = params or {}
+        path: str = url_path[len(MockExchange.PREFIX):]
+
+        if path == "/best_bid_ask":
+            return {
+                'pricebooks': [{
+                    'product_id': "BTC-USD",
+                    'bids': [{'price': str(self.bid)}],
+                    'asks': [{'price': str(self.ask)}],
+                }],
+            }
+
+        if path == "/accounts":
+            return {
+                'accounts': [
+                    {
+                        'currency': "USD",
+                        'available_balance': {'value': str(self.usd_available)},
+                        'hold': {'value': str(self.usd_hold)},
+                    },
+                    {
+                        'currency': "BTC",
+                        'available_balance': {'value': str(self.btc_available)},
+                        'hold': {'value': str(self.btc_hold)},
+                    },
+                ],
+                'has_next': False,
+                'cursor': "",
+            }
+
+        if path == "/orders/historical/batch":
+            order_ids: List[str] = params.get('order_ids') or []
+            return {
+                'orders': [dict(self.orders[x]) for x in order_ids if x in self.orders],
+                'has_next': False,
+                'cursor': "",
+            }
+
+        if path.startswith("/orders/historical/"):
+            return {'order': dict(self.orders[path.split("/")[-1]])}
+
+        raise Exception("Mock exchange does not support GET {}".format(url_path))
+
+    def post(self, url_path, params: dict | None = None, data: dict | None = None, **kwargs) -> dict:
+        data = data or {}
+        path: str = url_path[len(MockExchange.PREFIX):]
+
+        if path == "/orders":
+            return self.create_order(data)
+
+        if path == "/orders/batch_cancel":
+            results: List[dict] = []
+            for order_id in data['order_ids']:
+                results.append({
+                    'success': self.cancel_order(order_id),
+                    'order_id': order_id,
+                })
+            return {'results': results}
+
+        raise Exception("Mock exchange does not support POST {}".format(url_path))
+
+    def create_order(self, data: dict) -> dict:
+        config: dict = data['order_configuration']['limit_limit_gtc']
+        btc: float = float(config['base_size'])
+        price: float = float(config['limit_price'])
+
+        # Hold funds for the order
+        hold: float
+        if data['side'] == "BUY":
+            hold = floor_usd(btc * price * (1 + self.fee_rate))
+            if hold > self.usd_available:
+                return {'success': False, 'error_response': {'error': "INSUFFICIENT_FUND"}}
+            self.usd_available -= hold
+            self.usd_hold += hold
+        else:
+            hold = btc
+            # Allow for float rounding of the held BTC
+            if hold > self.btc_available + 1e-12:
+                return {'success': False, 'error_response': {'error': "INSUFFICIENT_FUND"}}
+            self.btc_available -= hold
+            self.btc_hold += hold
+
+        self.next_id += 1
+        order_id: str = "mock-{}".format(self.next_id)
+        self.orders[order_id] = {
+            'order_id': order_id,
+            'client_order_id': data['client_order_id'],
+            'side': data['side'],
+            'status': "OPEN",
+            'base_size': config['base_size'],
+            'limit_price': config['limit_price'],
+            'hold': hold,
+        }
+        self.open_orders.append(order_id)
+
+        # Crossed the market already
+        self.set_market(self.bid, self.ask)
+
+        return {'success': True, 'order_id': order_id}
+
+    def cancel_order(self, order_id: str) -> bool:
+        if not order_id in self.open_orders:
+            return False
+        order: dict = self.orders[order_id]
+
+        # Release held funds
+        if order['side'] == "BUY":
+            self.usd_hold -= order['hold']
+            self.usd_available += order['hold']
+        else:
+            self.btc_hold -= order['hold']
+            self.btc_available += order['hold']
+
+        order['status'] = "CANCELLED"
+        self.open_orders.remove(order_id)
+        return True
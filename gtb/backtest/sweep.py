@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+
+# Run backtests over a search space of settings across all cores
+#
+# Usage: python3 gtb/backtest/sweep.py data/market.csv space.json --output sweep.csv [--random 100]
+#
+# The search space maps setting names to candidate values:
+# {
+#     "PHASE_ACUTE_DELTA": [10, 20, 30],
+#     "MARKET_SMOOTH_CHANGE_PER_MINUTE": [0.0005, 0.001],
+#     "spreads.Min.spread": [0.001, 0.0014, 0.002],
+#     "spreads.Min.usd": {"min": 20, "max": 200}
+# }
+# Lists are tried exhaustively (grid) or sampled (random), {"min", "max"} ranges are only valid for random search
+
+import os
+import json
+import random
+import argparse
+import itertools
+import tempfile
+
+from multiprocessing import Pool
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+from gtb.backtest.engine import Backtest, BacktestResult
+from gtb.core.settings import Settings, Spread
+from gtb.utils.logging import Log
+
+# Spread tiers before any configuration is applied
+DEFAULT_SPREADS: List[Spread] = [Spread(x.name, x.usd, x.spread) for x in Settings.spreads]
+
+# Set each setting in the configuration on top of the defaults
+def apply_config(config: Dict[str, float]) -> None:
+    Settings.spreads = [Spread(x.name, x.usd, x.spread) for x in DEFAULT_SPREADS]
+    for key, value in config.items():
+        fields: List[str] = key.split(".")
+        if fields[0] == "spreads" and len(fields) == 3:
+            spread: Spread | None = None
+            for x in Settings.spreads:
+                if x.name == fields[1]:
+                    spread = x
+            if not spread or not fields[2] in ["usd", "spread"]:
+                raise Exception("Unknown spread setting {}.".format(key))
+            setattr(spread, fields[2], value)
+        elif hasattr(Settings, key):
+            setattr(Settings, key, value)
+        else:
+            raise Exception("Unknown setting {}.".format(key))
+
+def grid_configs(space: Dict[str, list | dict]) -> List[Dict[str, float]]:
+    keys: List[str] = sorted(space.keys())
+    for key in keys:
+        if not isinstance(space[key], list):
+            raise Exception("Grid search needs a list of values for {}.".format(key))
+    ret: List[Dict[str, float]] = []
+    for values in itertools.product(*[space[key] for key in keys]):
+        ret.append(dict(zip(keys, values)))
+    return ret
+
+def random_configs(space: Dict[str, list | dict], count: int, seed: int | None) -> List[Dict[str, float]]:
+    rand: random.Random = random.Random(seed)
+    keys: List[str] = sorted(space.keys())
+    ret: List[Dict[str, float]] = []
+    for i in range(0, count):
+        config: Dict[str, float] = {}
+        for key in keys:
+            choices: list | dict = space[key]
+            if isinstance(choices, list):
+                config[key] = rand.choice(choices)
+            else:
+                config[key] = rand.uniform(choices['min'], choices['max'])
+        ret.append(config)
+    return ret
+
+class SweepJob():
+    market_file: str
+    usd: float
+    step_seconds: float
+    start: datetime | None
+    end: datetime | None
+
+    def __init__(
+            self,
+            market_file: str,
+            usd: float,
+            step_seconds: float,
+            start: datetime | None,
+            end: datetime | None,
+        ) -> None:
+        self.market_file = os.path.abspath(market_file)
+        self.usd = usd
+        self.step_seconds = step_seconds
+        self.start = start
+        self.end = end
+
+    # Runs in a worker process
+    def __call__(self, config: Dict[str, float]) -> Tuple[Dict[str, float], BacktestResult | None]:
+        Log.INFO = False
+        try:
+            apply_config(config)
+            with tempfile.TemporaryDirectory(prefix="gtb-sweep-") as output_dir:
+                backtest: Backtest = Backtest(
+                    self.market_file,
+                    output_dir,
+                    usd=self.usd,
+                    step_seconds=self.step_seconds,
+                    start=self.start,
+                    end=self.end,
+                )
+                return (config, backtest.run())
+        except Exception as e:
+            Log.exception("Backtest failed for {}".format(json.dumps(config)), e)
+            return (config, None)
+
+def write_results(file: str, keys: List[str], results: List[Tuple[Dict[str, float], BacktestResult]]) -> None:
+    # Best PnL first
+    results = sorted(results, key=lambda x: x[1].pnl, reverse=True)
+    with open(file, "w") as fp:
+        fp.write("rank,pnl,fills,fees,max_drawdown,final_equity,{}\n".format(",".join(keys)))
+        for rank in range(0, len(results)):
+            config, result = results[rank]
+            fp.write("{},{:.2f},{},{:.2f},{:.2f},{:.2f},{}\n".format(
+                rank + 1,
+                result.pnl,
+                result.fills,
+                result.fees,
+                result.max_drawdown,
+                result.final_equity,
+                ",".join([str(config[key]) for key in keys]),
+            ))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Backtest a search space of settings in parallel.")
+    parser.add_argument("market_file")
+    parser.add_argument("space_file", help="JSON search space")
+    parser.add_argument("--output", default="sweep.csv")
+    parser.add_argument("--random", type=int, help="Sample this many configurations instead of the full grid")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--jobs", type=int, default=os.cpu_count())
+    parser.add_argument("--usd", type=float, default=10000.0)
+    parser.add_argument("--step", type=float, default=1.0, help="Simulated seconds per step")
+    parser.add_argument("--start", help="YYYY-MM-DD HH:MM:SS")
+    parser.add_argument("--end", help="YYYY-MM-DD HH:MM:SS")
+    args = parser.parse_args()
+
+    space: Dict[str, list | dict]
+    with open(args.space_file, "r") as fp:
+        space = json.loads(fp.read())
+
+    configs: List[Dict[str, float]]
+    if args.random:
+        configs = random_configs(space, args.random, args.seed)
+    else:
+        configs = grid_configs(space)
+
+    job: SweepJob = SweepJob(
+        args.market_file,
+        args.usd,
+        args.step,
+        datetime.strptime(args.start, "%Y-%m-%d %H:%M:%S") if args.start else None,
+        datetime.strptime(args.end, "%Y-%m-%d %H:%M:%S") if args.end else None,
+    )
+
+    Log.info("Running {} backtests on {} processes.".format(len(configs), args.jobs))
+    results: List[Tuple[Dict[str, float], BacktestResult]] = []
+    done: int = 0
+    with Pool(processes=args.jobs) as pool:
+        for config, result in pool.imap_unordered(job, configs):
+            done += 1
+            if result:
+                results.append((config, result))
+            Log.info("Finished {}/{} backtests.".format(done, len(configs)))
+
+    write_results(args.output, sorted(space.keys()), results)
+    Log.info("Wrote {} results to {}.".format(len(results), args.output))
@@ -1,6 +1,259 @@
+import re
+import copy
+import json
+import time
+
+from threading import Event, Lock
+from typing import TYPE_CHECKING, Dict, List, Tuple
+
+from gtb.core.limiter import RateLimiter
+from gtb.utils.logging import Log
+
+from coinbase import jwt_generator # type: ignore
+from coinbase.constants import USER_AGENT # type: ignore
 from coinbase.rest import rest_base
+from requests.adapters import HTTPAdapter # type: ignore
+from requests.exceptions import ConnectionError, Timeout # type: ignore
+
+if TYPE_CHECKING:
+    from gtb.core.async_api import AsyncCoinbaseApi
+
+# Latency and retries of one endpoint
+class EndpointStats():
+    requests: int
+    errors: int
+    retries: int
+    total_seconds: float
+    max_seconds: float
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def add(self, seconds: float) -> None:
+        self.requests += 1
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+
+# A GET being sent that identical GETs wait on instead of sending their own
+class InFlight():
+    done: Event
+    result: dict | None
+    error: Exception | None
+
+    def __init__(self) -> None:
+        self.done = Event()
+        self.result = None
+        self.error = None
 
+# Coinbase REST client shared by every thread
 class CoinbaseApi(rest_base.RESTBase):
+    # Keep-alive connections to the API host
+    POOL_SIZE: int = 16
+
+    # Exchange JWTs are valid for 2 minutes, reuse them until close to expiring
+    JWT_SECONDS: float = 120
+    JWT_MARGIN_SECONDS: float = 20
+
+    # Seconds to wait for a response by endpoint prefix, most specific first
+    TIMEOUTS: List[Tuple[str, float]] = [
+        ("GET /api/v3/brokerage/best_bid_ask", 3),
+        ("GET /api/v3/brokerage/", 5),
+        ("POST /api/v3/brokerage/orders/batch_cancel", 10),
+        # Don't give up on creating an order too early, we wouldn't know if it was placed
+        ("POST /api/v3/brokerage/orders", 15),
+    ]
+    DEFAULT_TIMEOUT: float = 10
+
+    # Stay under the exchange limit of 30 private requests a second
+    RATE_PER_SECOND: float = 25
+    BURST: float = 25
+    # Market polling leaves tokens for orders and status checks
+    RESERVE: Dict[RateLimiter.Priority, float] = {
+        RateLimiter.Priority.Normal: 2,
+        RateLimiter.Priority.Low: 8,
+    }
+
+    # Request priority by endpoint prefix, most specific first
+    PRIORITIES: List[Tuple[str, RateLimiter.Priority]] = [
+        ("POST /api/v3/brokerage/orders", RateLimiter.Priority.High),
+        ("GET /api/v3/brokerage/best_bid_ask", RateLimiter.Priority.Low),
+    ]
+
+    # GETs are safe to send again after a dropped connection
+    GET_RETRIES: int = 2
+
+    # How often to log the endpoint stats
+    STATS_SECONDS: float = 600
+
+    # Order IDs in endpoint paths
+    ID_PATTERN = re.compile(r'/[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}')
+
+    # JWT and expiration time by request URI
+    jwts: Dict[str, Tuple[str, float]]
+    stats: Dict[str, EndpointStats]
+    next_stats: float
+    limiter: RateLimiter
+    # GETs being sent by method, path and parameters
+    in_flight: Dict[str, InFlight]
+    # Sends the requests instead of the requests session when running on an event loop
+    transport: 'AsyncCoinbaseApi | None'
+    mtx: Lock
+
     def __init__(self) -> None:
         CREDENTIAL="secrets/coinbase_cloud_api_key.json"
         super().__init__(key_file=CREDENTIAL)
+        self.jwts = {}
+        self.stats = {}
+        self.next_stats = time.monotonic() + CoinbaseApi.STATS_SECONDS
+        self.limiter = RateLimiter(CoinbaseApi.RATE_PER_SECOND, CoinbaseApi.BURST, CoinbaseApi.RESERVE)
+        self.in_flight = {}
+        self.transport = None
+        self.mtx = Lock()
+
+        # Every thread sends requests, keep enough connections open for all of them
+        adapter: HTTPAdapter = HTTPAdapter(pool_connections=1, pool_maxsize=CoinbaseApi.POOL_SIZE)
+        self.session.mount("https://", adapter)
+
+    def set_headers(self, method, path):
+        if not self.is_authenticated:
+            return super().set_headers(method, path)
+        return {
+            "User-Agent": USER_AGENT,
+            "Content-Type": "application/json",
+            "Authorization": "Bearer {}".format(self.get_jwt("{} {}{}".format(method, self.base_url, path))),
+        }
+
+    def get_jwt(self, uri: str) -> str:
+        now: float = time.time()
+        with self.mtx:
+            cached: Tuple[str, float] | None = self.jwts.get(uri)
+            if cached and cached[1] > now:
+                return cached[0]
+
+        jwt: str = jwt_generator.build_rest_jwt(uri, self.api_key, self.api_secret)
+        with self.mtx:
+            # Order IDs are part of some URIs, drop the expired ones
+            self.jwts = {x: self.jwts[x] for x in self.jwts if self.jwts[x][1] > now}
+            self.jwts[uri] = (jwt, now + CoinbaseApi.JWT_SECONDS - CoinbaseApi.JWT_MARGIN_SECONDS)
+        return jwt
+
+    def get_endpoint(self, method: str, path: str) -> str:
+        return "{} {}".format(method, CoinbaseApi.ID_PATTERN.sub("/{id}", path))
+
+    def get_timeout(self, endpoint: str) -> float:
+        for prefix, timeout in CoinbaseApi.TIMEOUTS:
+            if endpoint.startswith(prefix):
+                return timeout
+        return CoinbaseApi.DEFAULT_TIMEOUT
+
+    def get_priority(self, endpoint: str) -> RateLimiter.Priority:
+        for prefix, priority in CoinbaseApi.PRIORITIES:
+            if endpoint.startswith(prefix):
+                return priority
+        return RateLimiter.Priority.Normal
+
+    def send_request(self, http_method, url_path, params, headers, data=None):
+        if http_method != "GET":
+            return self.send_limited(http_method, url_path, params, headers, data)
+
+        # Share the response of an identical GET already being sent
+        key: str = "{} {}".format(url_path, json.dumps(params, sort_keys=True))
+        with self.mtx:
+            leader: InFlight | None = self.in_flight.get(key)
+            if not leader:
+                request: InFlight = InFlight()
+                self.in_flight[key] = request
+        if leader:
+            leader.done.wait()
+            if leader.error:
+                raise leader.error
+            # Each caller gets its own copy to modify
+            return copy.deepcopy(leader.result)
+
+        try:
+            request.result = self.send_limited(http_method, url_path, params, headers, data)
+            return copy.deepcopy(request.result)
+        except Exception as e:
+            request.error = e
+            raise
+        finally:
+            with self.mtx:
+                self.in_flight.pop(key, None)
+            request.done.set()
+
+    def get_stats(self, endpoint: str) -> EndpointStats:
+        with self.mtx:
+            if not endpoint in self.stats:
+                self.stats[endpoint] = EndpointStats()
+            return self.stats[endpoint]
+
+    def send_limited(self, http_method, url_path, params, headers, data=None):
+        if data is None:
+            data = {}
+
+        # Hand the request to the event loop and wait for it there
+        transport: AsyncCoinbaseApi | None = self.transport
+        if transport:
+            return transport.call(transport.send(http_method, url_path, params, headers, data))
+
+        url: str = "https://{}{}".format(self.base_url, url_path)
+        endpoint: str = self.get_endpoint(http_method, url_path)
+        timeout: float = self.get_timeout(endpoint)
+        priority: RateLimiter.Priority = self.get_priority(endpoint)
+        stats: EndpointStats = self.get_stats(endpoint)
+
+        attempt: int = 0
+        while True:
+            self.limiter.acquire(priority)
+            start: float = time.monotonic()
+            try:
+                response = self.session.request(
+                    http_method,
+                    url,
+                    params=params,
+                    json=data,
+                    headers=headers,
+                    timeout=timeout,
+                )
+            except (ConnectionError, Timeout):
+                with self.mtx:
+                    stats.errors += 1
+                    if http_method != "GET" or attempt >= CoinbaseApi.GET_RETRIES:
+                        raise
+                    stats.retries += 1
+                attempt += 1
+                continue
+
+            with self.mtx:
+                stats.add(time.monotonic() - start)
+                if response.status_code >= 400:
+                    stats.errors += 1
+            break
+
+        self.log_stats()
+
+        # Raise an HTTPError for bad responses
+        rest_base.handle_exception(response)
+        return response.json()
+
+    def log_stats(self) -> None:
+        with self.mtx:
+            if self.next_stats > time.monotonic():
+                return None
+            self.next_stats = time.monotonic() + CoinbaseApi.STATS_SECONDS
+            lines: List[str] = []
+            for endpoint, stats in sorted(self.stats.items()):
+                lines.append("{}: {} requests, {:.0f}ms avg, {:.0f}ms max, {} errors, {} retries".format(
+                    endpoint,
+                    stats.requests,
+                    stats.total_seconds * 1000 / max(stats.requests, 1),
+                    stats.max_seconds * 1000,
+                    stats.errors,
+                    stats.retries,
+                ))
+        for line in lines:
+            Log.debug("API {}".format(line))
@@ -0,0 +1,116 @@
+import json
+import time
+import asyncio
+import aiohttp
+
+from concurrent.futures import Future
+from typing import Any, Coroutine, List, Tuple
+
+from gtb.core.api import CoinbaseApi, EndpointStats
+from gtb.core.limiter import RateLimiter
+
+from requests.exceptions import HTTPError # type: ignore
+
+# Coinbase REST requests for the asyncio runtime over one shared aiohttp connection pool
+#
+# Market polling and order status are awaited on the event loop.
+# SDK calls from thinks still in the executor (orders, cancels, wallet) come in through call().
+# Signing, timeouts, priorities, rate limits and stats are shared with the CoinbaseApi.
+class AsyncCoinbaseApi():
+    PREFIX: str = "/api/v3/brokerage"
+
+    api: CoinbaseApi
+    loop: asyncio.AbstractEventLoop
+    session: aiohttp.ClientSession
+
+    # Create on the running loop
+    def __init__(self, api: CoinbaseApi) -> None:
+        self.api = api
+        self.loop = asyncio.get_running_loop()
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=CoinbaseApi.POOL_SIZE),
+            headers={"Accept": "application/json"},
+        )
+
+    async def close(self) -> None:
+        await self.session.close()
+
+    # Run a request from another thread and wait for the response
+    def call(self, coro: Coroutine) -> Any:
+        future: Future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        return future.result()
+
+    # Query parameters as aiohttp takes them, lists repeat the key and unset values are left out
+    def get_query(self, params: dict | None) -> List[Tuple[str, str]]:
+        ret: List[Tuple[str, str]] = []
+        for key, value in (params or {}).items():
+            if value is None:
+                continue
+            for item in (value if isinstance(value, list) else [value]):
+                ret.append((key, str(item)))
+        return ret
+
+    async def send(self, http_method: str, url_path: str, params: dict | None, headers: dict, data: dict | None = None) -> dict:
+        url: str = "https://{}{}".format(self.api.base_url, url_path)
+        endpoint: str = self.api.get_endpoint(http_method, url_path)
+        timeout: aiohttp.ClientTimeout = aiohttp.ClientTimeout(total=self.api.get_timeout(endpoint))
+        priority: RateLimiter.Priority = self.api.get_priority(endpoint)
+        stats: EndpointStats = self.api.get_stats(endpoint)
+
+        attempt: int = 0
+        while True:
+            await self.api.limiter.acquire_async(priority)
+            start: float = time.monotonic()
+            try:
+                async with self.session.request(
+                    http_method,
+                    url,
+                    params=self.get_query(params),
+                    json=data if http_method != "GET" else None,
+                    headers=headers,
+                    timeout=timeout,
+                ) as response:
+                    status: int = response.status
+                    reason: str = response.reason or ""
+                    text: str = await response.text()
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                with self.api.mtx:
+                    stats.errors += 1
+                    if http_method != "GET" or attempt >= CoinbaseApi.GET_RETRIES:
+                        raise
+                    stats.retries += 1
+                attempt += 1
+                continue
+
+            with self.api.mtx:
+                stats.add(time.monotonic() - start)
+                if status >= 400:
+                    stats.errors += 1
+            break
+
+        self.api.log_stats()
+
+        # Same errors as the SDK raises
+        if status >= 500:
+            raise HTTPError("{} Server Error: {} {}".format(status, reason, text))
+        if status >= 400:
+            raise HTTPError("{} Client Error: {} {}".format(status, reason, text))
+        return json.loads(text)
+
+    async def get(self, url_path: str, params: dict | None = None) -> dict:
+        return await self.send("GET", url_path, params, self.api.set_headers("GET", url_path))
+
+    async def get_best_bid_ask(self, product_ids: List[str]) -> dict:
+        return await self.get("{}/best_bid_ask".format(AsyncCoinbaseApi.PREFIX), {
+            'product_ids': product_ids,
+        })
+
+    async def list_orders(self, order_ids: List[str], limit: int, cursor: str | None = None) -> dict:
+        return await self.get("{}/orders/historical/batch".format(AsyncCoinbaseApi.PREFIX), {
+            'order_ids': order_ids,
+            'limit': limit,
+            'cursor': cursor,
+        })
+
+    async def get_order(self, order_id: str) -> dict:
+        return await self.get("{}/orders/historical/{}".format(AsyncCoinbaseApi.PREFIX, order_id))
@@ -0,0 +1,126 @@
+import signal
+import asyncio
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+from gtb.core.api import CoinbaseApi
+from gtb.core.async_api import AsyncCoinbaseApi
+from gtb.core.bot import Bot
+from gtb.core.thread import BotThread
+from gtb.utils.logging import Log
+
+# Run the bot threads as asyncio tasks on one event loop
+#
+# Every REST request goes over one aiohttp connection pool on the loop.
+# The market poll and order status checks are awaited there without holding a thread.
+# The rest of the thinks are synchronous and run in a small executor,
+# their SDK calls hand the request to the loop and wait for it.
+class AsyncBot(Bot):
+    # Workers for the synchronous thinks, file writes and orderbook processing
+    EXECUTOR_WORKERS: int = 4
+
+    loop: asyncio.AbstractEventLoop | None
+    executor: ThreadPoolExecutor
+    tasks: List[asyncio.Task]
+    # Set when an event is published, one per bot thread
+    wakeups: Dict[int, asyncio.Event]
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.loop = None
+        self.executor = ThreadPoolExecutor(max_workers=AsyncBot.EXECUTOR_WORKERS, thread_name_prefix="think")
+        self.tasks = []
+        self.wakeups = {}
+
+    def run(self) -> None:
+        asyncio.run(self.run_async())
+
+    async def run_async(self) -> None:
+        self.loop = asyncio.get_running_loop()
+        # Threads hand their blocking work to run_in_executor(None, ...)
+        self.loop.set_default_executor(self.executor)
+
+        # Send all requests over the loop's connection pool
+        assert isinstance(self.ctx.api, CoinbaseApi)
+        self.ctx.async_api = AsyncCoinbaseApi(self.ctx.api)
+        self.ctx.api.transport = self.ctx.async_api
+
+        # Shut down cleanly on SIGINT/SIGTERM
+        self.loop.add_signal_handler(signal.SIGINT, self.stop)
+        self.loop.add_signal_handler(signal.SIGTERM, self.stop)
+
+        # Publishes come from worker threads
+        self.ctx.events.add_listener(self.on_publish)
+
+        self.read_fs()
+        self.ctx.is_running = True
+
+        for t in self.threads:
+            await self.loop.run_in_executor(None, t.init)
+            if not self.ctx.is_running:
+                break
+            self.wakeups[id(t)] = asyncio.Event()
+            self.tasks.append(asyncio.create_task(self.run_thread(t), name=type(t).__name__))
+
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+
+        # Let thinks still running in the executor finish, their requests still need the loop
+        Log.info("Shutting down")
+        await self.loop.shutdown_default_executor()
+        self.ctx.api.transport = None
+        await self.ctx.async_api.close()
+        self.ctx.async_api = None
+        for t in self.threads:
+            t.cleanup()
+        Log.info("Exiting")
+
+    async def run_thread(self, t: BotThread) -> None:
+        assert self.loop is not None
+        try:
+            while self.ctx.is_running:
+                if t.is_async():
+                    await t.think_async()
+                else:
+                    await self.loop.run_in_executor(None, t.think)
+                await self.wait_thread(t)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            Log.exception("{} stopped".format(type(t).__name__), e)
+
+    async def wait_thread(self, t: BotThread) -> None:
+        if not t.should_wait():
+            return None
+        if len(t.events) == 0:
+            if t.sleep_seconds > 0:
+                await asyncio.sleep(t.sleep_seconds)
+            return None
+
+        # Other events wake every task, keep waiting until one of ours
+        assert self.loop is not None
+        wakeup: asyncio.Event = self.wakeups[id(t)]
+        deadline: float = self.loop.time() + t.sleep_seconds
+        while not self.ctx.events.is_changed(t.events, t.seen):
+            remaining: float = deadline - self.loop.time()
+            if remaining <= 0:
+                break
+            wakeup.clear()
+            try:
+                await asyncio.wait_for(wakeup.wait(), remaining)
+            except asyncio.TimeoutError:
+                break
+        self.ctx.events.update_seen(t.events, t.seen)
+
+    def on_publish(self) -> None:
+        if self.loop:
+            self.loop.call_soon_threadsafe(self.wake)
+
+    def wake(self) -> None:
+        for wakeup in self.wakeups.values():
+            wakeup.set()
+
+    def stop(self) -> None:
+        super().stop()
+        for task in self.tasks:
+            task.cancel()
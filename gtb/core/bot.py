@@ -2,9 +2,12 @@ from threading import Condition
 from threading import Thread
 
 from gtb.core.context import Context
+from gtb.core.settings import Settings
 from gtb.core.thread import BotThread
+from gtb.core.timer import TimerThread
 
 from gtb.market.current import CurrentMarketThread
+from gtb.market.stream import MarketFeedThread
 from gtb.market.volume import TrackVolumeThread
 from gtb.orders.processor import OrderProcessor
 from gtb.phases.tracker import PhaseTracker
@@ -25,6 +28,8 @@ class Bot():
             NotificationThread(self.ctx),
             # Keep current market conditions updated
             CurrentMarketThread(self.ctx),
+            # Wake the time based rules
+            TimerThread(self.ctx),
             # Keep current market conditions updated
             OrderProcessor(self.ctx),
             # Continuously make determinations if we're going up or down
@@ -40,13 +45,21 @@ class Bot():
             # Try to predict large up ticks in the market
             #PhasedTrader(self.ctx),
         ]
+        # Stream market updates instead of polling
+        if Settings.MARKET_FEED_URL:
+            self.threads.append(MarketFeedThread(self.ctx))
         self.cond = Condition()
 
-    def start(self) -> None:
-        # Initialize from filesystem state
+    # Initialize from filesystem state
+    def read_fs(self) -> None:
+        self.ctx.history.migrate_fs()
+        self.ctx.history.repair_fs()
         self.ctx.history.read_fs()
-        self.ctx.order_book.read_fs()
+        # Only the bot writes the orderbook
+        self.ctx.order_book.read_fs(recover=True)
 
+    def start(self) -> None:
+        self.read_fs()
         self.ctx.is_running = True
 
         # Start threads
@@ -56,6 +69,7 @@ class Bot():
 
     def stop(self) -> None:
         self.ctx.is_running = False
+        self.ctx.events.close()
         with self.cond:
             self.cond.notify()
 
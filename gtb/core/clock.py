@@ -0,0 +1,15 @@
+from datetime import datetime
+
+# Current time for the bot (simulated during backtests)
+class Clock():
+    simulated: datetime | None = None
+
+    @staticmethod
+    def now() -> datetime:
+        if Clock.simulated:
+            return Clock.simulated
+        return datetime.now()
+
+    @staticmethod
+    def set(when: datetime | None) -> None:
+        Clock.simulated = when
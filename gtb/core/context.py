@@ -1,5 +1,9 @@
 from gtb.core.api import CoinbaseApi
+from gtb.core.async_api import AsyncCoinbaseApi
+from gtb.core.events import EventBus
+from gtb.market.feed import MarketFeed
 from gtb.market.prices import MarketPrices
+from gtb.market.snapshot import MarketSnapshot
 from gtb.market.top import MarketTop
 from gtb.phases.calculations import PhaseCalculations
 from gtb.orders.history import OrderHistory
@@ -8,24 +12,43 @@ from gtb.noti.queue import NotificationQueue
 
 from typing import Any
 
+from coinbase.rest import rest_base
+
 class Context():
-    api: CoinbaseApi
-    current_market: MarketPrices
-    smooth_market: MarketPrices
-    market_top: MarketTop
+    api: rest_base.RESTBase
+    # Set while the asyncio runtime is running
+    async_api: AsyncCoinbaseApi | None
+    events: EventBus
+    # Replaced whole on each market update
+    market: MarketSnapshot
+    market_feed: MarketFeed
     phases: PhaseCalculations
     history: OrderHistory
     order_book: OrderBook
     notify: NotificationQueue
     is_running: bool
 
-    def __init__(self) -> None:
-        self.api = CoinbaseApi()
-        self.current_market = MarketPrices()
-        self.smooth_market = MarketPrices()
-        self.market_top = MarketTop()
+    def __init__(self, api: rest_base.RESTBase | None = None) -> None:
+        # Backtests provide a mock exchange
+        self.api = api if api else CoinbaseApi()
+        self.async_api = None
+        self.events = EventBus()
+        self.market = MarketSnapshot(MarketPrices(), MarketPrices(), MarketTop(), 0)
+        self.market_feed = MarketFeed()
         self.phases = PhaseCalculations()
         self.history = OrderHistory()
-        self.order_book = OrderBook()
+        self.order_book = OrderBook(self.events)
         self.notify = NotificationQueue()
         self.is_running = False
+
+    @property
+    def current_market(self) -> MarketPrices:
+        return self.market.current
+
+    @property
+    def smooth_market(self) -> MarketPrices:
+        return self.market.smooth
+
+    @property
+    def market_top(self) -> MarketTop:
+        return self.market.top
@@ -0,0 +1,67 @@
+from enum import Enum
+from threading import Condition
+from typing import Callable, Dict, List
+
+class Event(Enum):
+    # Current/smooth market updated
+    Market = 0
+    # A phase calculation changed
+    Phase = 1
+    # An order filled
+    Fill = 2
+    # Order pairs added to the orderbook
+    OrderBook = 3
+    # Periodic tick for rules that depend on time passing
+    Timer = 4
+
+# Wake threads when the state they depend on changes
+class EventBus():
+    # Times each event has been published
+    sequence: Dict[Event, int]
+    closed: bool
+    cond: Condition
+    # Called after each publish, from the publishing thread
+    listeners: List[Callable[[], None]]
+
+    def __init__(self) -> None:
+        self.sequence = {x: 0 for x in Event}
+        self.closed = False
+        self.cond = Condition()
+        self.listeners = []
+
+    def add_listener(self, func: Callable[[], None]) -> None:
+        with self.cond:
+            self.listeners.append(func)
+
+    def publish(self, event: Event) -> None:
+        with self.cond:
+            self.sequence[event] += 1
+            self.cond.notify_all()
+            listeners: List[Callable[[], None]] = list(self.listeners)
+        for func in listeners:
+            func()
+
+    def is_changed(self, events: List[Event], seen: Dict[Event, int]) -> bool:
+        with self.cond:
+            return self.closed or any([self.sequence[x] != seen.get(x, 0) for x in events])
+
+    def update_seen(self, events: List[Event], seen: Dict[Event, int]) -> None:
+        with self.cond:
+            for event in events:
+                seen[event] = self.sequence[event]
+
+    # Wait for any of the events to be published after the sequences already seen
+    def wait(self, events: List[Event], seen: Dict[Event, int], timeout: float) -> bool:
+        with self.cond:
+            ret: bool = self.cond.wait_for(lambda: self.is_changed(events, seen), timeout)
+            self.update_seen(events, seen)
+            return ret
+
+    # Wake everything for shutdown
+    def close(self) -> None:
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+            listeners: List[Callable[[], None]] = list(self.listeners)
+        for func in listeners:
+            func()
@@ -0,0 +1,83 @@
+import time
+import asyncio
+
+from enum import Enum
+from threading import Condition
+from typing import Dict
+
+# Token bucket shared by every thread, higher priorities go first when requests queue up
+class RateLimiter():
+    class Priority(Enum):
+        # Order placement and cancels
+        High = 0
+        # Order status and wallet
+        Normal = 1
+        # Market polling
+        Low = 2
+
+    # Tokens added per second
+    rate: float
+    # Most tokens saved up for a burst
+    burst: float
+    # Tokens only higher priorities may use
+    reserve: Dict[Priority, float]
+    tokens: float
+    last_refill: float
+    # Requests waiting at each priority
+    waiting: Dict[Priority, int]
+    cond: Condition
+
+    def __init__(self, rate: float, burst: float, reserve: Dict[Priority, float] | None = None) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.reserve = reserve if reserve else {}
+        self.tokens = burst
+        self.last_refill = time.monotonic()
+        self.waiting = {x: 0 for x in RateLimiter.Priority}
+        self.cond = Condition()
+
+    def refill(self) -> None:
+        now: float = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+
+    def can_take(self, priority: Priority) -> bool:
+        # Wait behind higher priorities
+        for other in RateLimiter.Priority:
+            if other.value < priority.value and self.waiting[other] > 0:
+                return False
+        return self.tokens >= 1 + self.reserve.get(priority, 0)
+
+    # Block until a request can be sent
+    def acquire(self, priority: Priority) -> None:
+        with self.cond:
+            self.waiting[priority] += 1
+            try:
+                self.refill()
+                while not self.can_take(priority):
+                    # Time until the next token, or until a higher priority takes its turn
+                    needed: float = 1 + self.reserve.get(priority, 0) - self.tokens
+                    self.cond.wait(max(needed / self.rate, 0.001))
+                    self.refill()
+                self.tokens -= 1
+            finally:
+                self.waiting[priority] -= 1
+                self.cond.notify_all()
+
+    # Same as acquire, waiting on the event loop instead of blocking it
+    async def acquire_async(self, priority: Priority) -> None:
+        with self.cond:
+            self.waiting[priority] += 1
+        try:
+            while True:
+                with self.cond:
+                    self.refill()
+                    if self.can_take(priority):
+                        self.tokens -= 1
+                        return None
+                    needed: float = 1 + self.reserve.get(priority, 0) - self.tokens
+                await asyncio.sleep(max(needed / self.rate, 0.001))
+        finally:
+            with self.cond:
+                self.waiting[priority] -= 1
+                self.cond.notify_all()
@@ -18,6 +18,47 @@ class Settings():
     }
 
 
+    # Market Data #
+    ###############
+
+    # Websocket market feed (None to poll the REST API)
+    MARKET_FEED_URL: str | None = "wss://advanced-trade-ws.coinbase.com"
+
+    # Seconds without a feed update before falling back to REST
+    MARKET_FEED_TIMEOUT: float = 5
+
+    # Seconds between REST API market polls when there is no feed
+    MARKET_POLL_SECONDS: float = 0.5
+
+    # Most the smoothed market can move per minute (0.1%)
+    MARKET_SMOOTH_CHANGE_PER_MINUTE: float = 0.001
+
+    # Most the top of market can rise per minute (falls 16x slower)
+    MARKET_TOP_CHANGE_PER_MINUTE: float = 0.0001
+
+
+    # Events #
+    ##########
+
+    # Seconds between timer events for the time based rules (state census, phase windows)
+    TIMER_SECONDS: float = 5
+
+    # Longest threads subscribed to events go without thinking
+    WATCHDOG_SECONDS: float = 60
+
+
+    # Phase Tracking #
+    ##################
+
+    # Minimum USD change of the smoothed split for each window to not be a plateau
+    PHASE_ACUTE_DELTA: float = 20.0
+    PHASE_SHORT_DELTA: float = 30.0
+    PHASE_MID_DELTA: float = 50.0
+    PHASE_LONG_DELTA: float = 200.0
+    PHASE_EXTENDED_DELTA: float = 500.0
+    PHASE_TREND_DELTA: float = 200.0
+
+
     # HODL Algorithm #
     ##################
 
@@ -2,17 +2,29 @@ import time
 
 from threading import Thread
 from abc import ABC, abstractmethod
+from typing import Dict, List
 
 from gtb.core.context import Context
+from gtb.core.events import Event
+from gtb.core.settings import Settings
 
 class BotThread(Thread):
     ctx: Context
+    # Longest time between thinks, the watchdog for threads waiting on events
     sleep_seconds: float
+    # Think as soon as one of these is published
+    events: List[Event]
+    seen: Dict[Event, int]
 
-    def __init__(self, ctx: Context, sleep_seconds: float = 1.0) -> None:
+    def __init__(self, ctx: Context, sleep_seconds: float | None = None, events: List[Event] | None = None) -> None:
         super().__init__()
         self.ctx = ctx
+        self.events = events if events else []
+        # Threads waiting on events only need a timeout in case a publish is missed
+        if sleep_seconds is None:
+            sleep_seconds = Settings.WATCHDOG_SECONDS if len(self.events) > 0 else 1.0
         self.sleep_seconds = sleep_seconds
+        self.seen = {}
 
     @abstractmethod
     def init(self) -> None:
@@ -25,5 +37,28 @@ class BotThread(Thread):
     def run(self) -> None:
         while self.ctx.is_running:
             self.think()
-            if self.sleep_seconds > 0:
-                time.sleep(self.sleep_seconds)
+            self.wait()
+        self.cleanup()
+
+    # Release resources after the last think
+    def cleanup(self) -> None:
+        pass
+
+    # Whether to wait for events or sleep between thinks
+    def should_wait(self) -> bool:
+        return True
+
+    # Asyncio runtime: think_async runs on the event loop instead of think in an executor worker
+    def is_async(self) -> bool:
+        return False
+
+    async def think_async(self) -> None:
+        pass
+
+    def wait(self) -> None:
+        if not self.should_wait():
+            return None
+        if len(self.events) > 0:
+            self.ctx.events.wait(self.events, self.seen, self.sleep_seconds)
+        elif self.sleep_seconds > 0:
+            time.sleep(self.sleep_seconds)
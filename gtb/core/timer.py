@@ -0,0 +1,15 @@
+from gtb.core.thread import BotThread
+from gtb.core.context import Context
+from gtb.core.events import Event
+from gtb.core.settings import Settings
+
+# Publish the timer event so time based rules run without polling every thread
+class TimerThread(BotThread):
+    def __init__(self, ctx: Context) -> None:
+        super().__init__(ctx, sleep_seconds = Settings.TIMER_SECONDS)
+
+    def init(self) -> None:
+        pass
+
+    def think(self) -> None:
+        self.ctx.events.publish(Event.Timer)
@@ -1,9 +1,12 @@
 #!/usr/bin/env python3
 
+import io
+import sys
 import math
 import json
 import numpy
 from datetime import datetime
+from dateutil.relativedelta import relativedelta
 from typing import List, Tuple
 
 import matplotlib.pyplot as plt
@@ -17,6 +20,7 @@ from gtb.orders.history import OrderHistory
 from gtb.orders.order_pair import OrderPair
 from gtb.orders.order import Order
 from gtb.utils.logging import Log
+from gtb.market.candles import Candle, MarketCandles
 from gtb.market.volume import MarketVolume
 
 Log.INFO = False
@@ -28,40 +32,44 @@ def floor(x):
 def parse_date(x):
     return datetime.strptime(x, "%Y-%m-%d %H:%M:%S")
 
+# Files read by create_plot
+def get_input_files() -> List[str]:
+    return [
+        OrderBook.file,
+        OrderBook.journal_file,
+        OrderHistory.file,
+        OrderHistory.index_file,
+        MarketCandles.market_file,
+        MarketCandles.state_file,
+    ]
+
+# Render the plot to PNG bytes
+def render_png(**kwargs) -> bytes:
+    create_plot(**kwargs)
+    buf = io.BytesIO()
+    plt.savefig(buf, format='png')
+    plt.close()
+    return buf.getvalue()
+
 def create_plot(
-    START_AT="2024-05-03 17:00:00",
+    start: str | None = None,
+    end: str | None = None,
     backend='Agg'
     ) -> None:
 
-    START_AT = parse_date(START_AT)
+    # Default to the last day
+    end_time: datetime = datetime.fromisoformat(end) if end else datetime.now()
+    start_time: datetime = datetime.fromisoformat(start) if start else end_time - relativedelta(days=1)
     matplotlib.use(backend)
 
-    # Get data
+    # Get data, read only while the bot may be appending to the journal
     order_book: OrderBook = OrderBook()
-    order_book.read_fs()
+    order_book.read_fs(recover=False)
     history: OrderHistory = OrderHistory()
-    history.read_fs()
-
-    market_csv: List[str]
-    with open("data/market.csv") as fp:
-        market_csv = fp.readlines()
-
-    market_demand: List[Tuple[datetime, float]] = []
-    with open("data/demand.csv") as fp:
-        for line in fp:
-            demand_fields: List[str] = line.split(",")
-            market_demand.append((datetime.strptime(demand_fields[0], "%Y-%m-%d %H:%M:%S.%f"), float(demand_fields[1])))
+    history.read_range(start_time, end_time)
 
     # Aggregated data
-    times: List[datetime] = []
     values: List[float] = []
-    MINMAX=[0,0]
-    def minmax(MINMAX, value):
-        if not MINMAX[0] or MINMAX[0] > value:
-            MINMAX[0] = value
-        if not MINMAX[1] or MINMAX[1] < value:
-            MINMAX[1] = value
-        return MINMAX
 
     # Start graph
     plt.figure(figsize=(10, 6))
@@ -70,7 +78,7 @@ def create_plot(
     pairs = order_book.order_pairs
     pairs += history.order_pairs
     for pair in pairs:
-        if pair.event_time < START_AT:
+        if pair.event_time < start_time or pair.event_time >= end_time:
             continue
 
         if pair.status == OrderPair.Status.Canceled:
@@ -89,7 +97,6 @@ def create_plot(
 
             buy_market = pair.buy.get_limit_price()
             values.append(buy_market)
-            times.append(buy_time)
             plt.scatter(buy_time, buy_market, color=color) # type: ignore
             continue
 
@@ -111,7 +118,6 @@ def create_plot(
             buy_time = pair.event_time
             buy_market = pair.buy.get_limit_price()
         plt.scatter(buy_time, buy_market, color=color) # type: ignore
-        times.append(buy_time)
         values.append(buy_market)
 
         # Draw from conception
@@ -142,7 +148,6 @@ def create_plot(
             #sell_time = buy_time
             sell_market = pair.sell.get_limit_price()
         plt.scatter(sell_time, sell_market, color='green') # type: ignore
-        times.append(sell_time)
         values.append(sell_market)
 
         if pair.sell.status == Order.Status.Complete:
@@ -150,168 +155,33 @@ def create_plot(
             plt.plot([buy_time, sell_time], [buy_market, sell_market], color=color, zorder=1) # type: ignore
         else:
             plt.plot([buy_time, sell_time], [buy_market, sell_market], color='gray', linestyle='--', linewidth=1, zorder=1) # type: ignore
-            plt.plot([sell_time, datetime.now()], [sell_market, sell_market], color='gray', linestyle='--', linewidth=1, zorder=1) # type: ignore
+            plt.plot([sell_time, end_time], [sell_market, sell_market], color='gray', linestyle='--', linewidth=1, zorder=1) # type: ignore
+
+    # Make a yellow line for the market value
+    candles: MarketCandles = MarketCandles()
+    resolution: str = MarketCandles.get_resolution(start_time, end_time)
+    market: List[Candle] = candles.read_range(resolution, start_time, end_time)
+    for candle in market:
+        values.append(candle.low)
+        values.append(candle.high)
 
     if len(values) == 0:
         print("No matching data.")
         return None
 
-    # Get min/max time
-    times.sort()
-    min_time: datetime = times[0]
-    max_time: datetime = times[-1]
-
-    # Make a yellow line for the market value
-    market: List[Tuple[datetime, float]] = []
-    demand: List[Tuple[datetime, float]] = []
-    demand_smooth: float = 0
-    demand_lastupdate: datetime
-    volume_index: int = 0
-    for line in market_csv:
-        fields: List[str] = line.split(",")
-        when: datetime = parse_date(fields[0])
-        if when < min_time:
-            continue
-
-        bid: float = float(fields[3])
-        ask: float = float(fields[4])
-        split: float = (bid + ask) / 2
-        market.append((when, split))
-        values.append(split)
-
-
-        if volume_index == 0:
-            demand_smooth = split
-            demand_lastupdate = when
-
-        #while (volume_index + 1) < len(market_volume):
-        #    cur_volume: MarketVolume = market_volume[volume_index]
-        #    if cur_volume.get_time() > when:
-        #        break
-        #    if cur_volume.get_time() <= when and market_volume[volume_index + 1].get_time() >= when:
-        #        demand_pos: int = 10
-        #        demand_value: float = cur_volume.get_bids(demand_pos) / cur_volume.get_asks(demand_pos)
-        #        below: bool = demand_value < 1
-        #        while (below and demand_value < 1) or (not below and demand_value > 1):
-        #            demand_pos += 5
-        #            demand_value = cur_volume.get_bids(demand_pos) / cur_volume.get_asks(demand_pos)
-        #            if demand_pos > 2000:
-        #                break
-
-        #        positive: float = -1 if below else 1
-        #        delta: float = abs(demand_pos / demand_smooth)
-
-        #        # Don't change too fast
-        #        demand_time_diff: float = (when - demand_lastupdate).total_seconds()
-        #        max_demand_per_minute: float = 0.001
-        #        max_delta: float = max_demand_per_minute * (demand_time_diff / 60)
-        #        if delta > max_delta:
-        #            delta = max_delta
-
-        #        demand.append((when, demand_smooth + (demand_smooth * delta * positive)))
-        #        break
-        #    volume_index += 1
-        start_index: int = volume_index
-        while False and (volume_index + 1) < len(market_demand):
-            start_demand: Tuple[datetime, float] = market_demand[start_index]
-            if start_demand[0] > when:
-                break
-            end_demand: Tuple[datetime, float] = market_demand[volume_index]
-            if end_demand[0] >= when:
-                def blend_demand(avg: Tuple[datetime, float], cur: Tuple[datetime, float]) -> Tuple[datetime, float]:
-                    demand_delta: float = cur[1] - avg[1]
-                    positive: int = 1 if demand_delta > 0 else -1
-                    time_delta: float = (cur[0] - avg[0]).total_seconds()
-                    max_delta_per_minute: float = 200
-                    max_delta: float = max_delta_per_minute * (time_delta / 60)
-                    if abs(demand_delta) > max_delta:
-                        demand_delta = max_delta * positive
-                    return (cur[0], avg[1] + demand_delta)
-
-                avg: Tuple[datetime, float] = (start_demand[0], 0)
-                avg2: float = 0
-                for index in range(start_index, volume_index):
-                    cur_demand: Tuple[datetime, float] = market_demand[index]
-                    avg = blend_demand(avg, cur_demand)
-
-                    avg2 += cur_demand[1]
-                avg2 /= (volume_index - start_index)
-
-                demand_value: float = split + avg2
-                #demand_value: float = split + avg[1]
-                positive: float = 1 if demand_value >= demand_smooth else -1
-                demand_time_diff: float = (when - demand_lastupdate).total_seconds()
-                demand_delta: float = abs(demand_smooth - demand_value)
-                if demand_delta > 50:
-                    demand_delta = 50
-                #max_delta_per_minute: float = 200
-                #max_delta: float = max_delta_per_minute * (demand_time_diff / 60)
-                #print("| {} | {}".format(demand_time_diff, demand_delta))
-                #if demand_delta > max_delta:
-                #    demand_delta = max_delta
-                demand_lastupdate = when
-                demand_smooth = demand_smooth + (demand_delta * positive)
-                demand.append((when, demand_smooth))
-                #demand_lastupdate = when
-                #demand_smooth = demand_smooth + (demand_smooth * delta * positive)
-                #delta: float = 1 if demand_smooth == 0 else abs(demand_smooth - demand_value) / demand_smooth
-
-
-
-
-
-
-
-                #if avg2 > 0:
-                #    demand.append((when, split + 100))
-                #else:
-                #    demand.append((when, split - 100))
-                #demand.append((when, split + avg2))
-                #demand.append((when, split + avg[1]))
-
-#                demand_value: float = avg[1]
-#                positive: float = 1 if demand_value >= 0 else -1
-#                demand_time_diff: float = (when - demand_lastupdate).total_seconds()
-#                demand_delta: float = abs(demand_value)
-#                max_delta_per_minute: float = 10
-#                max_delta: float = max_delta_per_minute * (demand_time_diff / 60)
-#                print("{} | {} | {}".format(demand_time_diff, demand_delta, max_delta))
-#                if demand_delta > max_delta:
-#                    demand_delta = max_delta
-#                demand_lastupdate = when
-#                demand_smooth = demand_smooth + (demand_delta * positive)
-                #demand_lastupdate = when
-                #demand_smooth = demand_smooth + (demand_smooth * delta * positive)
-                #delta: float = 1 if demand_smooth == 0 else abs(demand_smooth - demand_value) / demand_smooth
-
-                # Don't change too fast
-                #demand_time_diff: float = (when - demand_lastupdate).total_seconds()
-                #max_demand_per_minute: float = 10
-                #max_delta: float = max_demand_per_minute * (demand_time_diff / 60)
-                #if delta > max_delta:
-                #    delta = max_delta
-                #print("{} | {} | {}".format(demand_value, demand_smooth, delta))
-
-                #demand_smooth = demand_smooth + (demand_smooth * delta * positive)
-#                demand.append((when, split + demand_smooth))
-
-
-                break
-            volume_index += 1
-
     # Setup y axis
     values.sort()
     min_value: float = values[0]
     max_value: float = values[-1]
     plt.ylim(bottom=min_value - 10, top=max_value + 10)
+    plt.xlim(left=start_time, right=end_time) # type: ignore
 
-    market.sort(key=lambda x:x[0])
-    x, y = zip(*market)
-    plt.plot(x, y, color='yellow', zorder=10, label='market')
-
-    #demand.sort(key=lambda x:x[0])
-    #x, y = zip(*demand)
-    #plt.plot(x, y, color='#9900cc', zorder=10, label='demand')
+    if len(market) > 0:
+        x = [candle.time for candle in market]
+        plt.plot(x, [candle.close for candle in market], color='yellow', zorder=10, label='market') # type: ignore
+        # Range within each candle
+        if resolution != MarketCandles.MINUTE:
+            plt.fill_between(x, [candle.low for candle in market], [candle.high for candle in market], color='yellow', alpha=0.3, zorder=9) # type: ignore
 
     # Setup labels
     plt.title('Trade History')
@@ -320,6 +190,9 @@ def create_plot(
     plt.legend()
 
 if __name__ == '__main__':
-    #create_plot(backend='Qt5Agg')
-    create_plot(backend='Agg')
+    # Optional range: graph.py [start] [end]
+    start: str | None = sys.argv[1] if len(sys.argv) > 1 else None
+    end: str | None = sys.argv[2] if len(sys.argv) > 2 else None
+    #create_plot(start, end, backend='Qt5Agg')
+    create_plot(start, end, backend='Agg')
     plt.show()
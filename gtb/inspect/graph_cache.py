@@ -0,0 +1,127 @@
+import os
+import json
+import hashlib
+
+from concurrent.futures import Future, ProcessPoolExecutor
+from threading import Lock
+from typing import Dict, List
+
+from gtb.inspect.graph import get_input_files, render_png
+from gtb.utils.files import get_file_signature
+from gtb.utils.logging import Log
+
+# Runs in the render process
+def render_in(root: str, kwargs: dict) -> bytes:
+    # create_plot reads the bot data relative to the working directory
+    os.chdir(root)
+    return render_png(**kwargs)
+
+class GraphRender():
+    key: str
+    signature: List[list]
+    png: bytes
+
+    def __init__(self, key: str, signature: List[list], png: bytes) -> None:
+        self.key = key
+        self.signature = signature
+        self.png = png
+
+# Graph renders cached in memory and on disk, keyed on the plot arguments and input files
+class GraphCache():
+    # Bot directory the graph data is read from
+    root: str
+    cache_dir: str
+    renders: Dict[str, GraphRender]
+    # Background renders in progress
+    pending: Dict[str, Future]
+    # A single process does the rendering, matplotlib is not thread safe
+    executor: ProcessPoolExecutor
+    mtx: Lock
+
+    def __init__(self, root: str, cache_dir: str) -> None:
+        self.root = os.path.abspath(root)
+        self.cache_dir = os.path.abspath(cache_dir)
+        self.renders = {}
+        self.pending = {}
+        self.executor = ProcessPoolExecutor(max_workers=1)
+        self.mtx = Lock()
+
+    def get_signature(self) -> List[list]:
+        return get_file_signature([os.path.join(self.root, x) for x in get_input_files()])
+
+    # PNG for the plot arguments, stale renders are served while a new one is made in the background
+    def get(self, **kwargs) -> bytes:
+        key: str = json.dumps(kwargs, sort_keys=True)
+        signature: List[list] = self.get_signature()
+        with self.mtx:
+            render: GraphRender | None = self.renders.get(key)
+            # Another worker may have rendered it already
+            if not render or render.signature != signature:
+                saved: GraphRender | None = self.read_fs(key)
+                if saved and (not render or saved.signature == signature):
+                    render = saved
+                    self.renders[key] = render
+
+            if render:
+                if render.signature != signature and not key in self.pending:
+                    Log.info("Graph inputs changed, rendering in background.")
+                    self.pending[key] = self.executor.submit(render_in, self.root, kwargs)
+                    self.pending[key].add_done_callback(
+                        lambda future: self.finish(key, signature, future))
+                return render.png
+
+        # Nothing to serve yet
+        png: bytes = self.executor.submit(render_in, self.root, kwargs).result()
+        self.store(GraphRender(key, signature, png))
+        return png
+
+    def finish(self, key: str, signature: List[list], future: Future) -> None:
+        with self.mtx:
+            self.pending.pop(key, None)
+        try:
+            self.store(GraphRender(key, signature, future.result()))
+        except Exception as e:
+            Log.exception("Failed to render graph", e)
+
+    def store(self, render: GraphRender) -> None:
+        with self.mtx:
+            self.renders[render.key] = render
+        try:
+            self.write_fs(render)
+        except Exception as e:
+            Log.exception("Failed to write graph cache", e)
+
+    def get_file(self, key: str) -> str:
+        return os.path.join(self.cache_dir, "graph-{}".format(hashlib.sha1(key.encode()).hexdigest()))
+
+    def read_fs(self, key: str) -> GraphRender | None:
+        file: str = self.get_file(key)
+        if not os.path.exists(file + ".json") or not os.path.exists(file + ".png"):
+            return None
+        try:
+            with open(file + ".json", "r") as fp:
+                meta: dict = json.loads(fp.read())
+            with open(file + ".png", "rb") as fp:
+                png: bytes = fp.read()
+        except Exception as e:
+            Log.exception("Failed to read graph cache", e)
+            return None
+        return GraphRender(key, meta['signature'], png)
+
+    def write_fs(self, render: GraphRender) -> None:
+        # Create directory
+        if not os.path.exists(self.cache_dir):
+            os.makedirs(self.cache_dir)
+
+        # Write atomically, other workers read the same cache
+        file: str = self.get_file(render.key)
+        tmp_file: str = "{}.{}.tmp".format(file, os.getpid())
+        with open(tmp_file, "wb") as fp:
+            fp.write(render.png)
+        os.replace(tmp_file, file + ".png")
+        with open(tmp_file, "w") as fp:
+            fp.write(json.dumps({
+                'key': render.key,
+                'signature': render.signature,
+            }))
+        os.replace(tmp_file, file + ".json")
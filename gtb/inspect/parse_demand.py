@@ -1,35 +1,149 @@
+import os
+import re
 import json
+import numpy
+import argparse
 
-from datetime import datetime
-from typing import List, Tuple
+from multiprocessing import Pool
+from typing import Iterator, List, Tuple
 
 from gtb.market.volume import MarketVolume
+from gtb.utils.logging import Log
 
-market_demand: List[Tuple[str, float]] = []
-with open("data/volume.jsonl") as fp:
-    for line in fp:
+VOLUME_FILE: str = "data/volume.jsonl"
+DEMAND_FILE: str = "data/demand.csv"
+
+# Furthest market delta to look for demand
+MAX_DEMAND: int = 2000
+# Market delta step size when looking for demand
+DEMAND_STEP: int = 5
+# Snapshots per worker task
+CHUNK_LINES: int = 500
+
+# Snapshot time without decoding the whole pricebook
+TIME_PATTERN = re.compile(r'"time": "([^"]+)"')
+
+# Market delta where bid/ask demand crosses 1 (negative when starting below 1)
+def find_demand(volume: MarketVolume) -> int | None:
+    windows: numpy.ndarray = numpy.arange(1, MAX_DEMAND + 1)
+
+    # Start at the first window with any asks
+    nonzero: numpy.ndarray = numpy.flatnonzero(volume.get_asks_many(windows) != 0)
+    if len(nonzero) == 0:
+        return None
+    first: int = int(nonzero[0]) + 1
+    start_value: float = volume.get_bids(first) / volume.get_asks(first)
+    below: bool = start_value < 1
+    if start_value == 1:
+        return first
+
+    # Every step up to the first one past the max
+    steps: int = (MAX_DEMAND - first) // DEMAND_STEP + 1
+    positions: numpy.ndarray = first + DEMAND_STEP * numpy.arange(1, steps + 1)
+    bids: numpy.ndarray = volume.get_bids_many(positions)
+    asks: numpy.ndarray = volume.get_asks_many(positions)
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        values: numpy.ndarray = bids / asks
+
+    # First step that crosses 1
+    stop: numpy.ndarray
+    if below:
+        stop = (asks == 0) | (values >= 1)
+    else:
+        stop = (asks == 0) | (values <= 1)
+    stop[-1] = True
+    demand_pos: int = int(positions[numpy.argmax(stop)])
+
+    if below:
+        demand_pos *= -1
+    return demand_pos
+
+# Runs in a worker process
+def parse_chunk(lines: List[str]) -> List[Tuple[str, int]]:
+    ret: List[Tuple[str, int]] = []
+    for line in lines:
         cur_volume: MarketVolume = MarketVolume(json.loads(line))
-        demand_pos: int = 1
-        while True:
-            try:
-                demand_value: float = cur_volume.get_bids(demand_pos) / cur_volume.get_asks(demand_pos)
-                break
-            except:
-                demand_pos += 1
-        below: bool = demand_value < 1
-        while (below and demand_value < 1) or (not below and demand_value > 1):
-            demand_pos += 5
-            asks: float = cur_volume.get_asks(demand_pos)
-            if asks == 0:
+        demand_pos: int | None = find_demand(cur_volume)
+        if demand_pos is None:
+            Log.error("No asks in snapshot {}.".format(cur_volume.pricebook['time']))
+            continue
+        ret.append((cur_volume.pricebook['time'], demand_pos))
+    return ret
+
+# Time of the last snapshot already written
+def read_last_time(file: str) -> str | None:
+    if not os.path.exists(file):
+        return None
+
+    with open(file, "rb+") as fp:
+        size: int = fp.seek(0, os.SEEK_END)
+        data: bytes = b""
+        pos: int = size
+        while pos > 0 and data.count(b"\n") < 2:
+            step: int = min(4096, pos)
+            pos -= step
+            fp.seek(pos)
+            data = fp.read(step) + data
+
+        # Drop a torn write at the end of the file
+        if len(data) > 0 and not data.endswith(b"\n"):
+            fp.truncate(pos + data.rfind(b"\n") + 1)
+            data = data[:data.rfind(b"\n") + 1]
+
+    lines: List[bytes] = data.split(b"\n")
+    if len(lines) < 2 or len(lines[-2]) == 0:
+        return None
+    return lines[-2].decode().split(",")[0]
+
+# Complete lines after the last time in groups
+def read_chunks(file: str, last_time: str | None) -> Iterator[List[str]]:
+    chunk: List[str] = []
+    with open(file, "r") as fp:
+        for line in fp:
+            # Still being written
+            if not line.endswith("\n"):
                 break
-            demand_value = cur_volume.get_bids(demand_pos) / asks
-            if demand_pos > 2000:
+            if last_time:
+                match = TIME_PATTERN.search(line)
+                if match and match.group(1) <= last_time:
+                    continue
+            chunk.append(line)
+            if len(chunk) >= CHUNK_LINES:
+                yield chunk
+                chunk = []
+    if len(chunk) > 0:
+        yield chunk
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Find the market demand of each volume snapshot.")
+    parser.add_argument("--volume", default=VOLUME_FILE)
+    parser.add_argument("--output", default=DEMAND_FILE)
+    parser.add_argument("--jobs", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    last_time: str | None = read_last_time(args.output)
+    if last_time:
+        Log.info("Resuming after {}.".format(last_time))
+
+    count: int = 0
+    chunks: Iterator[List[str]] = read_chunks(args.volume, last_time)
+    with Pool(processes=args.jobs) as pool, open(args.output, "a") as fp:
+        while True:
+            # Only read ahead enough to keep the workers busy
+            batch: List[List[str]] = []
+            for chunk in chunks:
+                batch.append(chunk)
+                if len(batch) >= args.jobs * 2:
+                    break
+            if len(batch) == 0:
                 break
-        if below:
-            demand_pos *= -1
-        print("{},{}".format(cur_volume.pricebook['time'], demand_pos))
-        market_demand.append((cur_volume.pricebook['time'], demand_pos))
-
-with open("data/demand.csv", "w") as fp:
-    for demand in market_demand:
-        fp.write("{},{}\n".format(demand[0], demand[1]))
+
+            # Write in order so the last line is always the resume point
+            for rows in pool.map(parse_chunk, batch):
+                fp.write("".join(["{},{}\n".format(row[0], row[1]) for row in rows]))
+                count += len(rows)
+            fp.flush()
+            Log.info("Wrote {} demand points.".format(count))
+
+if __name__ == '__main__':
+    main()
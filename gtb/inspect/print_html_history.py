@@ -1,5 +1,7 @@
 # Print active orderbook as an HTML table
 
+from typing import List
+
 from gtb.core.context import Context
 from gtb.orders.order_book import OrderBook
 from gtb.orders.order_pair import OrderPair
@@ -10,49 +12,56 @@ from gtb.utils.logging import Log
 
 MAX_TRANSACTIONS: int = 20
 
-Log.INFO = False
-
-ctx: Context = Context()
-ctx.history.read_fs()
-
-# Table Header
-print("<TABLE border=1 cellpadding=5>")
-print("  <TR>")
-for col in ["Time", "Algorithm", "Buy", "Sell", "Fees", "Total"]:
-    print("    <TH>{}</TH>".format(col))
-print("  </TR>")
-
-count = 0
-for pair in reversed(ctx.history.order_pairs):
-    if pair.status != OrderPair.Status.Complete:
-        continue
-
-    assert pair.buy.info is not None
-    assert pair.buy.info.final_usd is not None
-    assert pair.buy.info.final_fees is not None
-
-    print("  <TR>")
-    print("    <TD>{}</TD>".format(pair.event_time.strftime("%Y-%m-%d %H:%M:%S")))
-    print("    <TD>{}</TD>".format(pair.algorithm))
-    print("    <TD>${:.2f}</TD>".format(pair.buy.info.final_usd - pair.buy.info.final_fees))
-    if pair.sell and pair.sell.info and pair.sell.info.final_usd:
-        assert pair.sell is not None
-        assert pair.sell.info is not None
-        assert pair.sell.info.final_usd is not None
-        assert pair.sell.info.final_fees is not None
-        fees: float = pair.sell.info.final_fees + pair.buy.info.final_fees
-        total: float = pair.sell.info.final_usd - pair.buy.info.final_usd - pair.sell.info.final_fees
-        print("    <TD>${:.2f}</TD>".format(pair.sell.info.final_usd))
-        print("    <TD>${:.2f}</TD>".format(fees))
-        print("    <TD>${:.2f}</TD>".format(total))
-    else:
-        print("    <TD>&nbsp;</TD>")
-        print("    <TD>${:.2f}</TD>".format(pair.buy.info.final_fees))
-        print("    <TD>&nbsp;</TD>")
-    print("  </TR>")
-
-    count += 1
-    if count >= MAX_TRANSACTIONS:
-        break
-
-print("</TABLE>")
+def get_html_history(ctx: Context) -> str:
+    lines: List[str] = []
+
+    # Table Header
+    lines.append("<TABLE border=1 cellpadding=5>")
+    lines.append("  <TR>")
+    for col in ["Time", "Algorithm", "Buy", "Sell", "Fees", "Total"]:
+        lines.append("    <TH>{}</TH>".format(col))
+    lines.append("  </TR>")
+
+    count = 0
+    for pair in reversed(ctx.history.order_pairs):
+        if pair.status != OrderPair.Status.Complete:
+            continue
+
+        assert pair.buy.info is not None
+        assert pair.buy.info.final_usd is not None
+        assert pair.buy.info.final_fees is not None
+
+        lines.append("  <TR>")
+        lines.append("    <TD>{}</TD>".format(pair.event_time.strftime("%Y-%m-%d %H:%M:%S")))
+        lines.append("    <TD>{}</TD>".format(pair.algorithm))
+        lines.append("    <TD>${:.2f}</TD>".format(pair.buy.info.final_usd - pair.buy.info.final_fees))
+        if pair.sell and pair.sell.info and pair.sell.info.final_usd:
+            assert pair.sell is not None
+            assert pair.sell.info is not None
+            assert pair.sell.info.final_usd is not None
+            assert pair.sell.info.final_fees is not None
+            fees: float = pair.sell.info.final_fees + pair.buy.info.final_fees
+            total: float = pair.sell.info.final_usd - pair.buy.info.final_usd - pair.sell.info.final_fees
+            lines.append("    <TD>${:.2f}</TD>".format(pair.sell.info.final_usd))
+            lines.append("    <TD>${:.2f}</TD>".format(fees))
+            lines.append("    <TD>${:.2f}</TD>".format(total))
+        else:
+            lines.append("    <TD>&nbsp;</TD>")
+            lines.append("    <TD>${:.2f}</TD>".format(pair.buy.info.final_fees))
+            lines.append("    <TD>&nbsp;</TD>")
+        lines.append("  </TR>")
+
+        count += 1
+        if count >= MAX_TRANSACTIONS:
+            break
+
+    lines.append("</TABLE>")
+    return "".join([line + "\n" for line in lines])
+
+if __name__ == '__main__':
+    Log.INFO = False
+
+    ctx: Context = Context()
+    ctx.history.read_fs()
+
+    print(get_html_history(ctx), end="")
@@ -1,5 +1,7 @@
 # Print active orderbook as an HTML table
 
+from typing import List
+
 from gtb.core.context import Context
 from gtb.orders.order_book import OrderBook
 from gtb.orders.order_pair import OrderPair
@@ -8,20 +10,6 @@ from gtb.market.prices import MarketPrices
 from gtb.utils.maths import floor_usd
 from gtb.utils.logging import Log
 
-Log.INFO = False
-
-ctx: Context = Context()
-ctx.order_book.read_fs()
-
-market: MarketPrices = get_current_market(ctx)
-
-# Table Header
-print("<TABLE border=1 cellpadding=5>")
-print("  <TR>")
-for col in ["Status", "Buy", "Sell", "Algorithm", "Position"]:
-    print("    <TH>{}</TH>".format(col))
-print("  </TR>")
-
 # Sort orders by price
 def sort_price(pair: OrderPair) -> float:
     if pair.sell and pair.status in [
@@ -33,37 +21,57 @@ def sort_price(pair: OrderPair) -> float:
         return pair.buy.info.final_market
     else:
         return pair.buy.get_limit_price()
-ctx.order_book.order_pairs.sort(key=sort_price)
 
-def print_market() -> None:
-    print("  <TR>")
-    print("    <TD><B>{}</B></TD>".format("Market"))
-    print("    <TD>{:.2f}</TD>".format(floor_usd(market.bid)))
-    print("    <TD>{:.2f}</TD>".format(floor_usd(market.ask)))
-    print("    <TD>{}</TD>".format("&nbsp;"))
-    print("    <TD>{}</TD>".format("&nbsp;"))
-    print("  </TR>")
+def get_html_orders(ctx: Context, market: MarketPrices) -> str:
+    lines: List[str] = []
 
-market_printed: bool = False
-for pair in ctx.order_book.order_pairs:
-    price: float = sort_price(pair)
+    # Table Header
+    lines.append("<TABLE border=1 cellpadding=5>")
+    lines.append("  <TR>")
+    for col in ["Status", "Buy", "Sell", "Algorithm", "Position"]:
+        lines.append("    <TH>{}</TH>".format(col))
+    lines.append("  </TR>")
 
-    if not market_printed and price > market.split:
-        market_printed = True
-        print_market()
+    def add_market() -> None:
+        lines.append("  <TR>")
+        lines.append("    <TD><B>{}</B></TD>".format("Market"))
+        lines.append("    <TD>{:.2f}</TD>".format(floor_usd(market.bid)))
+        lines.append("    <TD>{:.2f}</TD>".format(floor_usd(market.ask)))
+        lines.append("    <TD>{}</TD>".format("&nbsp;"))
+        lines.append("    <TD>{}</TD>".format("&nbsp;"))
+        lines.append("  </TR>")
 
-    print("  <TR>")
-    print("    <TD>{}</TD>".format(pair.status.name))
-    print("    <TD>{:.2f}</TD>".format(pair.buy.get_limit_price()))
-    if pair.sell:
-        print("    <TD>{:.2f}</TD>".format(pair.sell.get_limit_price()))
-    else:
-        print("    <TD>&nbsp;</TD>")
-    print("    <TD>{}</TD>".format(pair.algorithm))
-    print("    <TD>${:.2f}</TD>".format(pair.buy.usd))
-    print("  </TR>")
+    market_printed: bool = False
+    for pair in sorted(ctx.order_book.order_pairs, key=sort_price):
+        price: float = sort_price(pair)
+
+        if not market_printed and price > market.split:
+            market_printed = True
+            add_market()
+
+        lines.append("  <TR>")
+        lines.append("    <TD>{}</TD>".format(pair.status.name))
+        lines.append("    <TD>{:.2f}</TD>".format(pair.buy.get_limit_price()))
+        if pair.sell:
+            lines.append("    <TD>{:.2f}</TD>".format(pair.sell.get_limit_price()))
+        else:
+            lines.append("    <TD>&nbsp;</TD>")
+        lines.append("    <TD>{}</TD>".format(pair.algorithm))
+        lines.append("    <TD>${:.2f}</TD>".format(pair.buy.usd))
+        lines.append("  </TR>")
+
+    if not market_printed:
+        add_market()
+
+    lines.append("</TABLE>")
+    return "".join([line + "\n" for line in lines])
+
+if __name__ == '__main__':
+    Log.INFO = False
+
+    ctx: Context = Context()
+    ctx.order_book.read_fs()
 
-if not market_printed:
-    print_market()
+    market: MarketPrices = get_current_market(ctx)
 
-print("</TABLE>")
+    print(get_html_orders(ctx, market), end="")
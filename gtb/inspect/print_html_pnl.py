@@ -1,5 +1,8 @@
 # Print profits and losses by algorithm as an HTML table
 
+from datetime import datetime
+from typing import List
+
 from gtb.core.context import Context
 from gtb.orders.order_book import OrderBook
 from gtb.orders.order_pair import OrderPair
@@ -8,127 +11,137 @@ from gtb.market.prices import MarketPrices
 from gtb.utils.maths import floor_usd
 from gtb.utils.logging import Log
 
-Log.INFO = False
-
-ctx: Context = Context()
-ctx.order_book.read_fs()
-ctx.history.read_fs()
-ctx.history.prune("2024-03-26 15:30:00")
-
-market: MarketPrices = get_current_market(ctx)
-
-# Table Header
-print("<TABLE border=1 cellpadding=5>")
-print("  <TR>")
-for col in ["Algorithm", "Finalized", "Pending", "Total"]:
-    print("    <TH>{}</TH>".format(col))
-print("  </TR>")
-
-hodl_usd: float = 0.0
-hodl_btc: float = 0.0
-
-spread_finalized: float = 0.0
-allin_finalized: float = 0.0
-
-# Read in finalized orders
-for pair in ctx.history.order_pairs:
-    if pair.status != OrderPair.Status.Complete:
-        continue
-
-    assert pair.buy.info is not None
-    assert pair.buy.info.final_usd is not None
-    assert pair.buy.info.final_fees is not None
-
-    algorithm = pair.algorithm.split("-")[0]
-    if algorithm == "HODL":
-        hodl_usd += pair.buy.info.final_usd
-        #hodl_usd -= pair.buy.info.final_fees
-        hodl_btc += pair.buy.btc
-        continue
-
-    assert pair.sell is not None
-    assert pair.sell.info is not None
-    assert pair.sell.info.final_usd is not None
-    assert pair.sell.info.final_fees is not None
-
-    if algorithm == "Spread":
-        spread_finalized -= pair.buy.info.final_usd
-        #spread_finalized -= pair.buy.info.final_fees
-        spread_finalized += pair.sell.info.final_usd
-        spread_finalized -= pair.sell.info.final_fees
-    elif algorithm == "AllIn":
-        allin_finalized -= pair.buy.info.final_usd
-        #allin_finalized -= pair.buy.info.final_fees
-        allin_finalized += pair.sell.info.final_usd
-        allin_finalized -= pair.sell.info.final_fees
-
-# Read in pending orders
-spread_pending_btc: float = 0.0
-spread_pending_usd: float = 0.0
-allin_pending_btc: float = 0.0
-allin_pending_usd: float = 0.0
-for pair in ctx.order_book.order_pairs:
-    if not pair.status in [
-        OrderPair.Status.OnHoldSell,
-        OrderPair.Status.PendingSell,
-        OrderPair.Status.ActiveSell,
-    ]:
-        continue
-
-    assert pair.buy.info is not None
-    assert pair.buy.info.final_usd is not None
-    assert pair.buy.info.final_fees is not None
-
-    algorithm = pair.algorithm.split("-")[0]
-    if algorithm == "Spread":
-        spread_pending_btc += pair.buy.btc
-        spread_pending_usd += pair.buy.info.final_usd
-        #spread_pending_usd += pair.buy.info.final_fees
-    elif algorithm == "AllIn":
-        allin_pending_btc += pair.buy.btc
-        allin_pending_usd += pair.buy.info.final_usd
-        #allin_pending_usd += pair.buy.info.final_fees
-
-# Print HODL
-hodl_current: float = hodl_btc * market.bid
-hodl_fees: float = hodl_current * 0.0007
-hodl_final: float = hodl_current - hodl_usd - hodl_fees
-print("  <TR>")
-print("    <TD>HODL</TD>")
-print("    <TD>${:.2f}</TD>".format(hodl_final))
-print("    <TD>&nbsp;</TD>")
-print("    <TD>${:.2f}</TD>".format(hodl_final))
-print("  </TR>")
-
-# Print spread
-spread_to_sell: float = spread_pending_btc * market.bid
-spread_to_sell_fees: float = spread_to_sell * 0.0007
-spread_pending: float = spread_to_sell - spread_pending_usd - spread_to_sell_fees
-print("  <TR>")
-print("    <TD>Spread</TD>")
-print("    <TD>${:.2f}</TD>".format(spread_finalized))
-print("    <TD>${:.2f}</TD>".format(spread_pending))
-print("    <TD>${:.2f}</TD>".format(spread_finalized + spread_pending))
-print("  </TR>")
-
-# Print AllIn
-allin_to_sell: float = allin_pending_btc * market.bid
-allin_to_sell_fees: float = allin_to_sell * 0.0007
-allin_pending: float = allin_to_sell - allin_pending_usd - allin_to_sell_fees
-print("  <TR>")
-print("    <TD>AllIn</TD>")
-print("    <TD>${:.2f}</TD>".format(allin_finalized))
-print("    <TD>${:.2f}</TD>".format(allin_pending))
-print("    <TD>${:.2f}</TD>".format(allin_finalized + allin_pending))
-print("  </TR>")
-
-print("  <TR>")
-print("    <TD>Total</TD>")
-print("    <TD>${:.2f}</TD>".format(hodl_final + spread_finalized + allin_finalized))
-print("    <TD>${:.2f}</TD>".format(spread_pending + allin_pending))
-print("    <TD><B>${:.2f}</B></TD>".format(hodl_final + spread_finalized + spread_pending + allin_pending))
-print("  </TR>")
-
-
-# End table
-print("</TABLE>")
+# History before this is not counted
+PNL_START: datetime = datetime.strptime("2024-03-26 15:30:00", "%Y-%m-%d %H:%M:%S")
+
+def get_html_pnl(ctx: Context, market: MarketPrices) -> str:
+    lines: List[str] = []
+
+    # Table Header
+    lines.append("<TABLE border=1 cellpadding=5>")
+    lines.append("  <TR>")
+    for col in ["Algorithm", "Finalized", "Pending", "Total"]:
+        lines.append("    <TH>{}</TH>".format(col))
+    lines.append("  </TR>")
+
+    hodl_usd: float = 0.0
+    hodl_btc: float = 0.0
+
+    spread_finalized: float = 0.0
+    allin_finalized: float = 0.0
+
+    # Read in finalized orders
+    for pair in ctx.history.order_pairs:
+        if pair.status != OrderPair.Status.Complete:
+            continue
+        if pair.event_time < PNL_START:
+            continue
+
+        assert pair.buy.info is not None
+        assert pair.buy.info.final_usd is not None
+        assert pair.buy.info.final_fees is not None
+
+        algorithm = pair.algorithm.split("-")[0]
+        if algorithm == "HODL":
+            hodl_usd += pair.buy.info.final_usd
+            #hodl_usd -= pair.buy.info.final_fees
+            hodl_btc += pair.buy.btc
+            continue
+
+        assert pair.sell is not None
+        assert pair.sell.info is not None
+        assert pair.sell.info.final_usd is not None
+        assert pair.sell.info.final_fees is not None
+
+        if algorithm == "Spread":
+            spread_finalized -= pair.buy.info.final_usd
+            #spread_finalized -= pair.buy.info.final_fees
+            spread_finalized += pair.sell.info.final_usd
+            spread_finalized -= pair.sell.info.final_fees
+        elif algorithm == "AllIn":
+            allin_finalized -= pair.buy.info.final_usd
+            #allin_finalized -= pair.buy.info.final_fees
+            allin_finalized += pair.sell.info.final_usd
+            allin_finalized -= pair.sell.info.final_fees
+
+    # Read in pending orders
+    spread_pending_btc: float = 0.0
+    spread_pending_usd: float = 0.0
+    allin_pending_btc: float = 0.0
+    allin_pending_usd: float = 0.0
+    for pair in ctx.order_book.order_pairs:
+        if not pair.status in [
+            OrderPair.Status.OnHoldSell,
+            OrderPair.Status.PendingSell,
+            OrderPair.Status.ActiveSell,
+        ]:
+            continue
+
+        assert pair.buy.info is not None
+        assert pair.buy.info.final_usd is not None
+        assert pair.buy.info.final_fees is not None
+
+        algorithm = pair.algorithm.split("-")[0]
+        if algorithm == "Spread":
+            spread_pending_btc += pair.buy.btc
+            spread_pending_usd += pair.buy.info.final_usd
+            #spread_pending_usd += pair.buy.info.final_fees
+        elif algorithm == "AllIn":
+            allin_pending_btc += pair.buy.btc
+            allin_pending_usd += pair.buy.info.final_usd
+            #allin_pending_usd += pair.buy.info.final_fees
+
+    # Print HODL
+    hodl_current: float = hodl_btc * market.bid
+    hodl_fees: float = hodl_current * 0.0007
+    hodl_final: float = hodl_current - hodl_usd - hodl_fees
+    lines.append("  <TR>")
+    lines.append("    <TD>HODL</TD>")
+    lines.append("    <TD>${:.2f}</TD>".format(hodl_final))
+    lines.append("    <TD>&nbsp;</TD>")
+    lines.append("    <TD>${:.2f}</TD>".format(hodl_final))
+    lines.append("  </TR>")
+
+    # Print spread
+    spread_to_sell: float = spread_pending_btc * market.bid
+    spread_to_sell_fees: float = spread_to_sell * 0.0007
+    spread_pending: float = spread_to_sell - spread_pending_usd - spread_to_sell_fees
+    lines.append("  <TR>")
+    lines.append("    <TD>Spread</TD>")
+    lines.append("    <TD>${:.2f}</TD>".format(spread_finalized))
+    lines.append("    <TD>${:.2f}</TD>".format(spread_pending))
+    lines.append("    <TD>${:.2f}</TD>".format(spread_finalized + spread_pending))
+    lines.append("  </TR>")
+
+    # Print AllIn
+    allin_to_sell: float = allin_pending_btc * market.bid
+    allin_to_sell_fees: float = allin_to_sell * 0.0007
+    allin_pending: float = allin_to_sell - allin_pending_usd - allin_to_sell_fees
+    lines.append("  <TR>")
+    lines.append("    <TD>AllIn</TD>")
+    lines.append("    <TD>${:.2f}</TD>".format(allin_finalized))
+    lines.append("    <TD>${:.2f}</TD>".format(allin_pending))
+    lines.append("    <TD>${:.2f}</TD>".format(allin_finalized + allin_pending))
+    lines.append("  </TR>")
+
+    lines.append("  <TR>")
+    lines.append("    <TD>Total</TD>")
+    lines.append("    <TD>${:.2f}</TD>".format(hodl_final + spread_finalized + allin_finalized))
+    lines.append("    <TD>${:.2f}</TD>".format(spread_pending + allin_pending))
+    lines.append("    <TD><B>${:.2f}</B></TD>".format(hodl_final + spread_finalized + spread_pending + allin_pending))
+    lines.append("  </TR>")
+
+    # End table
+    lines.append("</TABLE>")
+    return "".join([line + "\n" for line in lines])
+
+if __name__ == '__main__':
+    Log.INFO = False
+
+    ctx: Context = Context()
+    ctx.order_book.read_fs()
+    ctx.history.read_range(PNL_START, None)
+
+    market: MarketPrices = get_current_market(ctx)
+
+    print(get_html_pnl(ctx, market), end="")
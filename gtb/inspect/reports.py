@@ -0,0 +1,135 @@
+import os
+import numpy
+
+from datetime import datetime
+from dateutil.relativedelta import relativedelta
+from threading import Lock
+from typing import Dict, List
+
+from gtb.core.context import Context
+from gtb.inspect.print_html_history import get_html_history
+from gtb.inspect.print_html_orders import get_html_orders
+from gtb.inspect.print_html_pnl import get_html_pnl
+from gtb.inspect.print_html_spread_stats import get_html_spread_stats
+from gtb.market.prices import MarketPrices
+from gtb.market.ticks import MarketTicks
+from gtb.orders.history import OrderHistory
+from gtb.orders.order_book import OrderBook
+from gtb.orders.order_pair import OrderPair
+from gtb.utils.files import get_file_signature
+
+from coinbase.rest import rest_base
+
+# Long-lived HTML reports over the bot state, re-reading files only when they change
+#
+# Runs in the web server, so it only reads the bot's files and never holds the API key.
+# The wallet report needs the exchange and stays behind the sudo helper.
+class ReportService():
+    # Reuse the market price across page views
+    MARKET_SECONDS: int = 5
+
+    # Bot directory the reports are read from
+    root: str
+    ctx: Context
+    book_signature: List[list]
+    history_signature: List[list]
+    # Parsed pairs and file signature of each history segment
+    segments: Dict[str, List[OrderPair]]
+    segment_signatures: Dict[str, list]
+    market: MarketPrices | None
+    market_time: datetime
+    mtx: Lock
+
+    def __init__(self, root: str) -> None:
+        self.root = os.path.abspath(root)
+        # Unauthenticated client, nothing here talks to the exchange
+        self.ctx = Context(api=rest_base.RESTBase(api_key=None, api_secret=None))
+        self.ctx.history = OrderHistory(self.root)
+        self.ctx.order_book = OrderBook(root=self.root)
+        self.book_signature = []
+        self.history_signature = []
+        self.segments = {}
+        self.segment_signatures = {}
+        self.market = None
+        self.market_time = datetime.now()
+        self.mtx = Lock()
+
+    def refresh_book(self) -> None:
+        signature: List[list] = get_file_signature([self.ctx.order_book.file, self.ctx.order_book.journal_file])
+        if signature == self.book_signature:
+            return None
+
+        # The orderbook is small, read the snapshot and journal again
+        # Read only, a record the bot is still appending is left for the next refresh
+        order_book: OrderBook = OrderBook(root=self.root)
+        order_book.read_fs()
+        self.ctx.order_book = order_book
+        self.book_signature = signature
+
+    def refresh_history(self) -> None:
+        history: OrderHistory = self.ctx.history
+
+        # Not migrated to segments yet
+        if not os.path.exists(history.index_file):
+            signature: List[list] = get_file_signature([history.file])
+            if signature != self.history_signature:
+                history.read_fs()
+                self.history_signature = signature
+            return None
+
+        # The segment files themselves, the index can lag behind them
+        segments: List[str] = history.get_segments()
+        signature = get_file_signature([history.get_segment_file(x) for x in segments])
+        if signature == self.history_signature:
+            return None
+
+        # Only read segments that changed
+        for segment in list(self.segments.keys()):
+            if not segment in segments:
+                self.segments.pop(segment)
+                self.segment_signatures.pop(segment)
+        for segment, segment_signature in zip(segments, signature):
+            if self.segment_signatures.get(segment) != segment_signature:
+                self.segments[segment] = history.read_segment(segment)
+                self.segment_signatures[segment] = segment_signature
+
+        order_pairs: List[OrderPair] = []
+        for segment in sorted(self.segments.keys()):
+            order_pairs += self.segments[segment]
+        history.order_pairs = order_pairs
+        self.history_signature = signature
+
+    # Latest market price the bot recorded
+    def get_market(self) -> MarketPrices:
+        if not self.market or self.market_time + relativedelta(seconds=ReportService.MARKET_SECONDS) < datetime.now():
+            tick: numpy.void | None = MarketTicks(os.path.join(self.root, "data/ticks")).read_latest()
+            if tick is None:
+                raise Exception("No market data.")
+            self.market = MarketPrices(
+                bid=float(tick['bid']),
+                ask=float(tick['ask']),
+                updated=datetime.fromtimestamp(float(tick['time'])),
+            )
+            self.market_time = datetime.now()
+        return self.market
+
+    def get_pnl_html(self) -> str:
+        with self.mtx:
+            self.refresh_book()
+            self.refresh_history()
+            return get_html_pnl(self.ctx, self.get_market())
+
+    def get_orders_html(self) -> str:
+        with self.mtx:
+            self.refresh_book()
+            return get_html_orders(self.ctx, self.get_market())
+
+    def get_history_html(self) -> str:
+        with self.mtx:
+            self.refresh_history()
+            return get_html_history(self.ctx)
+
+    def get_spread_stats_html(self) -> str:
+        with self.mtx:
+            self.refresh_history()
+            return get_html_spread_stats(self.ctx)
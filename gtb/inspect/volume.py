@@ -1,4 +1,5 @@
 import io
+import numpy
 import matplotlib
 import matplotlib.pyplot as plt
 from scipy.interpolate import interp1d
@@ -19,13 +20,18 @@ def create_demand_plot() -> None:
     MAX_WINDOW = 2000
     SAMPLE_PERIOD = 10
 
+    # Depth at every window in one pass (index 0 is window 1)
+    windows: numpy.ndarray = numpy.arange(1, MAX_WINDOW + 1)
+    all_bids: numpy.ndarray = volume.get_bids_many(windows)
+    all_asks: numpy.ndarray = volume.get_asks_many(windows)
+
     market_delta: List[int] = []
     demand: List[float] = []
     window: int = 1
     roots: List[int] = []
     while window <= MAX_WINDOW:
-        bid = volume.get_bids(window)
-        ask = volume.get_asks(window)
+        bid = all_bids[window - 1]
+        ask = all_asks[window - 1]
         if bid <= 0 or ask <= 0:
             window += 1
             continue
@@ -42,8 +48,8 @@ def create_demand_plot() -> None:
 
             if change != 0:
                 for subwindow in range(market_delta[-2], market_delta[-1] + 1):
-                    bid = volume.get_bids(subwindow)
-                    ask = volume.get_asks(subwindow)
+                    bid = all_bids[subwindow - 1]
+                    ask = all_asks[subwindow - 1]
                     if bid <= 0 or ask <= 0:
                         continue
                     curdemand: float = bid / ask
@@ -88,10 +94,16 @@ def create_volume_plot() -> None:
     demand: List[float] = []
     bids: List[float] = []
     asks: List[float] = []
+
+    # Depth at every window in one pass (index 0 is window 1)
+    windows: numpy.ndarray = numpy.arange(1, MAX_WINDOW + 1)
+    all_bids: numpy.ndarray = volume.get_bids_many(windows)
+    all_asks: numpy.ndarray = volume.get_asks_many(windows)
+
     window: int = 1
     while window <= MAX_WINDOW:
-        bid = volume.get_bids(window)
-        ask = volume.get_asks(window)
+        bid = all_bids[window - 1]
+        ask = all_asks[window - 1]
         if bid <= 0 and ask <= 0:
             window += 1
             continue
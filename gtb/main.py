@@ -1,6 +1,8 @@
 import signal
+import argparse
 from functools import partial
 
+from gtb.core.async_bot import AsyncBot
 from gtb.core.bot import Bot
 from gtb.core.version import VERSION
 from gtb.utils.logging import Log
@@ -24,7 +26,20 @@ def run_bot() -> None:
     bot.join()
     Log.info("Exiting")
 
+def run_async_bot() -> None:
+    Log.info("Starting version {} (asyncio)".format(VERSION))
+
+    # Runs until SIGINT/SIGTERM
+    AsyncBot().run()
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ghw Trade Bot")
+    parser.add_argument("--asyncio", action="store_true", help="Run bot threads as tasks on an asyncio event loop")
+    args = parser.parse_args()
+
     Log.DEBUG = True
     Log.TRACE = True
-    run_bot()
+    if args.asyncio:
+        run_async_bot()
+    else:
+        run_bot()
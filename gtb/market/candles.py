@@ -0,0 +1,247 @@
+import os
+import json
+
+from datetime import datetime
+from typing import Dict, List
+
+from gtb.market.reader import MarketReader, MarketSeries
+from gtb.utils.files import truncate_partial_line
+from gtb.utils.logging import Log
+
+# Open/high/low/close of the smoothed market split over a period
+class Candle():
+    time: datetime
+    open: float
+    high: float
+    low: float
+    close: float
+
+    def __init__(self, time: datetime, value: float) -> None:
+        self.time = time
+        self.open = value
+        self.high = value
+        self.low = value
+        self.close = value
+
+    def add(self, value: float) -> None:
+        self.high = max(self.high, value)
+        self.low = min(self.low, value)
+        self.close = value
+
+    def to_csv(self) -> str:
+        return "{},{},{},{},{}\n".format(self.time.timestamp(), self.open, self.high, self.low, self.close)
+
+    @staticmethod
+    def from_csv(line: str) -> 'Candle':
+        fields: List[str] = line.split(",")
+        ret: Candle = Candle(datetime.fromtimestamp(float(fields[0])), float(fields[1]))
+        ret.high = float(fields[2])
+        ret.low = float(fields[3])
+        ret.close = float(fields[4])
+        return ret
+
+    def to_dict(self) -> dict:
+        return {
+            'time': self.time.timestamp(),
+            'open': self.open,
+            'high': self.high,
+            'low': self.low,
+            'close': self.close,
+        }
+
+    @staticmethod
+    def from_dict(data: dict) -> 'Candle':
+        ret: Candle = Candle(datetime.fromtimestamp(data['time']), data['open'])
+        ret.high = data['high']
+        ret.low = data['low']
+        ret.close = data['close']
+        return ret
+
+# Market history aggregated into coarser candles, built incrementally from the minute market file
+class MarketCandles():
+    # Written by CurrentMarketThread once a minute
+    market_file: str = "data/market.csv"
+    dir: str = "data/candles"
+    state_file: str = "data/candles/state.json"
+
+    # Seconds in each resolution
+    MINUTE: str = "1m"
+    RESOLUTIONS: Dict[str, int] = {
+        "1m": 60,
+        "15m": 15 * 60,
+        "1h": 60 * 60,
+    }
+    # Most points to plot for a time range
+    MAX_POINTS: int = 2000
+    # Bytes of the market file to aggregate at a time
+    BLOCK_SIZE: int = 1024 * 1024
+
+    # Bytes of the market file already aggregated
+    offset: int
+    # Candle still being built for each resolution
+    current: Dict[str, Candle]
+
+    def __init__(self) -> None:
+        self.offset = 0
+        self.current = {}
+
+    def read_state(self) -> None:
+        if not os.path.exists(MarketCandles.state_file):
+            return None
+        with open(MarketCandles.state_file, "r") as fp:
+            data: dict = json.loads(fp.read())
+        self.offset = data['offset']
+        self.current = {}
+        for resolution, candle in data['current'].items():
+            self.current[resolution] = Candle.from_dict(candle)
+
+    def write_state(self) -> None:
+        # Write atomically so readers never see a partial state
+        tmp_file: str = MarketCandles.state_file + ".tmp"
+        with open(tmp_file, "w") as fp:
+            fp.write(json.dumps({
+                'offset': self.offset,
+                'current': {x: self.current[x].to_dict() for x in self.current},
+            }))
+        os.replace(tmp_file, MarketCandles.state_file)
+
+    def get_file(self, resolution: str) -> str:
+        return os.path.join(MarketCandles.dir, resolution + ".csv")
+
+    # Aggregate market data written since the last update
+    def update(self) -> None:
+        if not os.path.exists(MarketCandles.market_file):
+            return None
+
+        # Create directory
+        if not os.path.exists(MarketCandles.dir):
+            os.makedirs(MarketCandles.dir)
+
+        self.read_state()
+
+        # Market file was replaced, start over
+        if os.path.getsize(MarketCandles.market_file) < self.offset:
+            Log.info("Market data truncated, rebuilding candles.")
+            self.offset = 0
+            self.current = {}
+            for resolution in MarketCandles.RESOLUTIONS:
+                if os.path.exists(self.get_file(resolution)):
+                    os.remove(self.get_file(resolution))
+
+        # Time of the last candle written at each resolution
+        # A crash after writing candles but before saving the offset aggregates them again
+        last: Dict[str, float] = {}
+        for resolution in MarketCandles.RESOLUTIONS:
+            if resolution != MarketCandles.MINUTE:
+                last[resolution] = self.read_last_time(resolution)
+
+        # Bounded reads, the first build aggregates the whole file
+        with open(MarketCandles.market_file, "rb") as fp:
+            while True:
+                fp.seek(self.offset)
+                data: bytes = fp.read(MarketCandles.BLOCK_SIZE)
+
+                # Only whole lines, the last may still be written
+                end: int = data.rfind(b"\n") + 1
+                if end == 0:
+                    return None
+
+                self.aggregate(data[:end], last)
+                self.offset += end
+                self.write_state()
+
+    def aggregate(self, data: bytes, last: Dict[str, float]) -> None:
+        completed: Dict[str, List[Candle]] = {x: [] for x in last}
+        for line in data.decode().split("\n"):
+            fields: List[str] = line.split(",")
+            try:
+                when: datetime = datetime.strptime(fields[0], "%Y-%m-%d %H:%M:%S")
+                # Smoothed split
+                split: float = (float(fields[3]) + float(fields[4])) / 2
+            except (ValueError, IndexError):
+                continue
+            self.add(when, split, completed)
+
+        # Write, skipping candles already in the file
+        for resolution, candles in completed.items():
+            candles = [x for x in candles if x.time.timestamp() > last[resolution]]
+            if len(candles) == 0:
+                continue
+            with open(self.get_file(resolution), "a") as fp:
+                fp.write("".join([x.to_csv() for x in candles]))
+            last[resolution] = candles[-1].time.timestamp()
+
+    # Time of the last whole candle in the file
+    def read_last_time(self, resolution: str) -> float:
+        file: str = self.get_file(resolution)
+        if not os.path.exists(file):
+            return 0.0
+
+        # Don't append after a torn line
+        truncate_partial_line(file)
+        with open(file, "rb") as fp:
+            size: int = fp.seek(0, os.SEEK_END)
+            fp.seek(max(0, size - 4096))
+            lines: List[bytes] = fp.read().split(b"\n")
+        for line in reversed(lines):
+            try:
+                return float(line[:line.index(b",")])
+            except ValueError:
+                continue
+        return 0.0
+
+    def add(self, when: datetime, value: float, completed: Dict[str, List[Candle]]) -> None:
+        epoch: float = when.timestamp()
+        for resolution in completed:
+            period: int = MarketCandles.RESOLUTIONS[resolution]
+            start: datetime = datetime.fromtimestamp(epoch - (epoch % period))
+            candle: Candle | None = self.current.get(resolution)
+            if candle and candle.time == start:
+                candle.add(value)
+            elif not candle or candle.time < start:
+                if candle:
+                    completed[resolution].append(candle)
+                self.current[resolution] = Candle(start, value)
+
+    # Finest resolution that keeps the plot under the max points
+    @staticmethod
+    def get_resolution(start: datetime, end: datetime) -> str:
+        seconds: float = (end - start).total_seconds()
+        for resolution, period in MarketCandles.RESOLUTIONS.items():
+            if seconds / period <= MarketCandles.MAX_POINTS:
+                return resolution
+        return list(MarketCandles.RESOLUTIONS.keys())[-1]
+
+    # Candles overlapping [start, end)
+    def read_range(self, resolution: str, start: datetime, end: datetime) -> List[Candle]:
+        if resolution == MarketCandles.MINUTE:
+            return self.read_minutes(start, end)
+
+        ret: List[Candle] = []
+        begin: float = start.timestamp() - MarketCandles.RESOLUTIONS[resolution]
+        if os.path.exists(self.get_file(resolution)):
+            with open(self.get_file(resolution), "r") as fp:
+                for line in fp:
+                    try:
+                        # Ends before the range
+                        if float(line[:line.index(",")]) <= begin:
+                            continue
+                        candle: Candle = Candle.from_csv(line)
+                    except (ValueError, IndexError):
+                        continue
+                    if candle.time >= end:
+                        break
+                    ret.append(candle)
+
+        # Candle still being built
+        self.read_state()
+        current: Candle | None = self.current.get(resolution)
+        if current and current.time.timestamp() > begin and current.time < end and (len(ret) == 0 or ret[-1].time < current.time):
+            ret.append(current)
+        return ret
+
+    # Market file as one minute candles
+    def read_minutes(self, start: datetime, end: datetime) -> List[Candle]:
+        series: MarketSeries = MarketReader(MarketCandles.market_file).read_range(start, end)
+        splits: List[float] = ((series.smooth_bid + series.smooth_ask) / 2).tolist()
+        return [Candle(when, split) for when, split in zip(series.get_times(), splits)]
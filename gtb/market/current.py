@@ -1,12 +1,19 @@
 import os
 import time
-import copy
+import asyncio
 from datetime import datetime
 from dateutil.relativedelta import relativedelta
 
+from gtb.market.candles import MarketCandles
 from gtb.market.prices import MarketPrices
+from gtb.market.snapshot import MarketSnapshot
+from gtb.market.top import MarketTop
+from gtb.market.ticks import MarketTicks
+from gtb.core.clock import Clock
 from gtb.core.thread import BotThread
 from gtb.core.context import Context
+from gtb.core.events import Event
+from gtb.core.settings import Settings
 from gtb.utils.logging import Log
 from gtb.utils.maths import floor_usd
 
@@ -14,17 +21,17 @@ from coinbase.rest import products
 
 def get_current_market(ctx: Context) -> MarketPrices:
     # BTC-USD: Base BTC, Quote USD
-    data = products.get_best_bid_ask(ctx.api, product_ids=["BTC-USD"])
-
-    ret = MarketPrices()
-    ret.updated = datetime.now()
-    # Buy price
-    ret.bid = float(data['pricebooks'][0]['bids'][0]['price'])
-    # Sell price
-    ret.ask = float(data['pricebooks'][0]['asks'][0]['price'])
-    # Half point
-    ret.split = round((ret.bid + ret.ask) / 2, 16)
-    return ret
+    return get_market_prices(products.get_best_bid_ask(ctx.api, product_ids=["BTC-USD"]))
+
+# Interpret a best bid/ask response
+def get_market_prices(data) -> MarketPrices:
+    return MarketPrices(
+        # Buy price
+        bid=float(data['pricebooks'][0]['bids'][0]['price']),
+        # Sell price
+        ask=float(data['pricebooks'][0]['asks'][0]['price']),
+        updated=Clock.now(),
+    )
 
 # Keep track of the current market bid/ask
 class CurrentMarketThread(BotThread):
@@ -32,12 +39,20 @@ class CurrentMarketThread(BotThread):
 
     max_change_per_minute: float
     next_write: datetime
+    feed_active: bool
+    candles: MarketCandles
+    ticks: MarketTicks
+    # Set from the feed thread on each push, asyncio runtime only
+    feed_wakeup: asyncio.Event | None
 
     def __init__(self, ctx: Context) -> None:
-        super().__init__(ctx, sleep_seconds = 0)
-        # smooth = 0.1% change per minute max
-        self.max_change_per_minute = 0.001
-        self.next_write = datetime.now()
+        super().__init__(ctx, sleep_seconds = Settings.MARKET_POLL_SECONDS)
+        self.max_change_per_minute = Settings.MARKET_SMOOTH_CHANGE_PER_MINUTE
+        self.next_write = Clock.now()
+        self.feed_active = False
+        self.candles = MarketCandles()
+        self.ticks = MarketTicks()
+        self.feed_wakeup = None
 
     def init(self) -> None:
         self.init_current_market()
@@ -48,6 +63,9 @@ class CurrentMarketThread(BotThread):
         if not os.path.exists(os.path.dirname(CurrentMarketThread.file)):
             os.makedirs(os.path.dirname(CurrentMarketThread.file))
 
+        # Catch up on market data written before the candles existed
+        self.update_candles()
+
     def init_current_market(self) -> None:
         # Make sure we have the current market data before any other threads start
         while True:
@@ -56,13 +74,15 @@ class CurrentMarketThread(BotThread):
                 time.sleep(1)
                 continue
             assert data is not None
-            self.ctx.current_market = data
-            self.ctx.smooth_market = copy.deepcopy(data)
+            self.publish(data, data, self.ctx.market_top)
             break
 
     def init_market_top(self) -> None:
-        self.ctx.market_top.price = self.ctx.current_market.bid - 200
-        self.ctx.market_top.last_update = datetime.now()
+        self.publish(self.ctx.current_market, self.ctx.smooth_market, MarketTop(self.ctx.current_market.bid - 200))
+
+    # Replace the market snapshot, readers keep whichever one they already took
+    def publish(self, current: MarketPrices, smooth: MarketPrices, top: MarketTop) -> None:
+        self.ctx.market = MarketSnapshot(current, smooth, top, self.ctx.market.sequence + 1)
 
     def think(self) -> None:
         # Get the current market data
@@ -71,6 +91,20 @@ class CurrentMarketThread(BotThread):
             return None
         assert current_market is not None
 
+        self.update(current_market)
+
+    def is_async(self) -> bool:
+        return True
+
+    async def think_async(self) -> None:
+        current_market: MarketPrices | None = await self.retrieve_async()
+        if not current_market:
+            return None
+
+        # Writes the tick, market and candle files
+        await asyncio.get_running_loop().run_in_executor(None, self.update, current_market)
+
+    def update(self, current_market: MarketPrices) -> None:
         # Blend old and new data
         old_bid: float = self.ctx.smooth_market.bid
         old_ask: float = self.ctx.smooth_market.ask
@@ -87,60 +121,155 @@ class CurrentMarketThread(BotThread):
         new_split: float = floor_usd((new_ask + new_bid) / 2)
 
         # Save update
-        self.ctx.current_market = current_market
-        self.ctx.smooth_market.bid = new_bid
-        self.ctx.smooth_market.ask = new_ask
-        self.ctx.smooth_market.split = new_split
-        self.ctx.smooth_market.updated = current_market.updated
+        before: MarketSnapshot = self.ctx.market
+        self.publish(
+            current_market,
+            MarketPrices(new_bid, new_ask, new_split, current_market.updated),
+            self.blend_top(Clock.now(), new_split),
+        )
+        market: MarketSnapshot = self.ctx.market
+
+        # Full resolution history
+        self.write_tick()
 
-        self.blend_top(datetime.now(), new_split)
+        # Only wake the traders when the prices moved
+        if self.is_changed(before, market):
+            self.ctx.events.publish(Event.Market)
 
         # Write market data to filesystem every minute
-        if self.next_write <= datetime.now():
-            self.next_write = datetime.now() + relativedelta(minutes=1)
+        if self.next_write <= Clock.now():
+            self.next_write = Clock.now() + relativedelta(minutes=1)
 
             # Log
             Log.trace("Market: [ {:.2f} | {:.2f} ] -> Smooth: [ {:.2f} | {:.2f} ] -> Top: {:.2f}".format(
-                floor_usd(self.ctx.current_market.bid),
-                floor_usd(self.ctx.current_market.ask),
-                floor_usd(self.ctx.smooth_market.bid),
-                floor_usd(self.ctx.smooth_market.ask),
-                self.ctx.market_top.price,
+                floor_usd(market.current.bid),
+                floor_usd(market.current.ask),
+                floor_usd(market.smooth.bid),
+                floor_usd(market.smooth.ask),
+                market.top.price,
             ))
 
             # To file
             with open(CurrentMarketThread.file, "a") as fp:
                 fp.write("{},{},{},{},{},{:.2f}\n".format(
-                    datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                    self.ctx.current_market.bid,
-                    self.ctx.current_market.ask,
-                    self.ctx.smooth_market.bid,
-                    self.ctx.smooth_market.ask,
-                    self.ctx.market_top.price,
+                    Clock.now().strftime("%Y-%m-%d %H:%M:%S"),
+                    market.current.bid,
+                    market.current.ask,
+                    market.smooth.bid,
+                    market.smooth.ask,
+                    market.top.price,
                 ))
+            self.update_candles()
+
+    def is_changed(self, before: MarketSnapshot, after: MarketSnapshot) -> bool:
+        return (
+            before.current.bid != after.current.bid or
+            before.current.ask != after.current.ask or
+            before.smooth.bid != after.smooth.bid or
+            before.smooth.ask != after.smooth.ask or
+            before.top.price != after.top.price
+        )
+
+    def write_tick(self) -> None:
+        market: MarketSnapshot = self.ctx.market
+        try:
+            self.ticks.append(
+                Clock.now(),
+                market.current.bid,
+                market.current.ask,
+                market.smooth.bid,
+                market.smooth.ask,
+                market.top.price,
+            )
+        except Exception as e:
+            Log.exception("Failed to write market tick", e)
+            self.ticks.close()
+
+    def should_wait(self) -> bool:
+        # Waiting on the feed already blocks until the next update
+        return not self.feed_active
+
+    def update_candles(self) -> None:
+        try:
+            self.candles.update()
+        except Exception as e:
+            Log.exception("Failed to update market candles", e)
+
+    # Whether the market feed is pushing updates to wait on
+    def check_feed(self) -> bool:
+        if Settings.MARKET_FEED_URL and not self.ctx.market_feed.is_stale():
+            if not self.feed_active:
+                Log.info("Market feed active.")
+                self.feed_active = True
+        elif self.feed_active:
+            Log.error("Market feed stale, polling market price.")
+            self.feed_active = False
+        return self.feed_active
 
     def retrieve(self) -> MarketPrices | None:
+        # Wait for the market feed to push an update
+        if self.check_feed():
+            pushed: MarketPrices | None = self.ctx.market_feed.wait(Settings.MARKET_FEED_TIMEOUT)
+            if pushed:
+                return pushed
+
+        # Poll the REST API
         try:
             return get_current_market(self.ctx)
         except Exception as e:
             Log.exception("Failed to get market price", e)
             return None
 
+    async def retrieve_async(self) -> MarketPrices | None:
+        if self.check_feed():
+            pushed: MarketPrices | None = await self.wait_feed(Settings.MARKET_FEED_TIMEOUT)
+            if pushed:
+                return pushed
+
+        # Poll the REST API without holding an executor worker
+        assert self.ctx.async_api is not None
+        try:
+            return get_market_prices(await self.ctx.async_api.get_best_bid_ask(["BTC-USD"]))
+        except Exception as e:
+            Log.exception("Failed to get market price", e)
+            return None
+
+    # Wait on the event loop for the market feed to push an update
+    async def wait_feed(self, timeout: float) -> MarketPrices | None:
+        if not self.feed_wakeup:
+            loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+            wakeup: asyncio.Event = asyncio.Event()
+            def wake() -> None:
+                # Pushes can still arrive after the runtime stopped
+                if not loop.is_closed():
+                    loop.call_soon_threadsafe(wakeup.set)
+            self.ctx.market_feed.add_listener(wake)
+            self.feed_wakeup = wakeup
+
+        self.feed_wakeup.clear()
+        pushed: MarketPrices | None = self.ctx.market_feed.take()
+        if pushed:
+            return pushed
+        try:
+            await asyncio.wait_for(self.feed_wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        return self.ctx.market_feed.take()
+
     def blend(self, current: float, new: float) -> float:
         positive: float = 1 if new > current else -1
         delta: float = abs((current - new) / current)
 
         # Don't change too fast
-        seconds: float = (datetime.now() - self.ctx.smooth_market.updated).total_seconds()
+        seconds: float = (Clock.now() - self.ctx.smooth_market.updated).total_seconds()
         max_delta: float = self.max_change_per_minute * (seconds / 60)
         if delta > max_delta:
             delta = max_delta
 
         return current + (current * delta * positive)
 
-    def blend_top(self, when: datetime, new: float) -> None:
-        max_change_per_minute: float = 0.0001
-        #max_change_per_minute: float = 0.00008
+    def blend_top(self, when: datetime, new: float) -> MarketTop:
+        max_change_per_minute: float = Settings.MARKET_TOP_CHANGE_PER_MINUTE
         current: float = self.ctx.market_top.price
         last_update: datetime = self.ctx.market_top.last_update
         positive: float = 1 if new > current else -1
@@ -155,5 +284,4 @@ class CurrentMarketThread(BotThread):
         if delta > max_delta:
             delta = max_delta
 
-        self.ctx.market_top.price = current + (current * delta * positive)
-        self.ctx.market_top.last_update = when
+        return MarketTop(current + (current * delta * positive), when)
@@ -0,0 +1,81 @@
+import json
+
+from datetime import datetime
+from threading import Condition
+from typing import Callable, List
+
+from gtb.core.clock import Clock
+from gtb.core.settings import Settings
+from gtb.market.prices import MarketPrices
+
+# Interpret a ticker channel push message
+def parse_ticker(message: str) -> MarketPrices | None:
+    data: dict = json.loads(message)
+    if data.get('channel') != "ticker":
+        return None
+
+    ret: MarketPrices | None = None
+    for event in data.get('events', []):
+        for ticker in event.get('tickers', []):
+            if ticker.get('product_id') != "BTC-USD":
+                continue
+            ret = MarketPrices(
+                # Buy price
+                bid=float(ticker['best_bid']),
+                # Sell price
+                ask=float(ticker['best_ask']),
+                updated=Clock.now(),
+            )
+    return ret
+
+# Most recent market data pushed from the websocket feed
+class MarketFeed():
+    latest: MarketPrices | None
+    last_message: datetime | None
+    cond: Condition
+    # Called after each push, from the feed thread
+    listeners: List[Callable[[], None]]
+
+    def __init__(self) -> None:
+        self.latest = None
+        self.last_message = None
+        self.cond = Condition()
+        self.listeners = []
+
+    def add_listener(self, func: Callable[[], None]) -> None:
+        with self.cond:
+            self.listeners.append(func)
+
+    def push(self, prices: MarketPrices) -> None:
+        with self.cond:
+            self.latest = prices
+            self.last_message = prices.updated
+            self.cond.notify_all()
+            listeners: List[Callable[[], None]] = list(self.listeners)
+        for func in listeners:
+            func()
+
+    def heartbeat(self) -> None:
+        with self.cond:
+            self.last_message = Clock.now()
+
+    # Wait for the next pushed market update
+    def wait(self, timeout: float) -> MarketPrices | None:
+        with self.cond:
+            if not self.latest:
+                self.cond.wait(timeout)
+            return self.take()
+
+    # Pushed market update not taken yet
+    def take(self) -> MarketPrices | None:
+        with self.cond:
+            ret: MarketPrices | None = self.latest
+            self.latest = None
+            return ret
+
+    def is_stale(self) -> bool:
+        with self.cond:
+            if not self.last_message:
+                return True
+            seconds: float = (Clock.now() - self.last_message).total_seconds()
+            return seconds > Settings.MARKET_FEED_TIMEOUT
@@ -1,7 +1,22 @@
 from datetime import datetime
 
+from gtb.core.clock import Clock
+
+# Immutable bid/ask at a point in time, make a new one instead of changing it
 class MarketPrices():
+    __slots__ = ("bid", "ask", "split", "updated")
+
     bid: float
     ask: float
     split: float
     updated: datetime
+
+    def __init__(self, bid: float = 0.0, ask: float = 0.0, split: float | None = None, updated: datetime | None = None) -> None:
+        object.__setattr__(self, "bid", bid)
+        object.__setattr__(self, "ask", ask)
+        # Half point
+        object.__setattr__(self, "split", split if split is not None else round((bid + ask) / 2, 16))
+        object.__setattr__(self, "updated", updated if updated else Clock.now())
+
+    def __setattr__(self, name: str, value: object) -> None:
+        raise AttributeError("MarketPrices is immutable")
@@ -0,0 +1,197 @@
+import io
+import os
+import mmap
+import numpy
+
+from datetime import datetime
+from typing import List, Tuple
+
+from gtb.utils.logging import Log
+
+# Columns of the market file over a time range
+class MarketSeries():
+    # datetime64[s] in the local time written to the file
+    time: numpy.ndarray
+    bid: numpy.ndarray
+    ask: numpy.ndarray
+    smooth_bid: numpy.ndarray
+    smooth_ask: numpy.ndarray
+    top: numpy.ndarray
+
+    def __init__(self, time: numpy.ndarray, values: numpy.ndarray) -> None:
+        self.time = time
+        self.bid = values[:, 0]
+        self.ask = values[:, 1]
+        self.smooth_bid = values[:, 2]
+        self.smooth_ask = values[:, 3]
+        self.top = values[:, 4]
+
+    def __len__(self) -> int:
+        return len(self.time)
+
+    def get_times(self) -> List[datetime]:
+        return self.time.astype(object).tolist()
+
+# Memory mapped market file with a sparse time index to seek to a range
+class MarketReader():
+    # Lines between index entries
+    INDEX_STEP: int = 256
+    # time,bid,ask,smooth bid,smooth ask,top
+    COLUMNS: int = 6
+
+    file: str
+    index_file: str
+    # (UTC epoch seconds, byte offset) of every INDEX_STEP-th line
+    # The file has local times, which step back when DST ends
+    index: numpy.ndarray
+
+    def __init__(self, file: str = "data/market.csv") -> None:
+        self.file = file
+        self.index_file = os.path.splitext(file)[0] + ".index"
+        self.index = numpy.zeros((0, 2), dtype=numpy.int64)
+
+    def read_index(self, data: mmap.mmap, size: int) -> None:
+        self.index = numpy.zeros((0, 2), dtype=numpy.int64)
+        if not os.path.exists(self.index_file):
+            return None
+        index: numpy.ndarray = numpy.fromfile(self.index_file, dtype=numpy.int64)
+        index = index[:len(index) - (len(index) % 2)].reshape(-1, 2)
+        if len(index) == 0:
+            return None
+
+        # Written over by another process at the same time
+        if numpy.any(numpy.diff(index[:, 0]) < 0) or numpy.any(numpy.diff(index[:, 1]) <= 0):
+            Log.info("Market index out of order, rebuilding.")
+            return None
+
+        # Market file was replaced
+        offset: int = int(index[-1][1])
+        try:
+            valid: bool = offset < size and self.get_key(data, offset, int(index[-1][0])) == index[-1][0]
+        except ValueError:
+            valid = False
+        if not valid:
+            Log.info("Market index out of date, rebuilding.")
+            return None
+        self.index = index
+
+    # UTC time of the line at an offset, the lines before it were at or after the last time
+    def get_key(self, data: mmap.mmap, offset: int, last: int) -> int:
+        return self.to_key(datetime.strptime(data[offset:offset + 19].decode(), "%Y-%m-%d %H:%M:%S"), last)
+
+    # The repeated hour when DST ends is the second one if the first would go back in time
+    def to_key(self, when: datetime, last: int = 0) -> int:
+        key: int = int(when.timestamp())
+        if key < last:
+            key = max(key, int(when.replace(fold=1).timestamp()))
+        return key
+
+    # Index lines written since the last entry
+    def extend_index(self, data: mmap.mmap, size: int) -> None:
+        start: int = int(self.index[-1][1]) if len(self.index) > 0 else 0
+        last: int = int(self.index[-1][0]) if len(self.index) > 0 else 0
+        entries: List[List[int]] = []
+        pos: int = start
+        count: int = 0
+        while pos < size:
+            end: int = data.find(b"\n", pos, size)
+            # Still being written
+            if end < 0:
+                break
+            if count % MarketReader.INDEX_STEP == 0 and (pos != start or len(self.index) == 0):
+                try:
+                    last = self.get_key(data, pos, last)
+                    entries.append([last, pos])
+                except ValueError:
+                    # Skip unparsable lines for the next one
+                    pos = end + 1
+                    continue
+            count += 1
+            pos = end + 1
+
+        if len(entries) == 0:
+            return None
+
+        new_entries: numpy.ndarray = numpy.array(entries, dtype=numpy.int64)
+        self.index = numpy.concatenate((self.index, new_entries))
+
+        # Persist for the next reader, it's fine if we can't write here
+        # Other processes extend the index too, replace it whole so the last one wins
+        tmp_file: str = "{}.{}.tmp".format(self.index_file, os.getpid())
+        try:
+            with open(tmp_file, "wb") as fp:
+                self.index.tofile(fp)
+            os.replace(tmp_file, self.index_file)
+        except OSError as e:
+            Log.debug("Not saving market index: {}".format(e))
+
+    # Lines with time in [start, end)
+    def read_range(self, start: datetime | None, end: datetime | None) -> MarketSeries:
+        if not os.path.exists(self.file) or os.path.getsize(self.file) == 0:
+            return self.parse(b"", start, end)
+
+        with open(self.file, "rb") as fp:
+            with mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                # Only whole lines, the last may still be written
+                size: int = data.rfind(b"\n") + 1
+
+                self.read_index(data, size)
+                self.extend_index(data, size)
+
+                # Binary search the index for the byte range
+                keys: numpy.ndarray = self.index[:, 0]
+                offsets: numpy.ndarray = self.index[:, 1]
+                begin: int = 0
+                finish: int = size
+                if start and len(keys) > 0:
+                    entry: int = int(numpy.searchsorted(keys, self.to_key(start), side='right')) - 1
+                    begin = int(offsets[entry]) if entry >= 0 else 0
+                if end and len(keys) > 0:
+                    entry = int(numpy.searchsorted(keys, self.to_key(end), side='left'))
+                    finish = int(offsets[entry]) if entry < len(offsets) else size
+
+                return self.parse(data[begin:finish], start, end)
+
+    def parse(self, data: bytes, start: datetime | None, end: datetime | None) -> MarketSeries:
+        time: numpy.ndarray
+        values: numpy.ndarray
+        if len(data) == 0:
+            time = numpy.zeros(0, dtype='datetime64[s]')
+            values = numpy.zeros((0, MarketReader.COLUMNS - 1), dtype=numpy.float64)
+        else:
+            try:
+                time = numpy.loadtxt(io.BytesIO(data), delimiter=",", usecols=(0,), dtype='datetime64[s]', ndmin=1)
+                values = numpy.loadtxt(io.BytesIO(data), delimiter=",", usecols=range(1, MarketReader.COLUMNS), ndmin=2)
+            except ValueError:
+                # Irregular lines, parse one at a time
+                time, values = self.parse_lines(data)
+
+        # Trim to the exact range
+        mask: numpy.ndarray = numpy.ones(len(time), dtype=bool)
+        if start:
+            mask &= time >= numpy.datetime64(start, 's')
+        if end:
+            mask &= time < numpy.datetime64(end, 's')
+        return MarketSeries(time[mask], values[mask])
+
+    def parse_lines(self, data: bytes) -> Tuple[numpy.ndarray, numpy.ndarray]:
+        times: List[numpy.datetime64] = []
+        rows: List[List[float]] = []
+        for line in data.decode().splitlines():
+            fields: List[str] = line.split(",")
+            # Files from before the top of market was tracked
+            if len(fields) == MarketReader.COLUMNS - 1:
+                fields.append("nan")
+            try:
+                when: numpy.datetime64 = numpy.datetime64(fields[0], 's')
+                row: List[float] = [float(x) for x in fields[1:MarketReader.COLUMNS]]
+            except (ValueError, IndexError):
+                continue
+            if len(row) != MarketReader.COLUMNS - 1:
+                continue
+            times.append(when)
+            rows.append(row)
+        return (
+            numpy.array(times, dtype='datetime64[s]'),
+            numpy.array(rows, dtype=numpy.float64).reshape(-1, MarketReader.COLUMNS - 1),
+        )
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+
+# Local stand-in for the Coinbase market feed that replays recorded ticks
+#
+# Usage: python3 gtb/market/replay.py [data/market.csv] [port] [ticks per second]
+# Then set Settings.MARKET_FEED_URL = "ws://localhost:<port>"
+
+import sys
+import json
+import time
+
+from datetime import datetime
+from typing import List, Tuple
+
+from websockets.sync.server import serve, ServerConnection
+
+def read_ticks(file: str) -> List[Tuple[str, str]]:
+    ret: List[Tuple[str, str]] = []
+    with open(file, "r") as fp:
+        for line in fp:
+            fields: List[str] = line.strip().split(",")
+            if len(fields) < 3:
+                continue
+            ret.append((fields[1], fields[2]))
+    return ret
+
+def ticker_message(sequence: int, bid: str, ask: str) -> str:
+    return json.dumps({
+        'channel': "ticker",
+        'client_id': "",
+        'timestamp': datetime.now().strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
+        'sequence_num': sequence,
+        'events': [{
+            'type': "update",
+            'tickers': [{
+                'type': "ticker",
+                'product_id': "BTC-USD",
+                'price': bid,
+                'best_bid': bid,
+                'best_ask': ask,
+            }],
+        }],
+    })
+
+def replay(ticks: List[Tuple[str, str]], rate: float, websocket: ServerConnection) -> None:
+    # Wait for the ticker subscription
+    while True:
+        request: dict = json.loads(websocket.recv())
+        if request.get('type') == "subscribe" and request.get('channel') == "ticker":
+            break
+
+    # Replay every tick
+    sequence: int = 0
+    for tick in ticks:
+        websocket.send(ticker_message(sequence, tick[0], tick[1]))
+        sequence += 1
+        time.sleep(1 / rate)
+
+if __name__ == '__main__':
+    file: str = sys.argv[1] if len(sys.argv) > 1 else "data/market.csv"
+    port: int = int(sys.argv[2]) if len(sys.argv) > 2 else 8765
+    rate: float = float(sys.argv[3]) if len(sys.argv) > 3 else 10
+
+    ticks: List[Tuple[str, str]] = read_ticks(file)
+    print("Replaying {} ticks on ws://localhost:{}".format(len(ticks), port))
+
+    with serve(lambda ws: replay(ticks, rate, ws), "localhost", port) as server:
+        server.serve_forever()
@@ -0,0 +1,24 @@
+from gtb.market.prices import MarketPrices
+from gtb.market.top import MarketTop
+
+# Everything known about the market after one update
+#
+# Snapshots are never changed, a new one replaces the old one in the context.
+# Readers take the reference once and see a consistent view without locking.
+class MarketSnapshot():
+    __slots__ = ("current", "smooth", "top", "sequence")
+
+    current: MarketPrices
+    smooth: MarketPrices
+    top: MarketTop
+    # Goes up by one with each update
+    sequence: int
+
+    def __init__(self, current: MarketPrices, smooth: MarketPrices, top: MarketTop, sequence: int) -> None:
+        object.__setattr__(self, "current", current)
+        object.__setattr__(self, "smooth", smooth)
+        object.__setattr__(self, "top", top)
+        object.__setattr__(self, "sequence", sequence)
+
+    def __setattr__(self, name: str, value: object) -> None:
+        raise AttributeError("MarketSnapshot is immutable")
@@ -0,0 +1,74 @@
+from datetime import datetime
+
+from gtb.core.clock import Clock
+from gtb.core.thread import BotThread
+from gtb.core.context import Context
+from gtb.core.settings import Settings
+from gtb.market.feed import parse_ticker
+from gtb.market.prices import MarketPrices
+from gtb.utils.logging import Log
+
+from coinbase.websocket import WSClient # type: ignore
+
+# Keep a websocket subscription to the ticker channel open
+class MarketFeedThread(BotThread):
+    client: WSClient | None
+    connected: datetime
+
+    def __init__(self, ctx: Context) -> None:
+        super().__init__(ctx, sleep_seconds = 1)
+        self.client = None
+        self.connected = Clock.now()
+
+    def init(self) -> None:
+        pass
+
+    def think(self) -> None:
+        # Give a new connection time to receive its first message
+        if self.client and (Clock.now() - self.connected).total_seconds() < Settings.MARKET_FEED_TIMEOUT:
+            return None
+
+        # Reconnect if we stopped receiving updates
+        if not self.client or self.ctx.market_feed.is_stale():
+            self.reconnect()
+
+    def cleanup(self) -> None:
+        self.disconnect()
+
+    def reconnect(self) -> None:
+        self.disconnect()
+        assert Settings.MARKET_FEED_URL is not None
+        try:
+            Log.debug("Connecting to market feed.")
+            self.connected = Clock.now()
+            self.client = WSClient(
+                api_key=None,
+                api_secret=None,
+                base_url=Settings.MARKET_FEED_URL,
+                on_message=self.on_message,
+                retry=True,
+            )
+            self.client.open()
+            self.client.ticker(product_ids=["BTC-USD"])
+        except Exception as e:
+            Log.exception("Failed to connect to market feed", e)
+
+    def disconnect(self) -> None:
+        if not self.client:
+            return None
+        try:
+            self.client.close()
+        except Exception as e:
+            # Already closed by the remote end
+            Log.debug("Market feed closed: {}".format(e))
+        self.client = None
+
+    def on_message(self, message: str) -> None:
+        try:
+            prices: MarketPrices | None = parse_ticker(message)
+            if prices:
+                self.ctx.market_feed.push(prices)
+            else:
+                self.ctx.market_feed.heartbeat()
+        except Exception as e:
+            Log.exception("Failed to parse market feed message", e)
@@ -0,0 +1,112 @@
+import os
+import numpy
+
+from datetime import datetime, timedelta
+from typing import BinaryIO, List
+
+from gtb.utils.logging import Log
+
+# Every market update as fixed width binary records, one file per day
+class MarketTicks():
+    # Epoch seconds and prices of each tick
+    RECORD: numpy.dtype = numpy.dtype([
+        ('time', '<f8'),
+        ('bid', '<f8'),
+        ('ask', '<f8'),
+        ('smooth_bid', '<f8'),
+        ('smooth_ask', '<f8'),
+        ('top', '<f8'),
+    ])
+
+    dir: str
+    # File being appended to
+    day: str
+    fp: BinaryIO | None
+
+    def __init__(self, dir: str = "data/ticks") -> None:
+        self.dir = dir
+        self.day = ""
+        self.fp = None
+
+    def get_file(self, day: str) -> str:
+        return os.path.join(self.dir, day + ".bin")
+
+    def append(self, when: datetime, bid: float, ask: float, smooth_bid: float, smooth_ask: float, top: float) -> None:
+        # Rotate daily
+        day: str = when.strftime("%Y-%m-%d")
+        if day != self.day or not self.fp:
+            self.open(day)
+        assert self.fp is not None
+
+        record: numpy.ndarray = numpy.array([(when.timestamp(), bid, ask, smooth_bid, smooth_ask, top)], dtype=MarketTicks.RECORD)
+        self.fp.write(record.tobytes())
+        # Readers map the file
+        self.fp.flush()
+
+    def open(self, day: str) -> None:
+        self.close()
+
+        # Create directory
+        if not os.path.exists(self.dir):
+            os.makedirs(self.dir)
+
+        self.fp = open(self.get_file(day), "ab")
+        self.day = day
+
+        # Drop a torn record from an interrupted write
+        size: int = self.fp.tell()
+        if size % MarketTicks.RECORD.itemsize != 0:
+            Log.error("Truncating partial tick record in {}.".format(self.get_file(day)))
+            self.fp.truncate(size - (size % MarketTicks.RECORD.itemsize))
+
+    def close(self) -> None:
+        if self.fp:
+            self.fp.close()
+            self.fp = None
+
+    # Records of a single day, mapped read only
+    def read_day(self, day: str) -> numpy.ndarray:
+        file: str = self.get_file(day)
+        count: int = os.path.getsize(file) // MarketTicks.RECORD.itemsize if os.path.exists(file) else 0
+        if count == 0:
+            return numpy.zeros(0, dtype=MarketTicks.RECORD)
+        return numpy.memmap(file, dtype=MarketTicks.RECORD, mode='r', shape=(count,))
+
+    # Most recent record, None before the first tick
+    def read_latest(self) -> numpy.void | None:
+        for day in reversed(self.get_days()):
+            records: numpy.ndarray = self.read_day(day)
+            if len(records) > 0:
+                return records[-1]
+        return None
+
+    def get_days(self) -> List[str]:
+        if not os.path.exists(self.dir):
+            return []
+        return sorted([x[:-len(".bin")] for x in os.listdir(self.dir) if x.endswith(".bin")])
+
+    # Records with time in [start, end), a view of the file when the range is in one day
+    def read_range(self, start: datetime | None, end: datetime | None) -> numpy.ndarray:
+        days: List[str] = self.get_days()
+        if start:
+            # Ticks are filed by the day they were written
+            first: str = (start - timedelta(days=1)).strftime("%Y-%m-%d")
+            days = [x for x in days if x >= first]
+        if end:
+            last: str = (end + timedelta(days=1)).strftime("%Y-%m-%d")
+            days = [x for x in days if x <= last]
+
+        parts: List[numpy.ndarray] = []
+        for day in days:
+            records: numpy.ndarray = self.read_day(day)
+            times: numpy.ndarray = records['time']
+            begin: int = int(numpy.searchsorted(times, start.timestamp(), side='left')) if start else 0
+            finish: int = int(numpy.searchsorted(times, end.timestamp(), side='left')) if end else len(records)
+            if finish > begin:
+                parts.append(records[begin:finish])
+
+        if len(parts) == 0:
+            return numpy.zeros(0, dtype=MarketTicks.RECORD)
+        if len(parts) == 1:
+            return parts[0]
+        return numpy.concatenate(parts)
@@ -1,9 +1,17 @@
 from datetime import datetime
 
+from gtb.core.clock import Clock
+
+# Immutable top of market, make a new one instead of changing it
 class MarketTop():
+    __slots__ = ("price", "last_update")
+
     price: float
     last_update: datetime
 
-    def __init__(self) -> None:
-        self.price = 0.0
-        self.last_update = datetime.now()
+    def __init__(self, price: float = 0.0, last_update: datetime | None = None) -> None:
+        object.__setattr__(self, "price", price)
+        object.__setattr__(self, "last_update", last_update if last_update else Clock.now())
+
+    def __setattr__(self, name: str, value: object) -> None:
+        raise AttributeError("MarketTop is immutable")
@@ -1,4 +1,5 @@
 import json
+import numpy
 
 from datetime import datetime
 from dateutil.relativedelta import relativedelta
@@ -10,11 +11,39 @@ from gtb.utils.maths import floor_usd
 
 from coinbase.rest import products
 
+# Orders on one side of the book sorted by distance from the opposite best price
+class MarketDepth():
+    distance: numpy.ndarray
+    # Cumulative size and size * distance of the closest N orders
+    size_sum: numpy.ndarray
+    distance_sum: numpy.ndarray
+
+    def __init__(self, mid: float, orders: list) -> None:
+        prices: numpy.ndarray = numpy.array([float(order['price']) for order in orders], dtype=numpy.float64)
+        sizes: numpy.ndarray = numpy.array([float(order['size']) for order in orders], dtype=numpy.float64)
+        distance: numpy.ndarray = numpy.abs(mid - prices)
+        order: numpy.ndarray = numpy.argsort(distance, kind='stable')
+        self.distance = distance[order]
+        sizes = sizes[order]
+        self.size_sum = numpy.concatenate(([0.0], numpy.cumsum(sizes)))
+        self.distance_sum = numpy.concatenate(([0.0], numpy.cumsum(sizes * self.distance)))
+
+    # Size of orders within each window scaled from 1 at the mid price to 0 at the window edge
+    def get_windows(self, windows: numpy.ndarray) -> numpy.ndarray:
+        windows = numpy.asarray(windows, dtype=numpy.float64)
+        count: numpy.ndarray = numpy.searchsorted(self.distance, windows, side='right')
+        # sum(size * (window - distance) / window)
+        return (windows * self.size_sum[count] - self.distance_sum[count]) / windows
+
 class MarketVolume():
     pricebook: dict
+    bid_depth: MarketDepth | None
+    ask_depth: MarketDepth | None
 
     def __init__(self, pricebook: dict):
         self.pricebook = pricebook
+        self.bid_depth = None
+        self.ask_depth = None
 
     def get_time(self) -> datetime:
         return datetime.strptime(self.pricebook['time'], "%Y-%m-%d %H:%M:%S.%f")
@@ -22,23 +51,29 @@ class MarketVolume():
     def debug_print(self) -> None:
         print(json.dumps(self.pricebook, indent=2))
 
+    # Parsed on first use
+    def get_bid_depth(self) -> MarketDepth:
+        if not self.bid_depth:
+            self.bid_depth = MarketDepth(float(self.pricebook['asks'][0]['price']), self.pricebook['bids'])
+        return self.bid_depth
+
+    def get_ask_depth(self) -> MarketDepth:
+        if not self.ask_depth:
+            self.ask_depth = MarketDepth(float(self.pricebook['bids'][0]['price']), self.pricebook['asks'])
+        return self.ask_depth
+
     def get_bids(self, window: float = 1000.0) -> float:
-        return self.get_window(float(self.pricebook['asks'][0]['price']), self.pricebook['bids'], window)
+        return float(self.get_bid_depth().get_windows(numpy.array([window]))[0])
 
     def get_asks(self, window: float = 1000.0) -> float:
-        return self.get_window(float(self.pricebook['bids'][0]['price']), self.pricebook['asks'], window)
-
-    def get_window(self, mid: float, orders: dict, window: float) -> float:
-        ret: float = 0.0
-        for order in orders:
-            delta: float = abs(mid - float(order['price']))
-            # Ignore anything more than $1000 away
-            if delta > window:
-                continue
-            # Scale from 0 to 1 based on how close it is to the mid price
-            scale: float = (window - delta) / window
-            ret += float(order['size']) * scale
-        return ret
+        return float(self.get_ask_depth().get_windows(numpy.array([window]))[0])
+
+    # Bids/asks for many windows in one pass
+    def get_bids_many(self, windows: numpy.ndarray) -> numpy.ndarray:
+        return self.get_bid_depth().get_windows(windows)
+
+    def get_asks_many(self, windows: numpy.ndarray) -> numpy.ndarray:
+        return self.get_ask_depth().get_windows(windows)
 
 def get_volume_orders(ctx: Context) -> MarketVolume:
     # BTC-USD: Base BTC, Quote USD
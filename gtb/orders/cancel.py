@@ -1,47 +1,86 @@
-from datetime import datetime
+from typing import Dict, List
 
+from gtb.core.clock import Clock
 from gtb.core.context import Context
 from gtb.orders.order import Order, OrderInfo
 from gtb.utils.logging import Log
 
 from coinbase.rest import orders as order_api
 
+# Most order IDs in one cancel request
+CANCEL_BATCH_SIZE: int = 100
+
+class CancelRequest():
+    algorithm: str
+    order: Order
+    reason: str
+
+    def __init__(self, algorithm: str, order: Order, reason: str) -> None:
+        self.algorithm = algorithm
+        self.order = order
+        self.reason = reason
+
 def cancel_order(ctx: Context, algorithm: str, order: Order, reason: str) -> bool:
-    # Already complete
-    if order.status == Order.Status.Complete:
-        return False
-    # Already canceled
-    if order.status == Order.Status.Canceled:
-        return True
-    # Not registered with coinbase
-    if order.status == Order.Status.Pending or order.status == Order.Status.OnHold:
-        order.status = Order.Status.Canceled
-        return True
-
-    try:
-        assert order.info is not None
-        result = order_api.cancel_orders(
-            ctx.api,
-            order_ids=[order.info.order_id],
-        )
-        ok = result['results'][0]['success']
-        if ok:
+    return cancel_orders_batch(ctx, [CancelRequest(algorithm, order, reason)])[0]
+
+# Cancel many orders with as few requests as possible, whether each order is now canceled
+def cancel_orders_batch(ctx: Context, requests: List[CancelRequest]) -> List[bool]:
+    ret: List[bool] = [False for x in requests]
+
+    # Orders registered with coinbase by ID
+    remote: Dict[str, int] = {}
+    for index in range(0, len(requests)):
+        order: Order = requests[index].order
+        # Already complete
+        if order.status == Order.Status.Complete:
+            ret[index] = False
+        # Already canceled
+        elif order.status == Order.Status.Canceled:
+            ret[index] = True
+        # Not registered with coinbase
+        elif order.status == Order.Status.Pending or order.status == Order.Status.OnHold:
             order.status = Order.Status.Canceled
-            order.info.final_time = datetime.now()
-            order.info.cancel_reason = reason
-            order.info.cancel_time = datetime.now()
-            Log.info("Canceled ${:.2f} {} for {}: {}".format(
-                order.usd,
-                order.order_type.name,
-                algorithm,
-                reason))
-        return ok
-    except Exception as e:
-        Log.exception("Failed to cancel ${:.2f} {} for {} ({})".format(
-            order.usd,
-            order.order_type.name,
-            algorithm,
-            reason,
-        ), e)
-
-    return False
+            ret[index] = True
+        else:
+            assert order.info is not None
+            remote[order.info.order_id] = index
+
+    order_ids: List[str] = list(remote.keys())
+    for start in range(0, len(order_ids), CANCEL_BATCH_SIZE):
+        batch: List[str] = order_ids[start:start + CANCEL_BATCH_SIZE]
+        try:
+            result = order_api.cancel_orders(
+                ctx.api,
+                order_ids=batch,
+            )
+            for order_result in result['results']:
+                if not order_result['order_id'] in remote:
+                    continue
+                index = remote[order_result['order_id']]
+                if order_result['success']:
+                    set_canceled(requests[index])
+                    ret[index] = True
+        except Exception as e:
+            for order_id in batch:
+                request: CancelRequest = requests[remote[order_id]]
+                Log.exception("Failed to cancel ${:.2f} {} for {} ({})".format(
+                    request.order.usd,
+                    request.order.order_type.name,
+                    request.algorithm,
+                    request.reason,
+                ), e)
+
+    return ret
+
+def set_canceled(request: CancelRequest) -> None:
+    order: Order = request.order
+    assert order.info is not None
+    order.info.final_time = Clock.now()
+    order.info.cancel_reason = request.reason
+    order.info.cancel_time = Clock.now()
+    order.status = Order.Status.Canceled
+    Log.info("Canceled ${:.2f} {} for {}: {}".format(
+        order.usd,
+        order.order_type.name,
+        request.algorithm,
+        request.reason))
@@ -1,66 +1,232 @@
 import os
 import json
+import shutil
 
-from typing import List
+from typing import Dict, List
 from threading import RLock
-from datetime import datetime
+from datetime import datetime, timedelta
 
 from gtb.orders.order_pair import OrderPair
+from gtb.utils.files import truncate_partial_line
 from gtb.utils.logging import Log
 
+# Completed order pairs stored in daily segments
 class OrderHistory():
+    # Relative to the bot directory
+    # Single file format used before segments
     file: str = "data/historical.json"
+    # One segment per day of pair event time
+    dir: str = "data/history"
+    index_file: str = "data/history/index.json"
 
     order_pairs: List[OrderPair]
+    # Time range, count and file size of each segment
+    # Segments are found by listing the directory, the index can lag behind them after a crash
+    index: Dict[str, dict]
     mtx: RLock
 
-    def __init__(self) -> None:
+    # Readers outside the bot directory pass it as the root
+    def __init__(self, root: str = "") -> None:
+        self.file = os.path.join(root, OrderHistory.file)
+        self.dir = os.path.join(root, OrderHistory.dir)
+        self.index_file = os.path.join(root, OrderHistory.index_file)
         self.order_pairs = []
+        self.index = {}
         self.mtx = RLock()
 
     def read_fs(self) -> None:
+        self.read_range(None, None)
+
+    # Load pairs with event time in [start, end)
+    def read_range(self, start: datetime | None, end: datetime | None) -> None:
         with self.mtx:
-            if not os.path.exists(OrderHistory.file):
-                Log.info("No historical data.")
+            self.order_pairs = []
+
+            # Not migrated to segments yet
+            if not os.path.exists(self.index_file):
+                if not os.path.exists(self.file):
+                    Log.info("No historical data.")
+                    return None
+                for cur in self.read_legacy():
+                    if self.in_range(cur, start, end):
+                        self.order_pairs.append(cur)
+                Log.info("Read {} historical order pairs.".format(len(self.order_pairs)))
                 return None
 
-            # Read file
-            str_data: str
-            with open(OrderHistory.file, "r") as fp:
-                str_data = fp.read()
+            for segment in self.get_segments():
+                # Segment outside of range, each holds one day of event times
+                day: datetime = datetime.strptime(segment, "%Y-%m-%d")
+                if start and day + timedelta(days=1) <= start:
+                    continue
+                if end and day >= end:
+                    continue
+
+                for cur in self.read_segment(segment):
+                    if self.in_range(cur, start, end):
+                        self.order_pairs.append(cur)
+
+            Log.info("Read {} historical order pairs.".format(len(self.order_pairs)))
+
+    def in_range(self, pair: OrderPair, start: datetime | None, end: datetime | None) -> bool:
+        if start and pair.event_time < start:
+            return False
+        if end and pair.event_time >= end:
+            return False
+        return True
+
+    def read_legacy(self) -> List[OrderPair]:
+        ret: List[OrderPair] = []
 
-            # JSON deserialize
-            data: list = json.loads(str_data)
+        # Read file
+        str_data: str
+        with open(self.file, "r") as fp:
+            str_data = fp.read()
 
-            # Interpret
-            for order in data:
-                cur: OrderPair | None = OrderPair.from_dict(order)
+        # JSON deserialize
+        data: list = json.loads(str_data)
+
+        # Interpret
+        for order in data:
+            cur: OrderPair | None = OrderPair.from_dict(order)
+            if cur:
+                ret.append(cur)
+        return ret
+
+    def read_index(self) -> None:
+        with open(self.index_file, "r") as fp:
+            self.index = json.loads(fp.read())
+
+    def read_segment(self, segment: str) -> List[OrderPair]:
+        ret: List[OrderPair] = []
+        with open(self.get_segment_file(segment), "r") as fp:
+            for line in fp:
+                try:
+                    data: dict = json.loads(line)
+                except json.JSONDecodeError:
+                    # Still being appended
+                    if not line.endswith("\n"):
+                        break
+                    # Torn write, the records after it are still good
+                    Log.error("Ignoring incomplete history record in {}.".format(segment))
+                    continue
+                cur: OrderPair | None = OrderPair.from_dict(data)
                 if cur:
-                    self.order_pairs.append(cur)
+                    ret.append(cur)
+        return ret
 
-            Log.info("Read {} historical order pairs.".format(len(self.order_pairs)))
+    def get_segment(self, pair: OrderPair) -> str:
+        return pair.event_time.strftime("%Y-%m-%d")
+
+    def get_segment_file(self, segment: str) -> str:
+        return os.path.join(self.dir, segment + ".jsonl")
+
+    def get_segments(self) -> List[str]:
+        if not os.path.exists(self.dir):
+            return []
+        return sorted([x[:-len(".jsonl")] for x in os.listdir(self.dir) if x.endswith(".jsonl")])
 
-    def write_fs(self) -> None:
+    def write_index(self) -> None:
+        # Write atomically so readers never see a partial index
+        tmp_file: str = self.index_file + ".tmp"
+        with open(tmp_file, "w") as fp:
+            fp.write(json.dumps(self.index))
+        os.replace(tmp_file, self.index_file)
+
+    # Append pairs to their segments
+    def write_pairs(self, pairs: List[OrderPair]) -> None:
+        # Create directory
+        if not os.path.exists(self.dir):
+            os.makedirs(self.dir)
+
+        # Group by segment
+        segments: Dict[str, List[OrderPair]] = {}
+        for pair in pairs:
+            segment: str = self.get_segment(pair)
+            if not segment in segments:
+                segments[segment] = []
+            segments[segment].append(pair)
+
+        for segment, segment_pairs in segments.items():
+            # Write, not on the end of a torn record
+            truncate_partial_line(self.get_segment_file(segment))
+            with open(self.get_segment_file(segment), "a") as fp:
+                for pair in segment_pairs:
+                    fp.write("{}\n".format(json.dumps(pair.to_dict())))
+
+            # Update segment time range
+            info: dict = self.index.get(segment, {
+                'start': segment_pairs[0].event_time.strftime("%Y-%m-%d %H:%M:%S"),
+                'end': segment_pairs[0].event_time.strftime("%Y-%m-%d %H:%M:%S"),
+                'count': 0,
+            })
+            for pair in segment_pairs:
+                event_time: str = pair.event_time.strftime("%Y-%m-%d %H:%M:%S")
+                info['start'] = min(info['start'], event_time)
+                info['end'] = max(info['end'], event_time)
+            info['count'] += len(segment_pairs)
+            info['size'] = os.path.getsize(self.get_segment_file(segment))
+            self.index[segment] = info
+
+        self.write_index()
+
+    # Move the single file history into segments
+    def migrate_fs(self) -> None:
         with self.mtx:
-            # Serialize to dictionary
-            data: list = []
-            for order in self.order_pairs:
-                data.append(order.to_dict())
-            # Serialize to string
-            str_data: str = json.dumps(data)
+            if os.path.exists(self.index_file) or not os.path.exists(self.file):
+                return None
+
+            # Segments from a migration that died before writing the index
+            if os.path.exists(self.dir):
+                shutil.rmtree(self.dir)
+
+            pairs: List[OrderPair] = self.read_legacy()
+            self.index = {}
+            self.write_pairs(pairs)
+            os.replace(self.file, self.file + ".migrated")
+            Log.info("Migrated {} historical order pairs to {} segments.".format(
+                len(pairs),
+                len(self.index),
+            ))
+
+    # Recount segments written after the index was last saved
+    def repair_fs(self) -> None:
+        with self.mtx:
+            if not os.path.exists(self.index_file):
+                return None
+            self.read_index()
+
+            index: Dict[str, dict] = {}
+            for segment in self.get_segments():
+                size: int = os.path.getsize(self.get_segment_file(segment))
+                info: dict | None = self.index.get(segment)
+                if info and info.get('size') == size:
+                    index[segment] = info
+                    continue
 
-            # Create directory
-            if not os.path.exists(os.path.dirname(OrderHistory.file)):
-                os.makedirs(os.path.dirname(OrderHistory.file))
+                # Appended to without the index catching up
+                pairs: List[OrderPair] = self.read_segment(segment)
+                if len(pairs) == 0:
+                    continue
+                times: List[str] = [pair.event_time.strftime("%Y-%m-%d %H:%M:%S") for pair in pairs]
+                index[segment] = {
+                    'start': min(times),
+                    'end': max(times),
+                    'count': len(pairs),
+                    'size': size,
+                }
 
-            # Write
-            with open(OrderHistory.file, "w") as fp:
-                fp.write(str_data)
+            if index != self.index:
+                Log.info("Repaired order history index.")
+                self.index = index
+                self.write_index()
 
     def append(self, order: OrderPair) -> None:
         with self.mtx:
+            self.migrate_fs()
+            if len(self.index) == 0 and os.path.exists(self.index_file):
+                self.read_index()
             self.order_pairs.append(order)
-            self.write_fs()
+            self.write_pairs([order])
 
     def prune(self, oldest: str) -> None:
         with self.mtx:
@@ -1,42 +1,84 @@
+import sys
+
 from enum import Enum
 from datetime import datetime
 
-from typing import Optional
+from typing import Callable, Optional
 
 from gtb.utils.logging import Log
 from gtb.utils.maths import floor_usd, floor_btc
+from gtb.utils.times import to_seconds, from_seconds, parse_seconds, format_seconds
 
+# History holds tens of thousands of these, so no per-instance dict and times are
+# kept as wall clock seconds (timezone dropped) behind datetime properties
 class OrderInfo():
+    __slots__ = (
+        "order_id",
+        "client_order_id",
+        "_order_time",
+        "order_market",
+        "_final_time",
+        "final_market",
+        "final_fees",
+        "final_usd",
+        "_cancel_time",
+        "cancel_reason",
+    )
+
     order_id: str
     client_order_id: str
-    order_time: datetime
+    _order_time: float
     order_market: float
-    final_time: datetime | None
+    _final_time: float | None
     final_market: float | None
     final_fees: float | None
     final_usd: float | None
-    cancel_time: datetime | None
+    _cancel_time: float | None
     cancel_reason: str | None
 
     def __init__(self, order_id: str, client_order_id: str, order_time: datetime, order_market: float) -> None:
         self.order_id = order_id
         self.client_order_id = client_order_id
-        self.order_time = order_time
+        self._order_time = to_seconds(order_time)
         self.order_market = order_market
-        self.final_time = None
+        self._final_time = None
         self.final_market = None
         self.final_fees = None
         self.final_usd = None
-        self.cancel_time = None
+        self._cancel_time = None
         self.cancel_reason = None
 
+    @property
+    def order_time(self) -> datetime:
+        return from_seconds(self._order_time)
+
+    @order_time.setter
+    def order_time(self, when: datetime) -> None:
+        self._order_time = to_seconds(when)
+
+    @property
+    def final_time(self) -> datetime | None:
+        return from_seconds(self._final_time) if self._final_time is not None else None
+
+    @final_time.setter
+    def final_time(self, when: datetime | None) -> None:
+        self._final_time = to_seconds(when) if when else None
+
+    @property
+    def cancel_time(self) -> datetime | None:
+        return from_seconds(self._cancel_time) if self._cancel_time is not None else None
+
+    @cancel_time.setter
+    def cancel_time(self, when: datetime | None) -> None:
+        self._cancel_time = to_seconds(when) if when else None
+
     def to_dict(self) -> dict:
         return {
             'order_id': self.order_id,
             'client_order_id': self.client_order_id,
-            'order_time': self.order_time.strftime("%Y-%m-%d %H:%M:%S") if self.order_time else None,
-            'final_time': self.final_time.strftime("%Y-%m-%d %H:%M:%S") if self.final_time else None,
-            'cancel_time': self.cancel_time.strftime("%Y-%m-%d %H:%M:%S") if self.cancel_time else None,
+            'order_time': format_seconds(self._order_time),
+            'final_time': format_seconds(self._final_time) if self._final_time is not None else None,
+            'cancel_time': format_seconds(self._cancel_time) if self._cancel_time is not None else None,
             'order_market': self.order_market,
             'final_market': self.final_market,
             'final_fees': self.final_fees,
@@ -49,18 +91,18 @@ class OrderInfo():
         try:
             order_id: str = data['order_id']
             client_order_id: str = data['client_order_id']
-            order_time: datetime = datetime.strptime(data['order_time'], "%Y-%m-%d %H:%M:%S")
+            order_time: datetime = datetime.fromisoformat(data['order_time'])
             order_market: float = float(data['order_market'])
             ret = cls(order_id, client_order_id, order_time, order_market)
             try:
-                ret.final_time = datetime.strptime(data['final_time'], "%Y-%m-%d %H:%M:%S")
+                ret._final_time = parse_seconds(data['final_time'])
             except:
-                ret.final_time = None
+                ret._final_time = None
                 pass
             try:
-                ret.cancel_time = datetime.strptime(data['cancel_time'], "%Y-%m-%d %H:%M:%S")
+                ret._cancel_time = parse_seconds(data['cancel_time'])
             except:
-                ret.cancel_time = None
+                ret._cancel_time = None
                 pass
             if data['final_market']:
                 ret.final_market = float(data['final_market'])
@@ -68,13 +110,16 @@ class OrderInfo():
                 ret.final_fees = float(data['final_fees'])
             if data['final_usd']:
                 ret.final_usd = float(data['final_usd'])
-            ret.cancel_reason = data['cancel_reason']
+            # Only a handful of reasons
+            ret.cancel_reason = sys.intern(data['cancel_reason']) if data['cancel_reason'] else data['cancel_reason']
             return ret
         except Exception as e:
             Log.exception("Failed to deserialize OrderInfo", e)
             return None
 
 class Order():
+    __slots__ = ("order_type", "_status", "btc", "usd", "info", "insufficient_funds", "listener")
+
     class Type(Enum):
         Buy = 0
         Sell = 1
@@ -87,20 +132,34 @@ class Order():
         Canceled = 4
 
     order_type: 'Order.Type'
-    status: 'Order.Status'
+    _status: 'Order.Status'
     btc: float
     usd: float
     info: OrderInfo | None
     insufficient_funds: bool
+    # Called when the status changes
+    listener: Callable[[], None] | None
 
     def __init__(self, order_type: Type, btc: float, usd: float) -> None:
         self.order_type = order_type
-        self.status = Order.Status.Pending
+        self._status = Order.Status.Pending
+        self.listener = None
         self.btc = floor_btc(btc)
         self.usd = floor_usd(usd)
         self.info = None
         self.insufficient_funds = False
 
+    @property
+    def status(self) -> 'Order.Status':
+        return self._status
+
+    @status.setter
+    def status(self, status: 'Order.Status') -> None:
+        changed: bool = status != self._status
+        self._status = status
+        if changed and self.listener:
+            self.listener()
+
     def to_dict(self) -> dict:
         ret: dict = {
             'type': self.order_type.name,
@@ -1,94 +1,414 @@
 import os
 import json
 
-from typing import List, Callable
-from threading import RLock
+from typing import Dict, List, Callable, Tuple
+from threading import Lock, RLock
 
+from gtb.core.events import Event, EventBus
 from gtb.orders.order_pair import OrderPair
 from gtb.utils.logging import Log
 
 class OrderBook():
+    # Relative to the bot directory
     file: str = "data/orderbook.json"
+    journal_file: str = "data/orderbook.journal"
 
-    order_pairs: List[OrderPair]
+    # Journal records before compacting into a new snapshot
+    COMPACT_RECORDS: int = 1000
+
+    # Pairs whose buy USD counts against the allocations
+    ALLOCATED_STATUSES: List[OrderPair.Status] = [
+        OrderPair.Status.Active,
+        OrderPair.Status.OnHoldSell,
+        OrderPair.Status.PendingSell,
+        OrderPair.Status.ActiveSell,
+    ]
+
+    # Pairs waiting on the exchange that the order processor checks every time
+    PROCESS_STATUSES: List[OrderPair.Status] = [
+        OrderPair.Status.Pending,
+        OrderPair.Status.Active,
+        OrderPair.Status.PendingSell,
+        OrderPair.Status.ActiveSell,
+    ]
+
+    # Processing and persisting the pairs
     mtx: RLock
+    # Guards the pairs and indexes, never held while taking another lock
+    index_mtx: Lock
+    # Pairs in the order they were added, by object id
+    pairs: Dict[int, OrderPair]
+    # When each pair was added to keep subsets in orderbook order
+    added: Dict[int, int]
+    next_added: int
+    # Pairs by status and by algorithm
+    status_index: Dict[OrderPair.Status, Dict[int, OrderPair]]
+    algorithm_index: Dict[str, Dict[int, OrderPair]]
+    # Status each pair is indexed under
+    indexed_status: Dict[int, OrderPair.Status]
+    # Pairs with order status changes the processor hasn't looked at
+    changed: Dict[int, OrderPair]
+    # Pairs added or changed since the last journal write
+    # Every change to a pair is made before its status changes, so the listener catches it
+    dirty: Dict[int, OrderPair]
+    # Journal keys of pairs removed since the last journal write
+    removed: List[int]
+    # Tell the order processor about new pairs
+    events: EventBus | None
+    # Backtests turn writing off and write once at the end
+    persist: bool
 
-    def __init__(self) -> None:
-        self.order_pairs = []
+    # Snapshot generation the journal applies to
+    generation: int
+    # Journal key of each pair by object id
+    journal_keys: Dict[int, int]
+    # Last serialized state written for each journal key
+    journal_state: Dict[int, str]
+    next_key: int
+    journal_records: int
+
+    # Buy USD of allocated pairs and number of pairs by algorithm
+    allocations: Dict[str, float]
+    allocation_counts: Dict[str, int]
+    # Algorithm and buy USD counted for each pair by object id
+    allocated: Dict[int, Tuple[str, float]]
+
+    # Readers outside the bot directory pass it as the root
+    def __init__(self, events: EventBus | None = None, root: str = "") -> None:
+        self.file = os.path.join(root, OrderBook.file)
+        self.journal_file = os.path.join(root, OrderBook.journal_file)
         self.mtx = RLock()
+        self.index_mtx = Lock()
+        self.pairs = {}
+        self.added = {}
+        self.next_added = 0
+        self.status_index = {x: {} for x in OrderPair.Status}
+        self.algorithm_index = {}
+        self.indexed_status = {}
+        self.changed = {}
+        self.dirty = {}
+        self.removed = []
+        self.events = events
+        self.persist = True
+        self.generation = 0
+        self.journal_keys = {}
+        self.journal_state = {}
+        self.next_key = 0
+        self.journal_records = 0
+        self.allocations = {}
+        self.allocation_counts = {}
+        self.allocated = {}
 
-    def read_fs(self) -> None:
+    # Readers other than the bot only load what's there and never write
+    # The bot recovers, a torn journal record gets compacted away before it appends after it
+    def read_fs(self, recover: bool = False) -> None:
         with self.mtx:
-            if not os.path.exists(OrderBook.file):
+            if not os.path.exists(self.file) and not os.path.exists(self.journal_file):
                 Log.info("No orderbook data.")
                 return None
 
-            # Read file
-            str_data: str
-            with open(OrderBook.file, "r") as fp:
-                str_data = fp.read()
+            pairs: Dict[int, OrderPair] = {}
+
+            # Read snapshot
+            if os.path.exists(self.file):
+                str_data: str
+                with open(self.file, "r") as fp:
+                    str_data = fp.read()
+
+                # JSON deserialize
+                data: list | dict = json.loads(str_data)
+                if isinstance(data, dict):
+                    self.generation = data['generation']
+                    data = data['pairs']
+
+                # Interpret
+                for index in range(0, len(data)):
+                    cur: OrderPair | None = OrderPair.from_dict(data[index])
+                    if cur:
+                        pairs[index] = cur
+                self.next_key = len(data)
+
+            # Replay journal
+            torn: bool = False
+            if os.path.exists(self.journal_file):
+                with open(self.journal_file, "r") as fp:
+                    for line in fp:
+                        try:
+                            record: dict = json.loads(line)
+                        except json.JSONDecodeError:
+                            # Torn write at the end of the journal, or the bot is still appending it
+                            torn = True
+                            break
+
+                        # Written before the most recent snapshot
+                        if record['gen'] != self.generation:
+                            continue
+
+                        self.journal_records += 1
+                        key: int = record['key']
+                        if record['op'] == "set":
+                            replay: OrderPair | None = OrderPair.from_dict(record['pair'])
+                            if replay:
+                                pairs[key] = replay
+                        elif record['op'] == "del":
+                            pairs.pop(key, None)
+                        self.next_key = max(self.next_key, key + 1)
 
-            # JSON deserialize
-            data: list = json.loads(str_data)
+            for key, pair in pairs.items():
+                self.add(pair)
+                self.journal_keys[id(pair)] = key
+                self.journal_state[key] = json.dumps(pair.to_dict())
+            with self.index_mtx:
+                self.dirty = {}
 
-            # Interpret
-            for pair in data:
-                cur: OrderPair | None = OrderPair.from_dict(pair)
-                if cur:
-                    self.order_pairs.append(cur)
+            # New records can't follow the torn one, start over from what was read
+            if torn and recover:
+                Log.error("Ignoring incomplete orderbook journal record.")
+                self.compact()
 
             Log.info("Read {} orderbook pairs.".format(len(self.order_pairs)))
 
     def write_fs(self) -> None:
+        if not self.persist:
+            return None
         with self.mtx:
-            # Serialize to dictionary
-            data: list = []
-            for pair in self.order_pairs:
-                data.append(pair.to_dict())
-            # Serialize to string
-            str_data: str = json.dumps(data)
-
             # Create directory
-            if not os.path.exists(os.path.dirname(OrderBook.file)):
-                os.makedirs(os.path.dirname(OrderBook.file))
+            if not os.path.exists(os.path.dirname(self.file)):
+                os.makedirs(os.path.dirname(self.file))
+
+            if self.journal_records >= OrderBook.COMPACT_RECORDS:
+                self.compact()
+            else:
+                self.write_journal()
+
+    # Append the pairs that changed since the last write
+    def write_journal(self) -> None:
+        with self.index_mtx:
+            dirty: Dict[int, OrderPair] = self.dirty
+            self.dirty = {}
+            removed: List[int] = self.removed
+            self.removed = []
+
+        records: List[str] = []
+        for pair in dirty.values():
+            key: int | None = self.journal_keys.get(id(pair))
+            if key is None:
+                key = self.next_key
+                self.next_key += 1
+                self.journal_keys[id(pair)] = key
+
+            # Status changes back and forth can leave the pair as it was written
+            pair_data: dict = pair.to_dict()
+            state: str = json.dumps(pair_data)
+            if self.journal_state.get(key) != state:
+                self.journal_state[key] = state
+                records.append(json.dumps({
+                    'gen': self.generation,
+                    'op': "set",
+                    'key': key,
+                    'pair': pair_data,
+                }))
+
+        # Removed pairs
+        for key in removed:
+            if self.journal_state.pop(key, None) is not None:
+                records.append(json.dumps({
+                    'gen': self.generation,
+                    'op': "del",
+                    'key': key,
+                }))
+
+        if len(records) == 0:
+            return None
+
+        # Write
+        with open(self.journal_file, "a") as fp:
+            fp.write("".join([record + "\n" for record in records]))
+        self.journal_records += len(records)
+
+    # Replace the snapshot with the full orderbook and start a new journal
+    def compact(self) -> None:
+        self.generation += 1
+        self.journal_keys = {}
+        self.journal_state = {}
+        with self.index_mtx:
+            self.dirty = {}
+            self.removed = []
 
-            # Write
-            with open(OrderBook.file, "w") as fp:
-                fp.write(str_data)
+        # Serialize to dictionary
+        data: list = []
+        order_pairs: List[OrderPair] = self.order_pairs
+        for key in range(0, len(order_pairs)):
+            pair: OrderPair = order_pairs[key]
+            data.append(pair.to_dict())
+            self.journal_keys[id(pair)] = key
+            self.journal_state[key] = json.dumps(data[-1])
+        self.next_key = len(data)
+
+        # Serialize to string
+        str_data: str = json.dumps({
+            'generation': self.generation,
+            'pairs': data,
+        })
+
+        # Write atomically so readers never see a partial snapshot
+        tmp_file: str = self.file + ".tmp"
+        with open(tmp_file, "w") as fp:
+            fp.write(str_data)
+            fp.flush()
+            os.fsync(fp.fileno())
+        os.replace(tmp_file, self.file)
+
+        # Old journal records no longer match the snapshot generation
+        with open(self.journal_file, "w") as fp:
+            pass
+        self.journal_records = 0
+
+    # Snapshot of every pair in the order they were added
+    @property
+    def order_pairs(self) -> List[OrderPair]:
+        with self.index_mtx:
+            return list(self.pairs.values())
+
+    def add(self, pair: OrderPair) -> None:
+        with self.index_mtx:
+            self.pairs[id(pair)] = pair
+            self.added[id(pair)] = self.next_added
+            self.next_added += 1
+            self.status_index[pair.status][id(pair)] = pair
+            self.indexed_status[id(pair)] = pair.status
+            if not pair.algorithm in self.algorithm_index:
+                self.algorithm_index[pair.algorithm] = {}
+            self.algorithm_index[pair.algorithm][id(pair)] = pair
+            self.update_allocation(pair)
+            self.dirty[id(pair)] = pair
+        pair.listener = self.on_change
+
+    def remove(self, pair: OrderPair) -> None:
+        pair.listener = None
+        key: int | None = self.journal_keys.pop(id(pair), None)
+        with self.index_mtx:
+            self.dirty.pop(id(pair), None)
+            if key is not None:
+                self.removed.append(key)
+            self.pairs.pop(id(pair), None)
+            self.added.pop(id(pair), None)
+            self.status_index[self.indexed_status.pop(id(pair))].pop(id(pair), None)
+            self.algorithm_index[pair.algorithm].pop(id(pair), None)
+            if len(self.algorithm_index[pair.algorithm]) == 0:
+                self.algorithm_index.pop(pair.algorithm)
+            self.changed.pop(id(pair), None)
+            self.remove_allocation(pair)
+
+    # Move the pair to its new status, from whichever thread changed it
+    def on_change(self, pair: OrderPair) -> None:
+        with self.index_mtx:
+            if not id(pair) in self.pairs:
+                return None
+            self.changed[id(pair)] = pair
+            self.dirty[id(pair)] = pair
+            old: OrderPair.Status = self.indexed_status[id(pair)]
+            if old != pair.status:
+                self.status_index[old].pop(id(pair), None)
+                self.status_index[pair.status][id(pair)] = pair
+                self.indexed_status[id(pair)] = pair.status
+                self.update_allocation(pair)
 
     def append(self, order_pair: OrderPair) -> None:
         with self.mtx:
-            self.order_pairs.append(order_pair)
+            self.add(order_pair)
             self.write_fs()
+        if self.events:
+            self.events.publish(Event.OrderBook)
 
     # Remove completed/canceled pairs
     def cleanup(self, history) -> None:
         with self.mtx:
-            i: int = 0
-            while i < len(self.order_pairs):
-                pair: OrderPair = self.order_pairs[i]
+            with self.index_mtx:
+                if len(self.status_index[OrderPair.Status.Complete]) == 0 and len(self.status_index[OrderPair.Status.Canceled]) == 0:
+                    return None
+
+            # Keep the orderbook order in the history
+            for pair in self.order_pairs:
                 if pair.status in [OrderPair.Status.Complete, OrderPair.Status.Canceled]:
                     Log.info("Clearing {} order pair for {}.".format(
                         pair.status.name,
                         pair.algorithm,
                     ))
-                    self.order_pairs.pop(i)
+                    self.remove(pair)
                     history.append(pair)
-                else:
-                    i += 1
 
     def get_ids(self) -> List[int]:
-        ret: List[int] = []
-        with self.mtx:
-            for pair in self.order_pairs:
-                ret.append(id(pair))
-        return ret
+        with self.index_mtx:
+            return list(self.pairs.keys())
+
+    # Pairs the processor needs to visit: waiting on the exchange or changed by a trader
+    def take_process_ids(self) -> List[int]:
+        with self.index_mtx:
+            ids: Dict[int, OrderPair] = dict(self.changed)
+            self.changed = {}
+            for status in OrderBook.PROCESS_STATUSES:
+                ids.update(self.status_index[status])
+            # In orderbook order
+            return sorted(ids.keys(), key=lambda x: self.added[x])
+
+    def get_pairs(self, statuses: List[OrderPair.Status]) -> List[OrderPair]:
+        with self.index_mtx:
+            ret: List[OrderPair] = []
+            for status in statuses:
+                ret += self.status_index[status].values()
+            return ret
+
+    # Pairs of every algorithm starting with the name
+    def get_algorithm_pairs(self, prefix: str) -> List[OrderPair]:
+        with self.index_mtx:
+            ret: List[OrderPair] = []
+            for algorithm, pairs in self.algorithm_index.items():
+                if algorithm.startswith(prefix):
+                    ret += pairs.values()
+            return ret
 
     def process_id(self, pair_id: int, func: Callable) -> bool:
         with self.mtx:
-            for pair in self.order_pairs:
-                if id(pair) == pair_id:
-                    with pair.mtx:
-                        func(pair)
-                    return True
-        return False
+            with self.index_mtx:
+                pair: OrderPair | None = self.pairs.get(pair_id)
+            if not pair:
+                return False
+            with pair.mtx:
+                func(pair)
+            return True
+
+    # Count the pair's buy against its algorithm while it's in an allocated status
+    # Called with the index lock held
+    def update_allocation(self, pair: OrderPair) -> None:
+        counted: Tuple[str, float] | None = self.allocated.get(id(pair))
+        allocated: bool = pair.status in OrderBook.ALLOCATED_STATUSES
+        if counted and allocated and counted == (pair.algorithm, pair.buy.usd):
+            return None
+
+        self.remove_allocation(pair)
+        if not allocated:
+            return None
+        self.allocated[id(pair)] = (pair.algorithm, pair.buy.usd)
+        self.allocations[pair.algorithm] = self.allocations.get(pair.algorithm, 0.0) + pair.buy.usd
+        self.allocation_counts[pair.algorithm] = self.allocation_counts.get(pair.algorithm, 0) + 1
+
+    def remove_allocation(self, pair: OrderPair) -> None:
+        counted: Tuple[str, float] | None = self.allocated.pop(id(pair), None)
+        if not counted:
+            return None
+        algorithm: str = counted[0]
+        self.allocation_counts[algorithm] -= 1
+        # Start from zero again so rounding doesn't accumulate
+        if self.allocation_counts[algorithm] == 0:
+            self.allocations.pop(algorithm)
+            self.allocation_counts.pop(algorithm)
+        else:
+            self.allocations[algorithm] -= counted[1]
+
+    # Buy USD of pairs that have bought or are buying, for one algorithm or all
+    def get_allocated_usd(self, algorithm: str | None = None) -> float:
+        with self.index_mtx:
+            if algorithm is None:
+                return sum(self.allocations.values())
+            return self.allocations.get(algorithm, 0.0)
@@ -1,12 +1,19 @@
+import sys
+
 from enum import Enum
 from datetime import datetime
 from threading import Lock
-from typing import Optional
+from typing import Callable, Optional
 
+from gtb.core.clock import Clock
 from gtb.orders.order import Order
 from gtb.utils.logging import Log
+from gtb.utils.times import to_seconds, from_seconds, parse_seconds, format_seconds
 
+# Compact like Order, and the lock is only made once something locks the pair
 class OrderPair():
+    __slots__ = ("buy", "sell", "_status", "algorithm", "_event_time", "event_price", "buy_only", "_mtx", "listener")
+
     class Status(Enum):
         # Waiting for a trigger
         OnHold = 0
@@ -27,25 +34,68 @@ class OrderPair():
 
     buy: Order
     sell: Order | None
-    status: 'OrderPair.Status'
+    _status: 'OrderPair.Status'
+    # Interned, every pair of an algorithm shares one string
     algorithm: str
-    event_time: datetime
+    _event_time: float
     event_price: float
     buy_only: bool
-    mtx: Lock
+    _mtx: 'Lock | None'
+    # Called when the pair or one of its orders changes status
+    listener: Callable[['OrderPair'], None] | None
+    # Held while making a pair's lock
+    create_mtx: Lock = Lock()
 
     def __init__(self, algorithm: str, buy: Order, sell: Order | None = None) -> None:
         self.buy = buy
         self.sell = sell
-        self.status = OrderPair.Status.Pending
-        self.algorithm = algorithm
-        self.event_time = datetime.now()
+        self._status = OrderPair.Status.Pending
+        self.listener = None
+        self.buy.listener = self.on_order_status
+        if self.sell:
+            self.sell.listener = self.on_order_status
+        self.algorithm = sys.intern(algorithm)
+        self._event_time = to_seconds(Clock.now())
         self.event_price = buy.get_limit_price()
         self.buy_only = False
-        self.mtx = Lock()
+        self._mtx = None
 
         self.update_status()
 
+    @property
+    def event_time(self) -> datetime:
+        return from_seconds(self._event_time)
+
+    @event_time.setter
+    def event_time(self, when: datetime) -> None:
+        self._event_time = to_seconds(when)
+
+    @property
+    def mtx(self) -> Lock:
+        lock: Lock | None = self._mtx
+        if lock is None:
+            # Two threads locking a new pair must get the same lock
+            with OrderPair.create_mtx:
+                if self._mtx is None:
+                    self._mtx = Lock()
+                lock = self._mtx
+        return lock
+
+    @property
+    def status(self) -> 'OrderPair.Status':
+        return self._status
+
+    @status.setter
+    def status(self, status: 'OrderPair.Status') -> None:
+        changed: bool = status != self._status
+        self._status = status
+        if changed and self.listener:
+            self.listener(self)
+
+    def on_order_status(self) -> None:
+        if self.listener:
+            self.listener(self)
+
     # Setup pair status from buy/sell status
     def update_status(self) -> None:
         if self.buy.status == Order.Status.OnHold:
@@ -76,7 +126,7 @@ class OrderPair():
         return {
             'status': self.status.name,
             'algorithm': self.algorithm,
-            'event_time': self.event_time.strftime("%Y-%m-%d %H:%M:%S"),
+            'event_time': format_seconds(self._event_time),
             'event_price': "{:0.2f}".format(self.event_price),
             'buy': self.buy.to_dict(),
             'sell': self.sell.to_dict() if self.sell else None,
@@ -98,7 +148,7 @@ class OrderPair():
 
             ret = cls(algorithm, buy, sell)
             ret.status = status
-            ret.event_time = datetime.strptime(data['event_time'], "%Y-%m-%d %H:%M:%S")
+            ret._event_time = parse_seconds(data['event_time'])
             if 'event_price' in data:
                 ret.event_price = float(data['event_price'])
             ret.buy_only = data['buy_only']
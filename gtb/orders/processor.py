@@ -1,11 +1,14 @@
-from typing import List, Callable
+import asyncio
+
+from typing import Dict, List, Callable
 from functools import partial
-from datetime import datetime
-from dateutil.relativedelta import relativedelta
+from datetime import timedelta
 from dateutil import parser as date_parser
 
+from gtb.core.clock import Clock
 from gtb.core.thread import BotThread
 from gtb.core.context import Context
+from gtb.core.events import Event
 from gtb.core.settings import Settings
 from gtb.orders.order import Order, OrderInfo
 from gtb.orders.order_pair import OrderPair
@@ -13,21 +16,42 @@ from gtb.orders.cancel import cancel_order
 from gtb.phases.phase import Phase
 from gtb.utils.logging import Log
 from gtb.utils.maths import floor_usd
-from gtb.utils.wallet import Wallet
+from gtb.utils.wallet import Wallet, WalletCache
 
 from coinbase.rest import orders as order_api
 
 class OrderProcessor(BotThread):
+    # Maximum order IDs per list orders request
+    BATCH_SIZE: int = 50
+
+    active_status: Dict[str, dict]
+    wallet: WalletCache
 
     def __init__(self, ctx: Context) -> None:
-        super().__init__(ctx, sleep_seconds = 0.2)
+        # Queue new pairs right away, order status is still polled from the exchange
+        super().__init__(ctx, sleep_seconds = 0.2, events = [Event.OrderBook])
+        self.active_status = {}
+        self.wallet = WalletCache()
 
     def init(self) -> None:
         pass
 
     def think(self) -> None:
-        # Process every pair in the orderbook
-        pairs: List[int] = self.ctx.order_book.get_ids()
+        # Query the status of all active orders at once
+        self.refresh_active()
+        self.process_pairs()
+
+    def is_async(self) -> bool:
+        return True
+
+    async def think_async(self) -> None:
+        # Order status is queried on the event loop, processing the pairs takes the locks in the executor
+        await self.refresh_active_async()
+        await asyncio.get_running_loop().run_in_executor(None, self.process_pairs)
+
+    # Process the pairs waiting on the exchange or changed since the last think
+    def process_pairs(self) -> None:
+        pairs: List[int] = self.ctx.order_book.take_process_ids()
         for pair in pairs:
             self.ctx.order_book.process_id(pair, partial(OrderProcessor.process, self))
 
@@ -36,6 +60,74 @@ class OrderProcessor(BotThread):
         # Save orderbook changes to fs
         self.ctx.order_book.write_fs()
 
+    def get_active_ids(self) -> List[str]:
+        ret: List[str] = []
+        with self.ctx.order_book.mtx:
+            for pair in self.ctx.order_book.get_pairs([OrderPair.Status.Active, OrderPair.Status.ActiveSell]):
+                for order in [pair.buy, pair.sell]:
+                    if order and order.status == Order.Status.Active and order.info:
+                        ret.append(order.info.order_id)
+        return ret
+
+    def refresh_active(self) -> None:
+        self.active_status = {}
+        order_ids: List[str] = self.get_active_ids()
+        for index in range(0, len(order_ids), OrderProcessor.BATCH_SIZE):
+            batch: List[str] = order_ids[index:index + OrderProcessor.BATCH_SIZE]
+            try:
+                self.list_orders(batch)
+            except Exception as e:
+                Log.exception("Failed to list active orders", e)
+
+    async def refresh_active_async(self) -> None:
+        assert self.ctx.async_api is not None
+        self.active_status = {}
+        order_ids: List[str] = await asyncio.get_running_loop().run_in_executor(None, self.get_active_ids)
+
+        # Every batch at once over the shared connection pool
+        batches: List[List[str]] = [order_ids[x:x + OrderProcessor.BATCH_SIZE] for x in range(0, len(order_ids), OrderProcessor.BATCH_SIZE)]
+        results: list = await asyncio.gather(*[self.list_orders_async(x) for x in batches], return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                Log.exception("Failed to list active orders", result)
+
+        # Orders missing from the batches, failures are queried again when the pair is processed
+        missing: List[str] = [x for x in order_ids if not x in self.active_status]
+        results = await asyncio.gather(*[self.ctx.async_api.get_order(x) for x in missing], return_exceptions=True)
+        for result in results:
+            if not isinstance(result, BaseException):
+                self.active_status[result['order']['order_id']] = result['order']
+
+    async def list_orders_async(self, order_ids: List[str]) -> None:
+        assert self.ctx.async_api is not None
+        cursor: str | None = None
+        while True:
+            data: dict = await self.ctx.async_api.list_orders(order_ids, len(order_ids), cursor)
+            for order in data['orders']:
+                self.active_status[order['order_id']] = order
+
+            # Next page
+            if not data['has_next'] or not data['cursor']:
+                break
+            cursor = data['cursor']
+
+    def list_orders(self, order_ids: List[str]) -> None:
+        cursor: str | None = None
+        while True:
+            data: dict = order_api.list_orders(
+                self.ctx.api,
+                order_ids=order_ids,
+                limit=len(order_ids),
+                cursor=cursor,
+            )
+            for order in data['orders']:
+                self.active_status[order['order_id']] = order
+
+            # Next page
+            if not data['has_next'] or not data['cursor']:
+                break
+            cursor = data['cursor']
+
     def process(self, pair: OrderPair) -> None:
         # Find the active order to check status
         active_order: Order | None = None
@@ -78,20 +170,26 @@ class OrderProcessor(BotThread):
 
     def check_active(self, pair: OrderPair, order: Order) -> None:
         assert order.info is not None
-        # Query active order status
-        data: dict = order_api.get_order(self.ctx.api, order_id=order.info.order_id)
+        # Active order status from the batch query
+        data: dict | None = self.active_status.get(order.info.order_id)
+        # Missing from the batch: Query individually
+        if not data:
+            data = order_api.get_order(self.ctx.api, order_id=order.info.order_id)['order']
+        assert data is not None
         # Move active to complete/canceled if necessary
-        status: str = data['order']['status']
+        status: str = data['status']
         # Completed
         if status == "FILLED":
-            order.status = Order.Status.Complete
-            order.info.final_market = float(data['order']['average_filled_price'])
-            order.info.final_fees = float(data['order']['total_fees'])
-            order.info.final_time = date_parser.parse(data['order']['last_fill_time'])
+            order.info.final_market = float(data['average_filled_price'])
+            order.info.final_fees = float(data['total_fees'])
+            order.info.final_time = date_parser.parse(data['last_fill_time'])
             if order.order_type == Order.Type.Buy:
-                order.info.final_usd = float(data['order']['total_value_after_fees'])
+                order.info.final_usd = float(data['total_value_after_fees'])
             else:
-                order.info.final_usd = float(data['order']['filled_value'])
+                order.info.final_usd = float(data['filled_value'])
+            order.status = Order.Status.Complete
+            self.wallet.invalidate()
+            self.ctx.events.publish(Event.Fill)
             Log.info("{} order for {} filled (${:.2f} USD @ ${:.2f}) (${:.2f} fee).".format(
                 order.order_type.name,
                 pair.algorithm,
@@ -128,8 +226,9 @@ class OrderProcessor(BotThread):
                 status,
             ))
             order.status = Order.Status.Canceled
+            self.wallet.invalidate()
         # Stale
-        elif order.info.order_time + relativedelta(minutes=2) < datetime.now():
+        elif order.info.order_time + timedelta(minutes=2) < Clock.now():
             # If we're far off the mark, lets set it to pending so it gets requeued
             buy: bool = order.order_type == Order.Type.Buy
             market: float = self.ctx.current_market.bid if order.order_type == Order.Type.Buy else self.ctx.current_market.ask
@@ -141,6 +240,7 @@ class OrderProcessor(BotThread):
                 # Cancel and set back to pending
                 if cancel_order(self.ctx, pair.algorithm, order, "stale"):
                     order.status = Order.Status.Pending
+                    self.wallet.invalidate()
 
     def queue_pending(self, pair: OrderPair, order: Order) -> None:
         # Need at least a dollar spread between bid/ask for market conditions to be favorable
@@ -185,21 +285,24 @@ class OrderProcessor(BotThread):
                 return None
 
         # Randomize a client order ID
-        client_order_id: str = datetime.now().strftime("%Y-%m-%d-%H-%M-%S-%f-") + order.order_type.name
+        client_order_id: str = Clock.now().strftime("%Y-%m-%d-%H-%M-%S-%f-") + order.order_type.name
 
         # Queue order
-        order_info: dict = queue(
+        response = queue(
             self.ctx.api,
             client_order_id=client_order_id,
             product_id='BTC-USD',
             base_size="{:.8f}".format(order.btc),
             limit_price=str(final_price),
         )
+        # SDK responses can't be tested for a field, a missing one shouldn't fail
+        order_info: dict = response if isinstance(response, dict) else response.to_dict()
 
         # Success: Setup OrderInfo and move to active state
-        if 'success' in order_info and order_info['success']:
-            order.info = OrderInfo(order_info['order_id'], client_order_id, datetime.now(), final_price)
+        if order_info.get('success'):
+            order.info = OrderInfo(order_info['order_id'], client_order_id, Clock.now(), final_price)
             order.status = Order.Status.Active
+            self.wallet.add_order(order)
             Log.info("Created {} order for {} (${:.2f} USD @ ${:.2f}).".format(
                 order.order_type.name,
                 pair.algorithm,
@@ -207,7 +310,10 @@ class OrderProcessor(BotThread):
                 final_price))
         # Log error
         else:
-            if order_info['error_response']['error'] == 'INSUFFICIENT_FUND':
+            # Balances weren't what we thought
+            self.wallet.invalidate()
+            error: str = (order_info.get('error_response') or {}).get('error', "Unknown error")
+            if error == 'INSUFFICIENT_FUND':
                 if order.insufficient_funds:
                     return None
                 order.insufficient_funds = True
@@ -216,7 +322,7 @@ class OrderProcessor(BotThread):
                 pair.algorithm,
                 order.usd,
                 final_price,
-                order_info['error_response']['error'],
+                error,
             ))
             # Can't sell what we don't have
             if order.order_type == Order.Type.Sell:
@@ -230,7 +336,7 @@ class OrderProcessor(BotThread):
             return True
 
         # Get wallet
-        wallet: Wallet | None = Wallet.get(self.ctx)
+        wallet: Wallet | None = self.wallet.get(self.ctx)
         if not wallet:
             return False
         assert wallet is not None
@@ -240,18 +346,8 @@ class OrderProcessor(BotThread):
             return False
 
         # Get all USD for active trades and its allocations
-        all_pending_usd: float = 0.0
-        alg_pending_usd: float = 0.0
-        for pair in self.ctx.order_book.order_pairs:
-            if pair.status in [
-                    OrderPair.Status.Active,
-                    OrderPair.Status.OnHoldSell,
-                    OrderPair.Status.PendingSell,
-                    OrderPair.Status.ActiveSell,
-                ]:
-                all_pending_usd += pair.buy.usd
-                if pair.algorithm == algorithm:
-                    alg_pending_usd += pair.buy.usd
+        all_pending_usd: float = self.ctx.order_book.get_allocated_usd()
+        alg_pending_usd: float = self.ctx.order_book.get_allocated_usd(algorithm)
 
         # The percent allocation for this algorithm
         percent: float = Settings.allocations[algorithm]
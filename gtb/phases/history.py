@@ -0,0 +1,50 @@
+from bisect import bisect_left
+from datetime import datetime
+
+from typing import Iterator, List, Tuple
+
+# Time sorted market samples backed by arrays with a moving start index
+class PhaseHistory():
+    # Compact the arrays once this many points have been evicted
+    COMPACT_SIZE: int = 1024
+
+    times: List[float]
+    values: List[float]
+    start: int
+    last: datetime | None
+
+    def __init__(self) -> None:
+        self.times = []
+        self.values = []
+        self.start = 0
+        self.last = None
+
+    def __len__(self) -> int:
+        return len(self.times) - self.start
+
+    def append(self, when: datetime, value: float) -> None:
+        self.times.append(when.timestamp())
+        self.values.append(value)
+        self.last = when
+
+    def last_time(self) -> datetime | None:
+        return self.last
+
+    def value(self, index: int) -> float:
+        return self.values[self.start + index]
+
+    # Index of the most recent point before a time (-1 if none)
+    def index_before(self, when: datetime) -> int:
+        return bisect_left(self.times, when.timestamp(), self.start) - 1 - self.start
+
+    # Drop all points before an index
+    def evict(self, index: int) -> None:
+        self.start += index
+        if self.start >= PhaseHistory.COMPACT_SIZE and self.start * 2 >= len(self.times):
+            del self.times[:self.start]
+            del self.values[:self.start]
+            self.start = 0
+
+    def points(self) -> Iterator[Tuple[datetime, float]]:
+        for index in range(self.start, len(self.times)):
+            yield (datetime.fromtimestamp(self.times[index]), self.values[index])
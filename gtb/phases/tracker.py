@@ -1,106 +1,104 @@
 import os
 import json
 
-from datetime import datetime
+from datetime import datetime, timedelta
 from dateutil.relativedelta import relativedelta
 
 from typing import List, Tuple
 
+from gtb.core.clock import Clock
 from gtb.core.thread import BotThread
 from gtb.core.context import Context
+from gtb.core.events import Event
+from gtb.core.settings import Settings
 from gtb.market.prices import MarketPrices
+from gtb.market.snapshot import MarketSnapshot
 from gtb.phases.calculations import PhaseCalculations
+from gtb.phases.history import PhaseHistory
 from gtb.phases.phase import Phase
+from gtb.utils.files import truncate_partial_line
 from gtb.utils.logging import Log
 
 # Keep track of the current market bid/ask
 class PhaseTracker(BotThread):
-    file: str = "data/phases.json"
+    file: str = "data/phases.csv"
+    # JSON state file used before the tail log
+    legacy_file: str = "data/phases.json"
 
-    history: List[Tuple[datetime, float]]
+    # Longest look-back window
+    MAX_HOURS: int = 12
+    # How often to drop expired points from the log
+    TRUNCATE_MINUTES: int = 60
+    # Bytes to read at a time when reading the end of the log
+    BLOCK_SIZE: int = 64 * 1024
+    # Keep at most a point a second however often the market updates
+    MIN_POINT_SECONDS: float = 1.0
+
+    history: PhaseHistory
+    # Market snapshot last added to the history
+    sequence: int
     next_write: datetime
+    next_truncate: datetime
+    # Only a crash or failed write leaves a torn line, check before appending after one
+    checked_tail: bool
 
     def __init__(self, ctx: Context) -> None:
-        super().__init__(ctx)
-        self.history = []
-        self.next_write = datetime.now()
+        super().__init__(ctx, events = [Event.Market, Event.Timer])
+        self.history = PhaseHistory()
+        self.sequence = 0
+        self.next_write = Clock.now()
+        self.next_truncate = Clock.now() + relativedelta(minutes=PhaseTracker.TRUNCATE_MINUTES)
+        self.checked_tail = False
 
     def init(self) -> None:
         # Initialize state on restart
         self.read_fs()
 
     def think(self) -> None:
-        # Get latest market
-        market: MarketPrices = self.ctx.smooth_market
-        # No update
-        if len(self.history) > 0 and self.history[-1][0] == market.updated:
-            return None
-
-        # Save update
-        self.history.append((market.updated, market.split))
-        if len(self.history) == 1:
+        # A timer event without a new point still slides the windows
+        added: bool = self.add_point()
+        if len(self.history) <= 1:
             return None
 
-        max_ago: datetime = datetime.now() - relativedelta(hours=12)
-        trend_ago: datetime = datetime.now() - relativedelta(hours=8)
-        extended_ago: datetime = datetime.now() - relativedelta(minutes=90)
-        long_ago: datetime = datetime.now() - relativedelta(minutes=30)
-        mid_ago: datetime = datetime.now() - relativedelta(minutes=10)
-        short_ago: datetime = datetime.now() - relativedelta(minutes=2.5)
-        acute_ago: datetime = datetime.now() - relativedelta(minutes=1)
-
-        max_index: int = -1
-        trend_index: int = -1
-        extended_index: int = -1
-        long_index: int = -1
-        mid_index: int = -1
-        short_index: int = -1
-        acute_index: int = -1
-        for index in range(0, len(self.history)):
-            cur: Tuple[datetime, float] = self.history[index]
-            if cur[0] < max_ago:
-                max_index = index
-            if cur[0] < trend_ago:
-                trend_index = index
-            if cur[0] < extended_ago:
-                extended_index = index
-            if cur[0] < long_ago:
-                long_index = index
-            if cur[0] < mid_ago:
-                mid_index = index
-            if cur[0] < short_ago:
-                short_index = index
-            if cur[0] < acute_ago:
-                acute_index = index
-            else:
-                break
+        now: datetime = Clock.now()
+        max_index: int = self.history.index_before(now - timedelta(hours=PhaseTracker.MAX_HOURS))
+        trend_index: int = self.history.index_before(now - timedelta(hours=8))
+        extended_index: int = self.history.index_before(now - timedelta(minutes=90))
+        long_index: int = self.history.index_before(now - timedelta(minutes=30))
+        mid_index: int = self.history.index_before(now - timedelta(minutes=10))
+        short_index: int = self.history.index_before(now - timedelta(minutes=2.5))
+        acute_index: int = self.history.index_before(now - timedelta(minutes=1))
 
         calc: PhaseCalculations = self.ctx.phases
+        before: List[Phase] = [calc.acute, calc.short, calc.mid, calc.long, calc.extended, calc.trend]
         if acute_index >= 0:
-            calc.acute = self.calc_phase(acute_index, 20.0)
+            calc.acute = self.calc_phase(acute_index, Settings.PHASE_ACUTE_DELTA)
 
         if short_index >= 0:
-            calc.short = self.calc_phase(short_index, 30.0)
+            calc.short = self.calc_phase(short_index, Settings.PHASE_SHORT_DELTA)
 
         if mid_index >= 0:
-            calc.mid = self.calc_phase(mid_index, 50.0)
+            calc.mid = self.calc_phase(mid_index, Settings.PHASE_MID_DELTA)
 
         if long_index >= 0:
-            calc.long = self.calc_phase(long_index, 200.0)
+            calc.long = self.calc_phase(long_index, Settings.PHASE_LONG_DELTA)
 
         if extended_index >= 0:
-            calc.extended = self.calc_phase(extended_index, 500.0)
+            calc.extended = self.calc_phase(extended_index, Settings.PHASE_EXTENDED_DELTA)
 
         if trend_index >= 0:
-            calc.trend = self.calc_phase(trend_index, 200.0)
+            calc.trend = self.calc_phase(trend_index, Settings.PHASE_TREND_DELTA)
+
+        if before != [calc.acute, calc.short, calc.mid, calc.long, calc.extended, calc.trend]:
+            self.ctx.events.publish(Event.Phase)
 
         # Trim history
         if max_index >= 0:
-            self.history = self.history[max_index:]
+            self.history.evict(max_index)
 
         # Trace log periodically
-        if self.next_write <= datetime.now():
-            self.next_write = datetime.now() + relativedelta(minutes=1)
+        if self.next_write <= Clock.now():
+            self.next_write = Clock.now() + relativedelta(minutes=1)
             Log.trace("Phases: [ {} | {} | {} | {} | {} ] - Trend: {}".format(
                 calc.extended.name,
                 calc.long.name,
@@ -111,11 +109,31 @@ class PhaseTracker(BotThread):
             ))
 
         # Save state
-        self.write_fs()
+        if added:
+            self.write_fs()
+
+    def add_point(self) -> bool:
+        # Get latest market
+        snapshot: MarketSnapshot = self.ctx.market
+        # No update
+        if snapshot.sequence == self.sequence:
+            return False
+        market: MarketPrices = snapshot.smooth
+        last_time: datetime | None = self.history.last_time()
+        if last_time == market.updated:
+            return False
+        # Too soon, the next market or timer event picks up the latest update
+        if last_time and (market.updated - last_time).total_seconds() < PhaseTracker.MIN_POINT_SECONDS:
+            return False
+
+        # Save update
+        self.sequence = snapshot.sequence
+        self.history.append(market.updated, market.split)
+        return True
 
     def calc_phase(self, index: int, min_delta: float) -> Phase:
-        before: float = self.history[index][1]
-        after: float = self.history[-1][1]
+        before: float = self.history.value(index)
+        after: float = self.history.value(len(self.history) - 1)
         if abs(after - before) < min_delta:
             return Phase.Plateau
         elif after > before:
@@ -126,12 +144,67 @@ class PhaseTracker(BotThread):
 
     def read_fs(self) -> None:
         if not os.path.exists(PhaseTracker.file):
+            self.read_legacy_fs()
+            return None
+
+        # Only the points within the longest window are needed
+        cutoff: float = (Clock.now() - relativedelta(hours=PhaseTracker.MAX_HOURS)).timestamp()
+        points: List[Tuple[float, float]] = []
+        for line in self.read_tail(cutoff):
+            fields: List[str] = line.split(",")
+            try:
+                points.append((float(fields[0]), float(fields[1])))
+            except (ValueError, IndexError):
+                # Torn write at the end of the file
+                continue
+
+        # Keep the most recent point before the cutoff
+        start: int = 0
+        for index in range(0, len(points)):
+            if points[index][0] < cutoff:
+                start = index
+
+        for point in points[start:]:
+            self.history.append(datetime.fromtimestamp(point[0]), point[1])
+
+        Log.info("Read {} historical phase points.".format(len(self.history)))
+
+    # Read lines from the end of the file back to the first point before the cutoff
+    def read_tail(self, cutoff: float) -> List[str]:
+        data: bytes = b""
+        with open(PhaseTracker.file, "rb") as fp:
+            pos: int = fp.seek(0, os.SEEK_END)
+            while pos > 0:
+                step: int = min(PhaseTracker.BLOCK_SIZE, pos)
+                pos -= step
+                fp.seek(pos)
+                data = fp.read(step) + data
+
+                # The first line is only complete at the start of the file
+                lines: List[bytes] = data.split(b"\n", 2)
+                if pos > 0 and len(lines) < 3:
+                    continue
+                first: bytes = lines[1] if pos > 0 else lines[0]
+                try:
+                    if float(first.split(b",")[0]) < cutoff:
+                        break
+                except ValueError:
+                    pass
+
+        ret: List[str] = data.decode().split("\n")
+        if pos > 0:
+            ret = ret[1:]
+        return ret
+
+    # Read the JSON state file used before the tail log
+    def read_legacy_fs(self) -> None:
+        if not os.path.exists(PhaseTracker.legacy_file):
             Log.info("No historical phase data.")
             return None
 
         # Read file
         str_data: str
-        with open(PhaseTracker.file, "r") as fp:
+        with open(PhaseTracker.legacy_file, "r") as fp:
             str_data = fp.read()
 
         # JSON deserialize
@@ -139,28 +212,55 @@ class PhaseTracker(BotThread):
 
         # Interpret
         for point in data:
-            self.history.append((
+            self.history.append(
                 datetime.strptime(point['t'], "%Y-%m-%d %H:%M:%S.%f"),
                 float(point['x']),
-            ))
+            )
 
         Log.info("Read {} historical phase points.".format(len(self.history)))
 
+        # Convert to the tail log
+        self.truncate_fs()
+        os.remove(PhaseTracker.legacy_file)
+
     def write_fs(self) -> None:
-        # Serialize to dictionary
-        data: list = []
-        for point in self.history:
-            data.append({
-                't': point[0].strftime("%Y-%m-%d %H:%M:%S.%f"),
-                'x': point[1],
-            })
-        # Serialize to string
-        str_data: str = json.dumps(data)
+        # Create directory
+        if not os.path.exists(os.path.dirname(PhaseTracker.file)):
+            os.makedirs(os.path.dirname(PhaseTracker.file))
+
+        # Periodically drop points older than the longest window
+        if self.next_truncate <= Clock.now():
+            self.truncate_fs()
+            return None
+
+        # Append the newest point, not on the end of a torn one
+        when: datetime | None = self.history.last_time()
+        assert when is not None
+        if not self.checked_tail:
+            truncate_partial_line(PhaseTracker.file)
+            self.checked_tail = True
+        try:
+            with open(PhaseTracker.file, "a") as fp:
+                fp.write("{:.6f},{}\n".format(
+                    when.timestamp(),
+                    self.history.value(len(self.history) - 1),
+                ))
+        except:
+            # The write may have been cut short
+            self.checked_tail = False
+            raise
+
+    # Rewrite the log with only the points still in history
+    def truncate_fs(self) -> None:
+        self.next_truncate = Clock.now() + relativedelta(minutes=PhaseTracker.TRUNCATE_MINUTES)
 
         # Create directory
         if not os.path.exists(os.path.dirname(PhaseTracker.file)):
             os.makedirs(os.path.dirname(PhaseTracker.file))
 
-        # Write
-        with open(PhaseTracker.file, "w") as fp:
-            fp.write(str_data)
+        # Write atomically so a crash never loses the log
+        tmp_file: str = PhaseTracker.file + ".tmp"
+        with open(tmp_file, "w") as fp:
+            for point in self.history.points():
+                fp.write("{:.6f},{}\n".format(point[0].timestamp(), point[1]))
+        os.replace(tmp_file, PhaseTracker.file)
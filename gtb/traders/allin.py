@@ -4,8 +4,10 @@ from dateutil.relativedelta import relativedelta
 
 from typing import Dict, List
 
+from gtb.core.clock import Clock
 from gtb.core.thread import BotThread
 from gtb.core.context import Context
+from gtb.core.events import Event
 from gtb.core.settings import Settings, Spread
 from gtb.orders.order import Order, OrderInfo
 from gtb.orders.order_pair import OrderPair
@@ -24,19 +26,18 @@ class AllInTrader(BotThread):
     last_requeue: datetime
 
     def __init__(self, ctx: Context) -> None:
-        super().__init__(ctx)
+        super().__init__(ctx, events = [Event.Market, Event.Phase, Event.Fill, Event.Timer])
         self.active_pair = None
         self.market_top = 0
         self.ready_to_sell = False
-        self.last_requeue = datetime.now()
+        self.last_requeue = Clock.now()
 
     def init(self) -> None:
         # Find active trade
-        for pair in self.ctx.order_book.order_pairs:
-            if pair.algorithm.startswith(AllInTrader.ALGORITHM):
-                Log.info("Found active AllIn order pair.")
-                self.active_pair = pair
-                break
+        for pair in self.ctx.order_book.get_algorithm_pairs(AllInTrader.ALGORITHM):
+            Log.info("Found active AllIn order pair.")
+            self.active_pair = pair
+            break
 
     def think(self) -> None:
         if not self.active_pair:
@@ -49,14 +50,14 @@ class AllInTrader(BotThread):
         assert self.active_pair is None
 
         # Wait a couple minutes between bets
-        if (datetime.now() - self.last_requeue).total_seconds() < 120:
+        if (Clock.now() - self.last_requeue).total_seconds() < 120:
             return None
 
         if self.market_low():
             market: float = self.ctx.current_market.bid
             self.market_top = market
             self.ready_to_sell = False
-            self.last_requeue = datetime.now()
+            self.last_requeue = Clock.now()
             Log.info("AllIn new wager at ${:.2f}.".format(market))
 
             # Wager
@@ -108,7 +109,7 @@ class AllInTrader(BotThread):
             Log.info("AllIn trade has been completed.")
             self.ctx.notify.queue("AllIn trade has been completed.")
             self.active_pair = None
-            self.last_requeue = datetime.now()
+            self.last_requeue = Clock.now()
         elif self.active_pair.status == OrderPair.Status.Canceled:
             Log.info("AllIn trade has been canceled.")
             self.ctx.notify.queue("AllIn trade has been canceled.")
@@ -127,7 +128,7 @@ class AllInTrader(BotThread):
         assert self.active_pair is not None
 
         # Don't touch new bets for at least 20 minutes
-        if (datetime.now() - self.active_pair.event_time).total_seconds() < 1200:
+        if (Clock.now() - self.active_pair.event_time).total_seconds() < 1200:
             return None
 
         # Pending bet too high for current market
@@ -151,23 +152,23 @@ class AllInTrader(BotThread):
             self.market_top = self.ctx.smooth_market.bid
 
         # Don't touch new bets for at least 20 minutes
-        if (datetime.now() - self.active_pair.buy.info.final_time.replace(tzinfo=None)).total_seconds() < 1200:
+        if (Clock.now() - self.active_pair.buy.info.final_time.replace(tzinfo=None)).total_seconds() < 1200:
             return None
         # Requeue every 15 seconds get out of a bad position
-        if (datetime.now() - self.last_requeue).total_seconds() < 15:
+        if (Clock.now() - self.last_requeue).total_seconds() < 15:
             return None
 
         # Fall below purchase price? ($50 leeway)
         if self.ctx.smooth_market.bid < (self.active_pair.buy.info.final_market - 50):
-            self.last_requeue = datetime.now()
+            self.last_requeue = Clock.now()
             Log.info("AllIn fell below purchace price.")
             if cancel_order(self.ctx, AllInTrader.ALGORITHM, sell, "in the red"):
                 # Requeue at market price
-                self.last_requeue = datetime.now()
+                self.last_requeue = Clock.now()
                 market: float = self.ctx.current_market.bid
                 usd: float = market * self.active_pair.buy.btc
-                sell.status = Order.Status.Pending
                 sell.usd = usd
+                sell.status = Order.Status.Pending
             return None
 
         # If we go above .1% we will trigger into sell mode
@@ -194,6 +195,6 @@ class AllInTrader(BotThread):
             cur_height: float = self.ctx.smooth_market.bid - self.active_pair.buy.info.final_market
             percent_of_max: float = cur_height / run_height
             if percent_of_max < 0.85:
-                self.last_requeue = datetime.now()
+                self.last_requeue = Clock.now()
                 Log.info("AllIn wants to exit position.")
                 sell.status = Order.Status.Pending
@@ -1,6 +1,7 @@
 from datetime import datetime
 from dateutil.relativedelta import relativedelta
 
+from gtb.core.clock import Clock
 from gtb.core.thread import BotThread
 from gtb.core.context import Context
 from gtb.core.settings import Settings
@@ -18,7 +19,7 @@ class DiamondHands(BotThread):
     def __init__(self, ctx: Context) -> None:
         super().__init__(ctx)
         self.last_buy = None
-        self.next_buy = datetime.now()
+        self.next_buy = Clock.now()
 
     def init(self) -> None:
         # Find most recent HODL: Order history
@@ -32,7 +33,7 @@ class DiamondHands(BotThread):
             self.last_buy = pair.event_time
 
         # Find most recent HODL: Active orders
-        for pair in self.ctx.order_book.order_pairs:
+        for pair in self.ctx.order_book.get_algorithm_pairs(DiamondHands.ALGORITHM):
             if pair.status == OrderPair.Status.Canceled:
                 continue
             if pair.algorithm != DiamondHands.ALGORITHM:
@@ -46,7 +47,7 @@ class DiamondHands(BotThread):
             self.next_buy = self.last_buy + relativedelta(minutes=Settings.HODL_FREQUENCY_MINUTES)
 
     def think(self) -> None:
-        if datetime.now() < self.next_buy:
+        if Clock.now() < self.next_buy:
             return None
 
         # Create order
@@ -61,4 +62,4 @@ class DiamondHands(BotThread):
         self.ctx.order_book.append(pair)
 
         # Update next buy time
-        self.next_buy = datetime.now() + relativedelta(minutes=Settings.HODL_FREQUENCY_MINUTES)
+        self.next_buy = Clock.now() + relativedelta(minutes=Settings.HODL_FREQUENCY_MINUTES)
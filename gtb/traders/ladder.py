@@ -0,0 +1,50 @@
+from bisect import bisect_left, bisect_right
+from typing import Callable, Iterator, List
+
+from gtb.orders.order_pair import OrderPair
+
+# Pairs of a spread sorted by buy limit price
+class SpreadLadder():
+    # Buy limit price of each pair, it's fixed when the pair is made
+    prices: List[float]
+    pairs: List[OrderPair]
+
+    def __init__(self) -> None:
+        self.prices = []
+        self.pairs = []
+
+    def __len__(self) -> int:
+        return len(self.pairs)
+
+    def __iter__(self) -> Iterator[OrderPair]:
+        return iter(list(self.pairs))
+
+    def add(self, pair: OrderPair) -> None:
+        price: float = pair.buy.get_limit_price()
+        index: int = bisect_right(self.prices, price)
+        self.prices.insert(index, price)
+        self.pairs.insert(index, pair)
+
+    # Drop the pairs that match
+    def remove_if(self, func: Callable[[OrderPair], bool]) -> None:
+        keep: List[int] = [x for x in range(0, len(self.pairs)) if not func(self.pairs[x])]
+        if len(keep) == len(self.pairs):
+            return None
+        self.prices = [self.prices[x] for x in keep]
+        self.pairs = [self.pairs[x] for x in keep]
+
+    # Buy limit price closest to the price
+    def get_closest(self, price: float) -> float | None:
+        if len(self.prices) == 0:
+            return None
+        index: int = bisect_left(self.prices, price)
+        candidates: List[float] = self.prices[max(index - 1, 0):index + 1]
+        return min(candidates, key=lambda x: abs(x - price))
+
+    # Pairs with low <= buy limit price < high
+    def get_range(self, low: float, high: float) -> List[OrderPair]:
+        return self.pairs[bisect_left(self.prices, low):bisect_left(self.prices, high)]
+
+    # Pairs with buy limit price below low or above high
+    def get_outside(self, low: float, high: float) -> List[OrderPair]:
+        return self.pairs[:bisect_left(self.prices, low)] + self.pairs[bisect_right(self.prices, high):]
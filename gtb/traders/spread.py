@@ -1,16 +1,20 @@
 from enum import Enum
-from datetime import datetime
+from contextlib import ExitStack
+from datetime import datetime, timedelta
 from dateutil.relativedelta import relativedelta
 
-from typing import Dict, List
+from typing import Dict, List, Tuple
 
+from gtb.core.clock import Clock
 from gtb.core.thread import BotThread
 from gtb.core.context import Context
+from gtb.core.events import Event
 from gtb.core.settings import Settings, Spread
 from gtb.orders.order import Order, OrderInfo
 from gtb.orders.order_pair import OrderPair
-from gtb.orders.cancel import cancel_order
+from gtb.orders.cancel import CancelRequest, cancel_order, cancel_orders_batch
 from gtb.phases.phase import Phase
+from gtb.traders.ladder import SpreadLadder
 from gtb.utils.logging import Log
 from gtb.utils.maths import floor_btc, floor_usd, ceil_usd
 
@@ -25,34 +29,39 @@ class SpreadTrader(BotThread):
         Optimistic = 3
         Waning = 4
 
-    current_spreads: Dict[str, List[OrderPair]]
+    # Picks must agree over this long before the state changes
+    CENSUS_SECONDS: int = 90
+
+    # Pairs of each spread sorted by buy price
+    current_spreads: Dict[str, SpreadLadder]
     state: State
-    state_census: List[State]
+    # Time of each pick, picks only change on the events that wake the trader
+    state_census: List[Tuple[datetime, State]]
     last_state_change: datetime
+    # Cancels decided this think, sent together at the end
+    cancels: List[Tuple[OrderPair, CancelRequest]]
 
     def __init__(self, ctx: Context) -> None:
-        super().__init__(ctx)
+        super().__init__(ctx, events = [Event.Market, Event.Phase, Event.Fill, Event.Timer])
 
         self.current_spreads = {}
         self.state = SpreadTrader.State.Init
         self.state_census = []
-        self.last_state_change = datetime.now()
+        self.last_state_change = Clock.now()
+        self.cancels = []
 
     def init(self) -> None:
-        # Make empty order lists
+        # Make empty ladders
         for spread in Settings.spreads:
-            self.current_spreads[spread.name] = []
+            self.current_spreads[spread.name] = SpreadLadder()
 
         # Find all active spread trades
-        for pair in self.ctx.order_book.order_pairs:
-            if not pair.algorithm.startswith(SpreadTrader.ALGORITHM):
-                continue
-
+        for pair in self.ctx.order_book.get_algorithm_pairs(SpreadTrader.ALGORITHM):
             spread_name: str = pair.algorithm.split('-')[1]
 
             if not spread_name in self.current_spreads:
-                self.current_spreads[spread_name] = []
-            self.current_spreads[spread_name].append(pair)
+                self.current_spreads[spread_name] = SpreadLadder()
+            self.current_spreads[spread_name].add(pair)
 
         for spread_name in self.current_spreads:
             Log.info("Found {} active {} spreads.".format(
@@ -68,31 +77,56 @@ class SpreadTrader(BotThread):
         for spread in Settings.spreads:
             self.handle_spread(spread)
 
+        self.submit_cancels()
+
+    def queue_cancel(self, pair: OrderPair, order: Order, reason: str) -> None:
+        for queued in self.cancels:
+            if queued[1].order is order:
+                return None
+        self.cancels.append((pair, CancelRequest(SpreadTrader.ALGORITHM, order, reason)))
+
+    def submit_cancels(self) -> None:
+        if len(self.cancels) == 0:
+            return None
+
+        # Hold the pairs so the processor doesn't update them mid cancel
+        with ExitStack() as stack:
+            locked: List[OrderPair] = []
+            for pair, request in self.cancels:
+                if not pair in locked:
+                    stack.enter_context(pair.mtx)
+                    locked.append(pair)
+            cancel_orders_batch(self.ctx, [request for pair, request in self.cancels])
+        self.cancels = []
+
     def update_state(self) -> None:
         # Pick a state
         state: SpreadTrader.State = self.pick_state()
 
-        # Keep track of most recent 20 picks
-        self.state_census.append(state)
-        while len(self.state_census) > 90:
+        # Keep track of the picks over the census window
+        # The oldest kept pick is the one that held at the start of the window
+        now: datetime = Clock.now()
+        self.state_census.append((now, state))
+        start: datetime = now - timedelta(seconds=SpreadTrader.CENSUS_SECONDS)
+        while len(self.state_census) > 1 and self.state_census[1][0] <= start:
             self.state_census.pop(0)
 
         # Don't change too often
         # Not enough time has passed to declare a state change
-        if self.state != SpreadTrader.State.Init and self.last_state_change + relativedelta(minutes=1) > datetime.now():
+        if self.state != SpreadTrader.State.Init and self.last_state_change + timedelta(minutes=1) > Clock.now():
             return None
 
         # Take a consensus
         agreement: bool = True
         for c in self.state_census:
-            if c != self.state_census[0]:
+            if c[1] != self.state_census[0][1]:
                 agreement = False
                 break
 
         # State changed
         if agreement and self.state != state:
             self.state = state
-            self.last_state_change = datetime.now()
+            self.last_state_change = Clock.now()
 
             if self.state == SpreadTrader.State.Waning:
                 Log.info("Market is going down.")
@@ -130,8 +164,6 @@ class SpreadTrader(BotThread):
             return SpreadTrader.State.Steady
 
     def handle_spread(self, spread_info: Spread) -> None:
-        current_orders: List[OrderPair] = self.current_spreads[spread_info.name]
-
         # Waning: Just cut all our losses now before they get bigger
         if self.state == SpreadTrader.State.Waning:
             self.cut_losses(spread_info)
@@ -155,8 +187,7 @@ class SpreadTrader(BotThread):
         max_buy: float = self.ctx.smooth_market.split + max_delta
 
         # Cancel far pairs
-        pair: OrderPair
-        for pair in self.current_spreads[spread_info.name]:
+        for pair in self.current_spreads[spread_info.name].get_outside(min_buy, max_buy):
             with pair.mtx:
                 # Only ones we haven't bought yet
                 if not pair.status in [
@@ -166,25 +197,14 @@ class SpreadTrader(BotThread):
                 ]:
                     continue
 
-                # Within valid range?
-                limit_price: float = pair.buy.get_limit_price()
-                if limit_price <= max_buy and limit_price >= min_buy:
-                    continue
-
                 # Cancel
-                cancel_order(self.ctx, SpreadTrader.ALGORITHM, pair.buy, "spread too far")
+                self.queue_cancel(pair, pair.buy, "spread too far")
 
         # Cleanup complete pairs
-        index: int = 0
-        while index < len(self.current_spreads[spread_info.name]):
-            pair = self.current_spreads[spread_info.name][index]
-            if pair.status in [
-                OrderPair.Status.Complete,
-                OrderPair.Status.Canceled,
-            ]:
-                self.current_spreads[spread_info.name].pop(index)
-            else:
-                index += 1
+        self.current_spreads[spread_info.name].remove_if(lambda pair: pair.status in [
+            OrderPair.Status.Complete,
+            OrderPair.Status.Canceled,
+        ])
 
     def end_bad_positions(self, spread_info: Spread) -> None:
         current_market: float = self.ctx.smooth_market.bid
@@ -201,7 +221,7 @@ class SpreadTrader(BotThread):
                     assert pair.buy.info.final_market is not None
                     assert pair.buy.info.final_time is not None
                     limit_price = pair.buy.info.final_market
-                    buy_ago = (datetime.now() - pair.buy.info.final_time.replace(tzinfo=None)).total_seconds()
+                    buy_ago = (Clock.now() - pair.buy.info.final_time.replace(tzinfo=None)).total_seconds()
 
                 # $200 leeway over the course of the first minute
                 max_leeway: float = 200
@@ -231,7 +251,7 @@ class SpreadTrader(BotThread):
         if bad_state:
             if self.state != SpreadTrader.State.Waning:
                 self.state = SpreadTrader.State.Cautious
-            self.last_state_change = datetime.now()
+            self.last_state_change = Clock.now()
 
     def handle_new_spread(self, spread_info: Spread) -> None:
         # Maths
@@ -283,10 +303,9 @@ class SpreadTrader(BotThread):
 
         # Find the closest other pair
         closest_delta: float = spread_info.spread * 10
-        for pair in self.current_spreads[spread_info.name]:
-            buy_delta: float = abs(pair.buy.get_limit_price() - buy_market) / self.ctx.smooth_market.split
-            if buy_delta < closest_delta:
-                closest_delta = buy_delta
+        closest: float | None = self.current_spreads[spread_info.name].get_closest(buy_market)
+        if closest is not None:
+            closest_delta = min(closest_delta, abs(closest - buy_market) / self.ctx.smooth_market.split)
 
         # How frequently are we making bets right now
         min_delta: float
@@ -327,7 +346,7 @@ class SpreadTrader(BotThread):
 
         # Queue order
         self.ctx.order_book.append(new_pair)
-        self.current_spreads[spread_info.name].append(new_pair)
+        self.current_spreads[spread_info.name].add(new_pair)
 
     # Wait for most recent change to be upwards before allowing a buy to be filled
     # This stops orders being filled during the start of a downards run
@@ -342,23 +361,18 @@ class SpreadTrader(BotThread):
         if self.ctx.phases.short != Phase.Waxing:
             return None
 
-        for pair in self.current_spreads[spread_info.name]:
+        # Price is at or above what we want to buy at, but not by much
+        bid: float = self.ctx.smooth_market.bid
+        for pair in self.current_spreads[spread_info.name].get_range(bid, bid + 60.0):
             with pair.mtx:
                 if pair.status != OrderPair.Status.OnHold:
                     continue
-                # And price is below what we want to buy at
-                if pair.buy.get_limit_price() < self.ctx.smooth_market.bid:
-                    #Log.debug("XXX: Not low yet: {:.2f} vs {:.2f}".format(
-                    #    pair.buy.get_limit_price(), self.ctx.smooth_market.bid))
-                    continue
-                delta: float = pair.buy.get_limit_price() - self.ctx.smooth_market.bid
-                #Log.debug("XXX: delta: {:.2f}".format(delta))
-                if delta < 60.0:
-                    pair.buy.status = Order.Status.Pending
-                    Log.debug("Spread {} buy is ready. {:.2f} USD away.".format(
-                        spread_info.name,
-                        delta,
-                    ))
+                delta: float = pair.buy.get_limit_price() - bid
+                pair.buy.status = Order.Status.Pending
+                Log.debug("Spread {} buy is ready. {:.2f} USD away.".format(
+                    spread_info.name,
+                    delta,
+                ))
 
     # Put some stuff back on hold if we enter the cautious state
     def back_to_hold(self, spread_info: Spread) -> None:
@@ -397,14 +411,14 @@ class SpreadTrader(BotThread):
             OrderPair.Status.Active,
         ]:
             Log.info(f"Cancel buy spread {spread_info.name} {reason} (${pair.buy.usd:.2f} USD).")
-            cancel_order(self.ctx, SpreadTrader.ALGORITHM, pair.buy, "below spread range")
+            self.queue_cancel(pair, pair.buy, "below spread range")
             return None
 
         # Don't cancel sells
         return None
 
         # Do nothing if we just requeued this within the last couple minutes
-        if pair.sell and pair.sell.info and datetime.now() < pair.sell.info.order_time + relativedelta(minutes=2):
+        if pair.sell and pair.sell.info and Clock.now() < pair.sell.info.order_time + relativedelta(minutes=2):
             return None
 
         # Requeue cheaper sell
@@ -418,6 +432,6 @@ class SpreadTrader(BotThread):
             self.ctx.notify.queue(f"Market fall discounting ${pair.buy.usd:.2f} sell.")
             if cancel_order(self.ctx, SpreadTrader.ALGORITHM, pair.sell, "below spread range"):
                 # Requeue at market price
-                pair.sell.status = Order.Status.Pending
                 pair.sell.usd = self.ctx.smooth_market.bid * pair.sell.btc
-                pair.sell.info = OrderInfo("", "", datetime.now(), self.ctx.smooth_market.bid)
+                pair.sell.info = OrderInfo("", "", Clock.now(), self.ctx.smooth_market.bid)
+                pair.sell.status = Order.Status.Pending
@@ -0,0 +1,38 @@
+import os
+
+from typing import List
+
+# Modification time and size of each file to detect changes
+def get_file_signature(files: List[str]) -> List[list]:
+    ret: List[list] = []
+    for file in files:
+        try:
+            stat: os.stat_result = os.stat(file)
+            ret.append([file, stat.st_mtime_ns, stat.st_size])
+        except FileNotFoundError:
+            ret.append([file, 0, -1])
+    return ret
+
+# Drop a partial last line left by an interrupted append, so the next append starts on a new line
+def truncate_partial_line(file: str) -> None:
+    if not os.path.exists(file):
+        return None
+    with open(file, "rb+") as fp:
+        size: int = fp.seek(0, os.SEEK_END)
+        if size == 0:
+            return None
+        fp.seek(size - 1)
+        if fp.read(1) == b"\n":
+            return None
+
+        # Find the end of the last complete line
+        pos: int = size
+        while pos > 0:
+            step: int = min(4096, pos)
+            pos -= step
+            fp.seek(pos)
+            newline: int = fp.read(step).rfind(b"\n")
+            if newline >= 0:
+                fp.truncate(pos + newline + 1)
+                return None
+        fp.truncate(0)
@@ -0,0 +1,20 @@
+from datetime import datetime, timedelta
+
+# Format used for times in the order files
+TIME_FORMAT: str = "%Y-%m-%d %H:%M:%S"
+
+EPOCH: datetime = datetime(1970, 1, 1)
+
+# Wall clock seconds since 1970, without going through the local timezone
+def to_seconds(when: datetime) -> float:
+    return (when.replace(tzinfo=None) - EPOCH).total_seconds()
+
+def from_seconds(seconds: float) -> datetime:
+    return EPOCH + timedelta(seconds=seconds)
+
+def parse_seconds(text: str) -> float:
+    # Much faster than strptime for the fixed format
+    return to_seconds(datetime.fromisoformat(text))
+
+def format_seconds(seconds: float) -> str:
+    return from_seconds(seconds).strftime(TIME_FORMAT)
@@ -1,7 +1,12 @@
+from datetime import datetime
+from dateutil.relativedelta import relativedelta
+from threading import Lock
 from typing import Optional
 
 from gtb.utils.logging import Log
+from gtb.core.clock import Clock
 from gtb.core.context import Context
+from gtb.orders.order import Order
 
 from coinbase.rest import accounts as account_api
 
@@ -34,3 +39,44 @@ class Wallet():
         except Exception as e:
             Log.exception("Failed to get wallet", e)
         return None
+
+# Wallet reused for a few seconds, adjusted for the orders we create in between
+class WalletCache():
+    TTL_SECONDS: float = 5
+
+    wallet: Wallet | None
+    expires: datetime
+    mtx: Lock
+
+    def __init__(self) -> None:
+        self.wallet = None
+        self.expires = Clock.now()
+        self.mtx = Lock()
+
+    def get(self, ctx: Context) -> Wallet | None:
+        with self.mtx:
+            if self.wallet and self.expires > Clock.now():
+                return self.wallet
+
+        wallet: Wallet | None = Wallet.get(ctx)
+        with self.mtx:
+            self.wallet = wallet
+            self.expires = Clock.now() + relativedelta(seconds=WalletCache.TTL_SECONDS)
+        return wallet
+
+    # Hold the funds of an order we just created
+    def add_order(self, order: Order) -> None:
+        with self.mtx:
+            if not self.wallet:
+                return None
+            if order.order_type == Order.Type.Buy:
+                self.wallet.usd_available -= order.usd
+                self.wallet.usd_hold += order.usd
+            else:
+                self.wallet.btc_available -= order.btc
+                self.wallet.btc_hold += order.btc
+
+    # Fills and cancels change the balances in ways we don't track
+    def invalidate(self) -> None:
+        with self.mtx:
+            self.wallet = None
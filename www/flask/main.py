@@ -1,16 +1,37 @@
-from flask import Flask, jsonify
+from flask import Flask, jsonify, request
+
+from datetime import datetime
 
-import io
 import os
 import base64
 import subprocess
 
-import matplotlib.pyplot as plt
-
-from gtb.inspect.graph import create_plot
+from gtb.inspect.graph_cache import GraphCache
+from gtb.inspect.reports import ReportService
+from gtb.utils.logging import Log
 
 app = Flask("tradebot")
 
+# Started from the flask directory
+FLASK_DIR = os.getcwd()
+BIN_DIR = os.path.join(FLASK_DIR, 'bin')
+
+# Bot state is read from the bot directory
+BOT_DIR = '/var/tradebot'
+
+# Renders are shared by the gunicorn workers through the disk cache
+graph_cache = GraphCache(BOT_DIR, os.path.join(FLASK_DIR, 'cache'))
+
+Log.INFO = False
+reports = ReportService(BOT_DIR)
+
+def get_report(func):
+    try:
+        return func()
+    except Exception as e:
+        Log.exception("Failed to create report", e)
+        return "Failed to create report."
+
 @app.route('/info', methods=['GET'])
 def get_info():
     data = {
@@ -21,7 +42,7 @@ def get_info():
 @app.route('/logs', methods=['GET'])
 def get_logs():
     logs = ""
-    with open("/var/tradebot/logs/log.txt", "r") as fp:
+    with open(os.path.join(BOT_DIR, 'logs', 'log.txt'), "r") as fp:
         logs = fp.readlines()
     if len(logs) > 50:
         logs = logs[-50:]
@@ -33,57 +54,49 @@ def get_logs():
 
 @app.route('/wallet', methods=['GET'])
 def get_wallet():
-    cmd = ['sudo', '-u', 'ghw', './bin/wallet.sh']
+    # Needs the exchange, the API key stays with the bot user
+    cmd = ['sudo', '-u', 'ghw', os.path.join(BIN_DIR, 'wallet.sh')]
     process = subprocess.run(cmd, text=True, capture_output=True)
-    stdout = process.stdout
     data = {
-        "wallet": stdout,
+        "wallet": process.stdout,
     }
     return jsonify(data)
 
 @app.route('/pnl', methods=['GET'])
 def get_pnl():
-    cmd = ['sudo', '-u', 'ghw', './bin/pnl.sh']
-    process = subprocess.run(cmd, text=True, capture_output=True)
-    stdout = process.stdout
+    html = get_report(reports.get_pnl_html)
     data = {
-        "pnl": stdout,
+        "pnl": html,
     }
     return jsonify(data)
 
 @app.route('/spread-stats', methods=['GET'])
 def get_spread_stats():
-    cmd = ['sudo', '-u', 'ghw', './bin/spread_stats.sh']
-    process = subprocess.run(cmd, text=True, capture_output=True)
-    stdout = process.stdout
+    html = get_report(reports.get_spread_stats_html)
     data = {
-        "stats": stdout,
+        "stats": html,
     }
     return jsonify(data)
 
 @app.route('/orders', methods=['GET'])
 def get_orders():
-    cmd = ['sudo', '-u', 'ghw', './bin/orders.sh']
-    process = subprocess.run(cmd, text=True, capture_output=True)
-    stdout = process.stdout
+    html = get_report(reports.get_orders_html)
     data = {
-        "orders": stdout,
+        "orders": html,
     }
     return jsonify(data)
 
 @app.route('/history', methods=['GET'])
 def get_history():
-    cmd = ['sudo', '-u', 'ghw', './bin/history.sh']
-    process = subprocess.run(cmd, text=True, capture_output=True)
-    stdout = process.stdout
+    html = get_report(reports.get_history_html)
     data = {
-        "history": stdout,
+        "history": html,
     }
     return jsonify(data)
 
 @app.route('/alloc', methods=['GET'])
 def get_alloc():
-    cmd = ['sudo', '-u', 'ghw', './bin/allocations.sh']
+    cmd = ['sudo', '-u', 'ghw', os.path.join(BIN_DIR, 'allocations.sh')]
     process = subprocess.run(cmd, text=True, capture_output=True)
     stdout = process.stdout
     data = {
@@ -93,7 +106,7 @@ def get_alloc():
 
 @app.route('/count', methods=['GET'])
 def get_count():
-    cmd = ['sudo', '-u', 'ghw', './bin/counter.sh']
+    cmd = ['sudo', '-u', 'ghw', os.path.join(BIN_DIR, 'counter.sh')]
     process = subprocess.run(cmd, text=True, capture_output=True)
     stdout = process.stdout
     data = {
@@ -103,32 +116,27 @@ def get_count():
 
 @app.route('/graph', methods=['GET'])
 def get_graph():
-    orig_dir = os.getcwd()
-    try:
-        os.chdir('/var/tradebot')
-        create_plot()
-
-        # Save the plot to a BytesIO object
-        buf = io.BytesIO()
-        plt.savefig(buf, format='png')  # Save as PNG to the buffer
-        plt.close()  # Close the plot
-
-        # Seek to the beginning of the BytesIO buffer
-        buf.seek(0)
-
-        # Read the buffer content into a byte array
-        byte_array = buf.getvalue()
-
-        data = {
-            "data": base64.b64encode(byte_array).decode('utf-8'),
-        }
-        return jsonify(data)
-    finally:
-        os.chdir(orig_dir)
+    # Optional range, defaults to the last day
+    args = {}
+    for arg in ['start', 'end']:
+        value = request.args.get(arg)
+        if not value:
+            continue
+        try:
+            datetime.fromisoformat(value)
+        except ValueError:
+            return jsonify({"error": "Invalid {} time.".format(arg)}), 400
+        args[arg] = value
+
+    byte_array = graph_cache.get(**args)
+    data = {
+        "data": base64.b64encode(byte_array).decode('utf-8'),
+    }
+    return jsonify(data)
 
 @app.route('/demand', methods=['GET'])
 def get_demand():
-    cmd = ['sudo', '-u', 'ghw', './bin/demand_graph.sh']
+    cmd = ['sudo', '-u', 'ghw', os.path.join(BIN_DIR, 'demand_graph.sh')]
     process = subprocess.run(cmd, text=True, capture_output=True)
     stdout = process.stdout
     data = {
@@ -138,7 +146,7 @@ def get_demand():
 
 @app.route('/volume', methods=['GET'])
 def get_volume():
-    cmd = ['sudo', '-u', 'ghw', './bin/volume_graph.sh']
+    cmd = ['sudo', '-u', 'ghw', os.path.join(BIN_DIR, 'volume_graph.sh')]
     process = subprocess.run(cmd, text=True, capture_output=True)
     stdout = process.stdout
     data = {